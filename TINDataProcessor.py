@@ -3,9 +3,18 @@ import pandas as pd
 import os
 import json
 import random
+import hashlib
+import time
+import fnmatch
+import threading
 import MySQLdb as mysql
 import numpy as np
-from TINLearner import TINLearner
+from contextlib import contextmanager
+from Queue import Queue, Empty
+from TINLearner import TINLearner, MODEL_TYPES
+from TINFeatures import FEATURES, EventAggregates
+from TINEventMatrix import TINEventMatrix
+from TINTagColumns import MODEL_TAG_COLUMNS
 
 # TODO: Max 2 decimals on exon coverage values
 # TODO: Test the relative differences between exons when using SAMtools and DB RPKM.
@@ -16,27 +25,189 @@ TAG_INTERESTING = 0
 TAG_NOT_INTERESTING = 1
 TAG_UNCERTAIN = 2
 
+# Bump whenever import_dataset() changes what it produces, so cached imports are not reused
+IMPORTER_VERSION = 4
+
+# Columns that can be filtered on (minimum values)
+FILTER_INT_FIELDS = ["included_counts", "excluded_counts", "tot_reads", "occurrences"]
+FILTER_FLOAT_FIELDS = [
+    "psi",
+    "rpkm",
+    "avg_rpkm",
+    "prev_exon_tot_reads",
+    "prev_exon_rpkm",
+    "next_exon_tot_reads",
+    "next_exon_rpkm",
+    "avg_tot_reads",
+    "prev_exon_max_rpkm",
+    "next_exon_max_rpkm",
+    "max_avg_rpkm",
+    "max_gene_rpkm",
+    "max_psi",
+    "percent_of_max_psi",
+    "percent_of_max_rpkm",
+    "main_rpkm_to_upstream_rpkm_ratio",
+    "main_rpkm_to_downstream_rpkm_ratio",
+    "sum_psi_all_samples",
+    "sum_psi_other_samples",
+    "mean_psi_other_samples",
+    "psi_diff_from_mean_other_samples",
+    "sum_rpkm_all_samples",
+    "sum_rpkm_other_samples",
+    "mean_rpkm_other_samples",
+    "rpkm_percentage_of_mean_other_samples"
+]
+
+# Prediction confidence columns that can be filtered on. Each has a minimum (filters[<column>]) and a maximum
+# (filters["max_" + <column>]), both between 0 and 1.
+FILTER_CONFIDENCE_FIELDS = [model_type.confidence_column for model_type in MODEL_TYPES.values()]
+
 # Fix pandas print width
 pd.set_option("display.width", 250)
 pd.set_option("max.columns", 100)
 
 
+class ConnectionPool(object):
+    """
+    A small pool of MySQLdb connections that can be shared between threads. A thread checks out a connection of its
+    own with connection(), which pings it (and reconnects if it has gone away) before handing it out:
+
+        with pool.connection() as db:
+            df = pd.read_sql_query(query, db)
+
+    Connections are opened lazily, so creating a pool does not touch the database.
+    """
+
+    def __init__(self, host, user, passwd, db_name, size=4, timeout=30):
+        self.connect_args = (host, user, passwd, db_name)
+        self.size = size
+        self.timeout = timeout  # Seconds to wait for a free connection before giving up
+        self.reset()
+
+    def reset(self):
+        """
+        Starts over with empty slots. Connections owned by another process are left alone, as closing them would
+        close the socket for that process as well.
+        """
+        self.pid = os.getpid()
+        self.local = threading.local()
+        self.idle = Queue(maxsize=self.size)
+        for _ in range(self.size):
+            self.idle.put(None)  # None means the slot has no open connection yet
+
+    @contextmanager
+    def connection(self):
+        """
+        Checks out a connection for the current thread and returns it to the pool afterwards. Nested checkouts on
+        the same thread get the same connection. Raises mysql.OperationalError if no connection becomes available
+        within the timeout.
+        """
+        # Connections inherited through fork() can't be used in this process
+        if os.getpid() != self.pid:
+            self.reset()
+
+        # This thread already holds a connection
+        held_connection = getattr(self.local, "connection", None)
+        if held_connection is not None:
+            yield held_connection
+            return
+
+        try:
+            db = self.idle.get(timeout=self.timeout)
+        except Empty:
+            raise mysql.OperationalError("Timed out after %d seconds waiting for a database connection" % self.timeout)
+
+        try:
+            db = self.check_connection(db)
+        except mysql.Error:
+            # Give the slot back so the pool doesn't shrink
+            self.idle.put(None)
+            raise
+
+        self.local.connection = db
+        try:
+            yield db
+        finally:
+            self.local.connection = None
+            self.idle.put(db)
+
+    def check_connection(self, db):
+        """
+        Returns a working connection: db itself if it answers a ping, otherwise a new one.
+        """
+        if db is None:
+            return mysql.connect(*self.connect_args)
+
+        try:
+            db.ping()
+            return db
+        except mysql.Error:
+            print "DataProcessor: Database connection lost, reconnecting"
+            try:
+                db.close()
+            except mysql.Error:
+                pass
+            return mysql.connect(*self.connect_args)
+
+    def close(self):
+        """
+        Closes all idle connections.
+        """
+        while True:
+            try:
+                db = self.idle.get_nowait()
+            except Empty:
+                break
+            if db is not None:
+                try:
+                    db.close()
+                except mysql.Error:
+                    pass
+
+
 class TINDataProcessor(object):
 
     def __init__(self, tin_tagger, tag_no_tag):
         self.testing = True
         self.tin_tagger = tin_tagger
         self.tag_no_tag = tag_no_tag
+
+        # Database connections
+        self.db_pool = None
+        self.db_pool_size = 4
+        self.db_checkout_timeout = 30  # Seconds
+        self.sample_temp_table_threshold = 50  # Longer sample lists are joined through a temporary table
+        self.sample_batch_size = 25  # Number of samples fetched per round of import queries
+        self.explain_queries = False  # Print the EXPLAIN plan of every import query before running it
+
+        # On-disk cache of database imports
+        self.import_cache_enabled = True
+        self.import_cache_dir = os.path.join(os.path.expanduser("~"), ".tin_tagger", "import_cache")
         if not self.testing:
             print "DataProcessor: Connecting to DB"
             self.tin_tagger.set_statusbar_text("Hello from the DataProcessor!")
-            self.db = mysql.connect("localhost", "crc_spliceseq", "TODO:insert_password_here", "crc_spliceseq")
+            self.connect_to_database("localhost", "crc_spliceseq", "TODO:insert_password_here", "crc_spliceseq")
 
         self.tin_learner = TINLearner(self)
         self.enable_decision_tree = True
 
         self.samtools_enabled = False  # Flag to determine whether or not to use SAMtools. For testing.
 
+        # Exon RPKM for mutually exclusive exons events, keyed by as_id. Filled in bulk by
+        # prefetch_rpkm_for_mutually_exclusive_exons() so ME events render without a DB round-trip.
+        self.me_exon_rpkm_cache = {}
+        self.me_prefetch_window = 100  # Number of upcoming events to look ahead for ME events when prefetching
+
+        # Running per-event aggregates, used to update cross-sample features when samples are added or removed
+        self.event_aggregates = None
+
+        # Wide (event x sample) view of the loaded dataset, see TINEventMatrix
+        self.event_matrix = None
+
+        # Bulk tag changes that can be undone, newest last, see bulk_set_tags()
+        self.tag_undo_stack = []
+        self.max_tag_undo_steps = 20
+
     def load_dataset(self, filepath, processQueue):
         """
         Reads a dataset and returns it as a pandas dataframe
@@ -102,25 +273,12 @@ class TINDataProcessor(object):
         #df.exon1 = df.exon1.str.replace("\.0$", "")
         #df.exon2 = df.exon2.str.replace("\.0$", "")
 
-        # Count occurrences if not already done
-        if "occurrences" not in list(df.columns):
-            df["occurrences"] = df.groupby("as_id")["name"].transform(len)
-
         # Add event_tag column if not present
         if "event_tag" not in list(df.columns):
             df["event_tag"] = TAG_NO_TAG  # Default to no tag
 
-        # Calc max RPKM for prev exon
-        df["prev_exon_max_rpkm"] = df.groupby("as_id")["prev_exon_rpkm"].transform(max)
-
-        # Calc max RPKM for next exon
-        df["next_exon_max_rpkm"] = df.groupby("as_id")["next_exon_rpkm"].transform(max)
-
-        # Calc max average RPKM for main exon
-        df["max_avg_rpkm"] = df.groupby("as_id")["avg_rpkm"].transform(max)
-
-        # Calc max gene RPKM
-        df["max_gene_rpkm"] = df.groupby("as_id")["rpkm"].transform(max)
+        # Compute the features needed for filtering, if the file doesn't have them already
+        self.ensure_features(df, FILTER_INT_FIELDS + FILTER_FLOAT_FIELDS)
 
         processQueue.put(df)
 
@@ -133,41 +291,26 @@ class TINDataProcessor(object):
         # Work on a copy of the dataset
         df = dataset.copy()
 
-        # Filter on ints
-        int_fields = ["included_counts", "excluded_counts", "tot_reads", "occurrences"]
-        for i in int_fields:
-            df = df.loc[df[i] >= int(filters[i][1].get())]
+        # Filter on ints. Columns the dataset doesn't have (e.g. raw DB columns in a file) are skipped.
+        for i in FILTER_INT_FIELDS:
+            if i in df.columns:
+                df = df.loc[df[i] >= int(filters[i][1].get())]
 
         # Filter float fields
-        float_fields = [
-            "psi",
-            "rpkm",
-            "avg_rpkm",
-            "prev_exon_tot_reads",
-            "prev_exon_rpkm",
-            "next_exon_tot_reads",
-            "next_exon_rpkm",
-            "avg_tot_reads",
-            "prev_exon_max_rpkm",
-            "next_exon_max_rpkm",
-            "max_avg_rpkm",
-            "max_gene_rpkm",
-            "max_psi",
-            "percent_of_max_psi",
-            "percent_of_max_rpkm",
-            "main_rpkm_to_upstream_rpkm_ratio",
-            "main_rpkm_to_downstream_rpkm_ratio",
-            "sum_psi_all_samples",
-            "sum_psi_other_samples",
-            "mean_psi_other_samples",
-            "psi_diff_from_mean_other_samples",
-            "sum_rpkm_all_samples",
-            "sum_rpkm_other_samples",
-            "mean_rpkm_other_samples",
-            "rpkm_percentage_of_mean_other_samples"
-        ]
-        for f in float_fields:
-            df = df.loc[df[f] >= float(filters[f][1].get())]
+        for f in FILTER_FLOAT_FIELDS:
+            if f in df.columns:
+                df = df.loc[df[f] >= float(filters[f][1].get())]
+
+        # Filter on prediction confidence. Rows without a prediction have no confidence, so they are only left out
+        # when a bound is actually set.
+        for c in FILTER_CONFIDENCE_FIELDS:
+            if c in df.columns:
+                minimum = float(filters[c][1].get())
+                maximum = float(filters["max_" + c][1].get())
+                if minimum > 0:
+                    df = df.loc[df[c] >= minimum]
+                if maximum < 1:
+                    df = df.loc[df[c] <= maximum]
 
         # Filter on splice types
         include_types = []  # List of splice types to include
@@ -193,6 +336,70 @@ class TINDataProcessor(object):
         # Return filtered dataset
         return df
 
+    def ensure_features(self, dataset, feature_names):
+        """
+        Computes the requested features that dataset doesn't have yet, in place. See TINFeatures.FeatureRegistry.
+        """
+        missing = FEATURES.ensure(dataset, feature_names)
+        if len(missing) > 0:
+            print "WARNING: Unable to compute features from this dataset: %s" % ", ".join(missing)
+        return missing
+
+    def get_event_aggregates(self, dataset):
+        """
+        Returns the running per-event aggregates of dataset, building them on first use. They are reset whenever
+        a new dataset is loaded.
+        """
+        if self.event_aggregates is None:
+            self.event_aggregates = EventAggregates(dataset)
+        return self.event_aggregates
+
+    def add_samples(self, dataset, new_rows):
+        """
+        Adds the rows of one or more new samples to dataset and returns the combined dataset. Only the
+        cross-sample features of the events the new samples are part of are recomputed.
+        """
+        aggregates = self.get_event_aggregates(dataset)
+
+        # Step 1: Give the new rows the same per-row features and tag columns as the rest of the dataset, and
+        # nothing else
+        new_rows = new_rows[[column for column in new_rows.columns if column in dataset.columns]].copy()
+        self.ensure_features(new_rows, [name for name in FEATURES.features if name in dataset.columns])
+        for tag_column in ["event_tag", "neural_net_tag"] + MODEL_TAG_COLUMNS.values():
+            if tag_column in dataset.columns and tag_column not in new_rows.columns:
+                new_rows[tag_column] = TAG_NO_TAG
+
+        # Step 2: Update the aggregates of the affected events and write them to their rows. The new rows are labelled
+        # after the existing ones, which keep their labels, so state stored by row label (e.g. the models'
+        # probabilities and uncertainty) stays with its rows.
+        first_label = dataset.index.max() + 1 if len(dataset) > 0 else 0
+        new_rows.index = pd.RangeIndex(first_label, first_label + len(new_rows))
+        combined = pd.concat([dataset, new_rows])
+        affected = aggregates.add_rows(new_rows)
+        aggregates.apply(combined, affected)
+        self.event_matrix = None  # Rebuilt with the new samples on next use
+        self.tag_undo_stack = []  # Row positions have changed
+        self.tin_learner.invalidate_feature_matrix()
+        print "DataProcessor: Added %d rows, updated features of %d events" % (len(new_rows), len(affected))
+        return combined
+
+    def remove_samples(self, dataset, sample_names):
+        """
+        Removes the given samples from dataset and returns what's left. Only the cross-sample features of the
+        events those samples were part of are recomputed.
+        """
+        aggregates = self.get_event_aggregates(dataset)
+
+        removed_mask = dataset["name"].isin(sample_names)
+        remaining = dataset.loc[~removed_mask].copy()
+        affected = aggregates.remove_rows(dataset.loc[removed_mask], remaining)
+        aggregates.apply(remaining, affected)
+        self.event_matrix = None
+        self.tag_undo_stack = []
+        self.tin_learner.invalidate_feature_matrix()
+        print "DataProcessor: Removed %d rows, updated features of %d events" % (removed_mask.sum(), len(affected))
+        return remaining
+
     def save_filters(self, filters, filepath):
         """
         Saves the dataset filters, given in param filters, to disk, at location given by param filepath.
@@ -220,10 +427,30 @@ class TINDataProcessor(object):
             print "Error when reading filters from file: %s", e.message
             return None
 
+    def build_event_matrix(self, dataset, sample_names):
+        """
+        Builds the wide (event x sample) view of dataset used for per-event math and rendering. Called when a
+        dataset is loaded; tag edits made through set_tag_by_sample_name_and_as_id() keep it in sync.
+        """
+        print "DataProcessor: Building event matrix"
+        self.event_matrix = TINEventMatrix(dataset, sample_names)
+        return self.event_matrix
+
+    def get_event_matrix(self, dataset, sample_names):
+        """
+        Returns the event matrix of dataset, building it if there is none for these samples yet.
+        """
+        if self.event_matrix is None or self.event_matrix.sample_names != list(sample_names):
+            self.build_event_matrix(dataset, sample_names)
+        return self.event_matrix
+
     def is_event_reported_in_sample(self, sample_name, as_id, dataset):
         """
         Returns True if an event is reported for a given sample, otherwise returns False
         """
+        if self.event_matrix is not None and self.event_matrix.has_event(as_id) and sample_name in self.event_matrix.sample_index:
+            return bool(self.event_matrix.event_reported(as_id)[self.event_matrix.sample_index[sample_name]])
+
         event_sample_names = list(dataset.loc[dataset["as_id"] == as_id]["name"])
         return sample_name in event_sample_names
 
@@ -249,10 +476,33 @@ class TINDataProcessor(object):
         print "ERROR: No untagged events found"
         return as_id
 
+    def get_next_ranked_asid(self, ranking, as_id, dataset):
+        """
+        Returns the highest ranked as_id (see TINLearner.rank_events()) other than as_id that is in dataset and
+        still has untagged samples, or as_id itself if there is none.
+        """
+        candidates = ranking[np.in1d(ranking, dataset["as_id"].unique())]
+        for candidate in candidates:
+            if candidate == as_id:
+                continue
+            # Tags set since the ranking was made are checked in the event matrix
+            if self.event_matrix is not None and self.event_matrix.has_event(candidate):
+                untagged = self.event_matrix.event_reported(candidate) & (self.event_matrix.event_values("event_tag", candidate) == TAG_NO_TAG)
+                if not untagged.any():
+                    continue
+            return candidate
+
+        print "ERROR: No ranked untagged events found"
+        return as_id
+
     def get_tag_by_sample_name_and_as_id(self, sample_name, as_id, dataset):
         """
         Returns the tag for this as_id for the given sample.
         """
+        # The event matrix answers without searching the dataset
+        if self.event_matrix is not None and self.event_matrix.has_event(as_id) and sample_name in self.event_matrix.sample_index:
+            return self.event_matrix.get_tag(as_id, sample_name)
+
         try:
             tag = dataset.loc[(dataset["as_id"] == as_id) & (dataset["name"] == sample_name)]["event_tag"].iloc[0]
             #print "Found tag:", tag
@@ -265,6 +515,15 @@ class TINDataProcessor(object):
         Sets a given tag for this sample and this as_id
         """
 
+        # The event matrix knows the row index, and has to get the new tag as well
+        if self.event_matrix is not None and self.event_matrix.has_event(as_id) and sample_name in self.event_matrix.sample_index:
+            row_index = self.event_matrix.set_tag(as_id, sample_name, new_tag)
+            if row_index is None:
+                print "ERROR: Sample %s does not report as_id %d, can't set tag" % (sample_name, as_id)
+                return
+            dataset.set_value(row_index, "event_tag", new_tag)
+            return
+
         # Get index of the row in question
         try:
             row_index = dataset.loc[(dataset["as_id"] == as_id) & (dataset["name"] == sample_name)].index.tolist()[0]
@@ -274,6 +533,107 @@ class TINDataProcessor(object):
         except IndexError as e:
             print "ERROR: Can't find row index for sample %s, as_id %d. Message:\n%s" % (sample_name, as_id, e.message)
 
+    def bulk_set_tags(self, dataset, mask, tags):
+        """
+        Sets the event tag of every row of dataset where mask (a boolean array aligned with dataset's rows) is True,
+        in one assignment. tags is a single tag, or an array of tags aligned with dataset's rows. The change can be
+        undone as a whole with undo_bulk_set_tags(). Returns the positions of the rows tagged.
+        """
+        rows = np.flatnonzero(mask)
+        if len(rows) == 0:
+            return rows
+
+        if not np.isscalar(tags):
+            tags = np.asarray(tags)[rows]
+
+        # Step 1: Remember the old tags, dropping the oldest undo step if there are too many
+        tag_position = dataset.columns.get_loc("event_tag")
+        self.tag_undo_stack.append((rows, dataset["event_tag"].values[rows].copy()))
+        if len(self.tag_undo_stack) > self.max_tag_undo_steps:
+            self.tag_undo_stack.pop(0)
+
+        # Step 2: Write the new tags to the dataset and the event matrix
+        dataset.iloc[rows, tag_position] = tags
+        if self.event_matrix is not None:
+            self.event_matrix.set_column("event_tag", dataset)
+
+        print "DataProcessor: Bulk tagged %d rows" % len(rows)
+        return rows
+
+    def undo_bulk_set_tags(self, dataset):
+        """
+        Restores the tags changed by the last bulk_set_tags() call. Returns the number of rows restored, or None if
+        there is nothing to undo.
+        """
+        if len(self.tag_undo_stack) == 0:
+            return None
+
+        rows, previous_tags = self.tag_undo_stack.pop()
+        dataset.iloc[rows, dataset.columns.get_loc("event_tag")] = previous_tags
+        if self.event_matrix is not None:
+            self.event_matrix.set_column("event_tag", dataset)
+        return len(rows)
+
+    def get_event_mask(self, dataset, as_id):
+        """
+        Returns a boolean array telling which rows of dataset belong to an event.
+        """
+        return dataset["as_id"].values == as_id
+
+    def get_confident_prediction_mask(self, dataset, name, min_confidence):
+        """
+        Returns a boolean array telling which untagged rows of dataset the named model has predicted a tag for with
+        at least min_confidence (see TINLearner.set_probabilities()).
+        """
+        model_type = MODEL_TYPES[name]
+        if model_type.confidence_column not in dataset.columns:
+            return np.zeros(len(dataset), dtype=bool)
+
+        untagged = dataset["event_tag"].values == TAG_NO_TAG
+        predicted = dataset[model_type.tag_column].values > TAG_NO_TAG
+        # NaN confidence (not predicted) compares as False
+        with np.errstate(invalid="ignore"):
+            confident = dataset[model_type.confidence_column].values >= min_confidence
+        return untagged & predicted & confident
+
+    def predict_model_tags(self, name, dataset):
+        """
+        Predicts the tag of every row in dataset with the named model (see TINLearner.MODEL_TYPES) in one go, and
+        stores them in the model's tag column and in the event matrix. Returns False if the model has not been
+        trained.
+        """
+        predictions = self.tin_learner.predict_dataset(name, dataset)
+        if predictions is False:
+            print "ERROR: %s has not been fitted, yet attempted to predict value" % MODEL_TYPES[name].label
+            return False
+
+        self.store_predicted_tags(dataset, MODEL_TYPES[name].tag_column, predictions)
+        self.store_prediction_probabilities(dataset, name)
+        return True
+
+    def store_predicted_tags(self, dataset, tag_column, predictions):
+        """
+        Stores predicted tags (a Series aligned with dataset's index) in tag_column of dataset and of the event
+        matrix.
+        """
+        dataset[tag_column] = predictions
+        if self.event_matrix is not None:
+            self.event_matrix.set_column(tag_column, dataset)
+
+    def store_prediction_probabilities(self, dataset, name):
+        """
+        Copies the confidence and tag probabilities of the named model's predictions (see
+        TINLearner.set_probabilities()) into dataset, so they can be filtered and sorted on. They are NaN for rows
+        the model didn't predict.
+        """
+        probabilities = self.tin_learner.probabilities[name]
+        model_type = MODEL_TYPES[name]
+        for column in [model_type.confidence_column] + model_type.probability_columns:
+            if probabilities is not None:
+                dataset[column] = probabilities[column].reindex(dataset.index)
+            else:
+                dataset[column] = np.nan
+
     def get_row_data(self, as_id, dataset, sample_names, testing):
         """
         Returns formatted data for the current row index.
@@ -302,17 +662,13 @@ class TINDataProcessor(object):
                 }
         }
         """
+        # Per-event data comes from the event matrix, so the dataset isn't searched for every sample
+        matrix = self.get_event_matrix(dataset, sample_names)
+
         # Get information
-        event_df = dataset.loc[dataset["as_id"] == as_id]
-        splice_type = event_df["splice_type"].iloc[0]
-        gene_symbol = event_df["symbol"].iloc[0]
-        strand = event_df["strand"].iloc[0]
-        exons = event_df["exons"].iloc[0]
-        chrom = event_df["chr"].iloc[0]
-        prev_exon_name = event_df["prev_exon_name"].iloc[0]
-        next_exon_name = event_df["next_exon_name"].iloc[0]
-        prev_exon_id = event_df["start_ex"].iloc[0]
-        next_exon_id = event_df["end_ex"].iloc[0]
+        event_info = matrix.event_info.loc[as_id]
+        prev_exon_id = event_info["start_ex"]
+        next_exon_id = event_info["end_ex"]
 
         # Try int-casting exon IDs
         try:
@@ -324,83 +680,71 @@ class TINDataProcessor(object):
 
         # General row data
         row_data = {
-            "splice_type": splice_type,
-            "gene_symbol": gene_symbol,
-            "exons": exons,
-            "strand": strand,
+            "splice_type": event_info["splice_type"],
+            "gene_symbol": event_info["symbol"],
+            "exons": event_info["exons"],
+            "strand": event_info["strand"],
             "as_id": as_id,
             "prev_exon_id": prev_exon_id,
             "next_exon_id": next_exon_id,
-            "prev_exon_name": prev_exon_name,
-            "next_exon_name": next_exon_name,
-            "coords": event_df["coords"].iloc[0]
+            "prev_exon_name": event_info["prev_exon_name"],
+            "next_exon_name": event_info["next_exon_name"],
+            "coords": event_info["coords"]
         }
 
-        # TEST: Get predicted tags from decision tree
-        if self.enable_decision_tree:
-            decision_tree_tags = self.tin_learner.predict_tag_decision_tree(event_df)
-            # decision_tree_tags is either a dataframe or a boolean. Pandas throws a ValueError when checking the truth
-            # value of a dataframe, so we have to surround it with a try/catch
-            try:
-                if not decision_tree_tags:
-                    print "ERROR: Decision tree has not been fitted, yet attempted to predict value"
-                    event_df["decision_tree_tag"] = TAG_NO_TAG
-            except ValueError:
-                # Result is a dataframe
-                print "Decision tree prediction success"
-                event_df.is_copy = False  # Suppress the annoying SettingWithCopyWarning
-                event_df.loc[:, "decision_tree_tag"] = decision_tree_tags
-                print "TAGS ADDED TO DATASET. CURRENT DATASET TAGS:"
-                print event_df["decision_tree_tag"]
-                # TODO: At some point include the predicted tags in the TINTagger's original dataset
-        # END TEST
-
         ########################
         # Sample-specific data #
         ########################
+        reported = matrix.event_reported(as_id)
+        values = dict((column, matrix.event_values(column, as_id)) for column in matrix.values)
+        event_max = {
+            "max_gene_rpkm": matrix.event_max("rpkm", as_id),
+            "prev_exon_max_rpkm": matrix.event_max("prev_exon_rpkm", as_id),
+            "next_exon_max_rpkm": matrix.event_max("next_exon_rpkm", as_id),
+            "max_avg_rpkm": matrix.event_max("avg_rpkm", as_id)
+        }
+
         samples_data = {}
         for s_name in sample_names:
-
-            # Add entry for sample in the container
-            if s_name not in samples_data.keys():
-                samples_data[s_name] = {}
-
-            try:
-                # Get row for this sample
-                #sample_row = dataset.loc[(dataset["as_id"] == as_id) & (dataset["name"] == s_name)].iloc[0]
-                sample_row = event_df.loc[event_df["name"] == s_name].iloc[0]
-                # Find if sample is reported by SpliceSeq or not
-                samples_data[s_name]["is_reported"] = self.is_event_reported_in_sample(s_name, as_id, dataset)
-                samples_data[s_name]["gene_rpkm"] = sample_row["rpkm"]
-                samples_data[s_name]["max_gene_rpkm"] = sample_row["max_gene_rpkm"]
-                samples_data[s_name]["event_tag"] = sample_row["event_tag"]
-                samples_data[s_name]["prev_exon_rpkm"] = sample_row["prev_exon_rpkm"]
-                samples_data[s_name]["prev_exon_max_rpkm"] = sample_row["prev_exon_max_rpkm"]
-                samples_data[s_name]["next_exon_rpkm"] = sample_row["next_exon_rpkm"]
-                samples_data[s_name]["next_exon_max_rpkm"] = sample_row["next_exon_max_rpkm"]
-                samples_data[s_name]["avg_rpkm"] = sample_row["avg_rpkm"]
-                samples_data[s_name]["max_avg_rpkm"] = sample_row["max_avg_rpkm"]
-                samples_data[s_name]["psi"] = sample_row["psi"]
-                samples_data[s_name]["included_counts"] = sample_row["included_counts"]
-                samples_data[s_name]["excluded_counts"] = sample_row["excluded_counts"]
-                samples_data[s_name]["max_gene_rpkm"] = sample_row["max_gene_rpkm"]
-                samples_data[s_name]["decision_tree_prediction"] = sample_row["decision_tree_tag"]
-            except IndexError:
+            j = matrix.sample_index[s_name]
+
+            if reported[j]:
+                samples_data[s_name] = {
+                    "is_reported": True,
+                    "gene_rpkm": values["rpkm"][j],
+                    "max_gene_rpkm": event_max["max_gene_rpkm"],
+                    "event_tag": values["event_tag"][j],
+                    "prev_exon_rpkm": values["prev_exon_rpkm"][j],
+                    "prev_exon_max_rpkm": event_max["prev_exon_max_rpkm"],
+                    "next_exon_rpkm": values["next_exon_rpkm"][j],
+                    "next_exon_max_rpkm": event_max["next_exon_max_rpkm"],
+                    "avg_rpkm": values["avg_rpkm"][j],
+                    "max_avg_rpkm": event_max["max_avg_rpkm"],
+                    "psi": values["psi"][j],
+                    "included_counts": values["included_counts"][j],
+                    "excluded_counts": values["excluded_counts"][j],
+                    "decision_tree_prediction": values["decision_tree_tag"][j],
+                    "model_predictions": dict((name, values[model_type.tag_column][j]) for name, model_type in MODEL_TYPES.items())
+                }
+            else:
                 # Sample not present, fill with "blanks"
-                samples_data[s_name]["is_reported"] = False
-                samples_data[s_name]["gene_rpkm"] = 0
-                samples_data[s_name]["max_gene_rpkm"] = 0
-                samples_data[s_name]["event_tag"] = -1
-                samples_data[s_name]["prev_exon_rpkm"] = 0
-                samples_data[s_name]["prev_exon_max_rpkm"] = 0
-                samples_data[s_name]["next_exon_rpkm"] = 0
-                samples_data[s_name]["next_exon_max_rpkm"] = 0
-                samples_data[s_name]["avg_rpkm"] = 0
-                samples_data[s_name]["max_avg_rpkm"] = 0
-                samples_data[s_name]["psi"] = 0
-                samples_data[s_name]["included_counts"] = 0
-                samples_data[s_name]["excluded_counts"] = 0
-                samples_data[s_name]["max_gene_rpkm"] = 0
+                samples_data[s_name] = {
+                    "is_reported": False,
+                    "gene_rpkm": 0,
+                    "max_gene_rpkm": 0,
+                    "event_tag": -1,
+                    "prev_exon_rpkm": 0,
+                    "prev_exon_max_rpkm": 0,
+                    "next_exon_rpkm": 0,
+                    "next_exon_max_rpkm": 0,
+                    "avg_rpkm": 0,
+                    "max_avg_rpkm": 0,
+                    "psi": 0,
+                    "included_counts": 0,
+                    "excluded_counts": 0,
+                    "decision_tree_prediction": TAG_NO_TAG,
+                    "model_predictions": dict((name, TAG_NO_TAG) for name in MODEL_TYPES)
+                }
 
         row_data["samples"] = samples_data
 
@@ -425,8 +769,32 @@ class TINDataProcessor(object):
            },
            ...
         }
+
+        Results are served from the cache filled by prefetch_rpkm_for_mutually_exclusive_exons(). On a cache miss,
+        only this as_id is fetched. Like the cache, the result covers all samples of the dataset, not just
+        sample_names.
         """
         print "DataProcessor: get_rpkm_for_mutually_exclusive_exons"
+        if not self.is_me_exon_rpkm_cached(as_id, sample_names):
+            self.prefetch_rpkm_for_mutually_exclusive_exons(sample_names, [as_id])
+
+        return self.me_exon_rpkm_cache[as_id]
+
+    def prefetch_rpkm_for_mutually_exclusive_exons(self, sample_names, as_ids):
+        """
+        Fetches exon-level RPKM for all the given ME as_ids in a single query and stores the per-event results of
+        get_rpkm_for_mutually_exclusive_exons() in self.me_exon_rpkm_cache, keyed by as_id. The cache is keyed by
+        as_id alone, so events are always fetched for every sample of the dataset (plus any other sample in
+        sample_names), whichever samples the caller draws; the max RPKMs are taken over all of them too.
+        """
+        # Don't fetch events we already have
+        as_ids = [a for a in as_ids if not self.is_me_exon_rpkm_cached(a, sample_names)]
+        if len(as_ids) == 0:
+            return
+        sample_names = list(self.tin_tagger.sample_names) + [name for name in sample_names if name not in self.tin_tagger.sample_names]
+
+        print "DataProcessor: prefetching RPKM for %d mutually exclusive exons events" % len(as_ids)
+
         # Query the SpliceSeq DB
         query = """
         SELECT
@@ -447,31 +815,62 @@ class TINDataProcessor(object):
             ON e.exon_id=are.exon_id
         INNER JOIN as_ref AS ar
             ON ar.as_id=are.as_id
+        {sample_join}
         WHERE
-            are.as_id=%d
+            are.as_id IN({as_id_placeholders})
             AND
-            s.name IN(%s)
-        """ % (as_id, ", ".join('"' + s + '"' for s in sample_names))
+            {sample_where}
+        """
 
         # TODO: Handle some samples not being reported for
         if self.testing:
-            sample_names = ["sample%s" % str(x) for x in range(1, 11)]
-            df = pd.DataFrame({
-                "name": sample_names * 3,
-                "sample_id": [3, 4, 7, 8, 9, 10, 11, 12, 13, 14] * 3,
-                "exons": ["5|6.1:6.2"] * 30,
-                "as_id": [46834] * 30,
-                "exon_id": [169331] * 10 + [169332] * 10 + [169333] * 10,
-                "exon_name": ["5"] * 10 + ["6.1"] * 10 + ["6.2"] * 10,
-                "tot_reads": random.sample(range(0, 100), 30),
-                "rpkm": random.sample(range(200, 1000), 30)
-            })
+            n = len(sample_names)
+            df = pd.concat([pd.DataFrame({
+                "name": list(sample_names) * 3,
+                "sample_id": range(n) * 3,
+                "exons": ["5|6.1:6.2"] * (n * 3),
+                "as_id": [a] * (n * 3),
+                "exon_id": [169331] * n + [169332] * n + [169333] * n,
+                "exon_name": ["5"] * n + ["6.1"] * n + ["6.2"] * n,
+                "tot_reads": np.random.randint(0, 100, n * 3),
+                "rpkm": np.random.randint(200, 1000, n * 3)
+            }) for a in as_ids])
         else:
             # Read results into Pandas DataFrame
-            df = pd.read_sql_query(query, self.db)
+            with self.db_pool.connection() as db:
+                sample_join, sample_where, sample_params = self.get_sample_filter(db, sample_names, "s")
+                query = query.format(
+                    sample_join=sample_join,
+                    sample_where=sample_where,
+                    as_id_placeholders=", ".join(["%s"] * len(as_ids))
+                )
+                df = self.read_sql(query, db, [int(a) for a in as_ids] + sample_params)
+
+        # Split the result per event and cache it
+        event_dfs = dict(list(df.groupby("as_id")))
+        for as_id in as_ids:
+            event_df = event_dfs.get(as_id, df.iloc[0:0])
+            self.me_exon_rpkm_cache[as_id] = self.summarize_mutually_exclusive_exons_rpkm(event_df, sample_names)
+
+    def is_me_exon_rpkm_cached(self, as_id, sample_names):
+        """
+        Returns True if the cache has the ME exon RPKMs of an event for all the given samples.
+        """
+        if as_id not in self.me_exon_rpkm_cache:
+            return False
+        cached = self.me_exon_rpkm_cache[as_id]
+        return all(sample_name in cached for sample_name in sample_names)
+
+    def summarize_mutually_exclusive_exons_rpkm(self, df, sample_names):
+        """
+        Takes the exon-level rows for a single ME event and combines them per sample, in the format returned by
+        get_rpkm_for_mutually_exclusive_exons().
+        """
+        # Event not reported in any of the samples
+        if df.empty:
+            return {sample_name: {"is_reported": False} for sample_name in sample_names}
 
         # In ME events, there are always two main exons, first and second
-        # TODO: Handle possibility of result being empty DF
         affected_exons = df["exons"].iloc[0]
         first_main_exons, second_main_exons = affected_exons.split("|")  # Both may contain partials, e.g.: "5.1:5.2"
 
@@ -481,11 +880,11 @@ class TINDataProcessor(object):
 
         # Grab RPKM values for the different exons for each sample
         return_data = {}
+        reported_samples = set(df["name"].unique())
         for sample_name in sample_names:
-            # TODO: Handle the possibility of this not being reported for every sample
             # Allocate an entry for this sample in the return data
             return_data[sample_name] = {}
-            if sample_name not in list(df["name"].unique()):
+            if sample_name not in reported_samples:
                 # Sample not reported
                 return_data[sample_name]["is_reported"] = False
                 # Move on to next sample
@@ -526,21 +925,212 @@ class TINDataProcessor(object):
         # Finally, return the data
         return return_data
 
-    def get_dataset_from_database(self, db_url, db_user, db_pass, db_name, queue):
+    def connect_to_database(self, db_url, db_user, db_pass, db_name):
+        """
+        Replaces the current connection pool with one for the given database. Connections are opened on first use.
+        """
+        if self.db_pool is not None and self.db_pool.pid == os.getpid():
+            self.db_pool.close()
+        self.db_pool = ConnectionPool(db_url, db_user, db_pass, db_name, size=self.db_pool_size, timeout=self.db_checkout_timeout)
+
+    def get_dataset_from_database(self, db_url, db_user, db_pass, db_name, queue, sample_selection=None):
         """
         Queries the database to retrieve information about main exon PSI/RPKM and flanking exons RPKM.
+        sample_selection picks which samples to import, see select_samples(). Defaults to all samples.
         """
-        # Connect do database
+        # The tagger waits for something on the queue, so put False there whatever goes wrong
+        result = False
+
         try:
-            self.db = mysql.connect(db_url, db_user, db_pass, db_name)
+            self.connect_to_database(db_url, db_user, db_pass, db_name)
+
+            # Hold on to one connection for the whole import
+            with self.db_pool.connection() as db:
+                sample_names = self.select_samples(db, sample_selection)
+                if len(sample_names) == 0:
+                    print "ERROR: No samples selected for import"
+                    return
+                print "DataProcessor: Importing %d samples" % len(sample_names)
+
+                cache_key = self.get_import_cache_key(db_url, db_name, sample_names)
+                source_state = self.get_database_state(db)
+                final_df = self.read_import_cache(cache_key, source_state)
+                if final_df is None:
+                    final_df = self.import_dataset(db, sample_names)
+                    self.write_import_cache(cache_key, source_state, final_df)
+                result = final_df
         except mysql.OperationalError as e:
-            print "ERROR: Unable to connect to database:"
+            print "ERROR: Unable to query database:"
             print e.message
-            queue.put(False)
+        finally:
+            # Finally, add dataframe (or False) to queue
+            queue.put(result)
+
+    def read_sql(self, query, db, params=None):
+        """
+        Runs a parameterized query (MySQLdb %s-style placeholders) and returns the result as a DataFrame. If
+        self.explain_queries is set, the query plan is printed first.
+        """
+        if self.explain_queries:
+            print "EXPLAIN:"
+            print pd.read_sql_query("EXPLAIN " + query, db, params=params or None)
+        return pd.read_sql_query(query, db, params=params or None)
+
+    def get_sample_filter(self, db, sample_names, sample_alias="sample"):
+        """
+        Returns a (join clause, where clause, parameters) tuple restricting a query to the given samples. Short
+        sample lists become a parameterized IN-list. Long lists are inserted into a temporary table with the sample
+        name as primary key and joined on, since huge IN-lists are slow to parse and optimize. The temporary table
+        only lives on connection db, so the query must be run on the same connection.
+        """
+        if len(sample_names) <= self.sample_temp_table_threshold:
+            where = "%s.name IN(%s)" % (sample_alias, ", ".join(["%s"] * len(sample_names)))
+            return "", where, list(sample_names)
+
+        cursor = db.cursor()
+        cursor.execute("CREATE TEMPORARY TABLE IF NOT EXISTS selected_sample (name VARCHAR(255) NOT NULL PRIMARY KEY)")
+        cursor.execute("DELETE FROM selected_sample")
+        cursor.executemany("INSERT INTO selected_sample (name) VALUES (%s)", [(s,) for s in sample_names])
+        cursor.close()
+
+        join = "INNER JOIN selected_sample ON selected_sample.name=%s.name" % sample_alias
+        return join, "TRUE", []
+
+    def get_import_cache_key(self, db_url, db_name, sample_names):
+        """
+        Returns a fingerprint of an import: which database it reads, which samples, and with which importer version.
+        """
+        fingerprint = json.dumps([db_url, db_name, sorted(sample_names), IMPORTER_VERSION])
+        return hashlib.sha1(fingerprint).hexdigest()
+
+    def get_database_state(self, db):
+        """
+        Cheap probe of whether the source data has changed: newest sample and row counts of the main tables.
+        """
+        state = self.read_sql("""
+        SELECT
+            (SELECT MAX(sample_id) FROM sample) AS max_sample_id,
+            (SELECT COUNT(*) FROM sample) AS samples,
+            (SELECT COUNT(*) FROM as_ref) AS as_ref_rows,
+            (SELECT COUNT(*) FROM as_counts) AS as_counts_rows
+        """, db)
+        return {column: int(value) for column, value in state.iloc[0].fillna(-1).iteritems()}
+
+    def get_import_cache_paths(self, cache_key):
+        """
+        Returns paths of the cached dataset and its metadata for the given cache key. The dataset is stored as
+        Parquet if a Parquet engine is installed, otherwise it's pickled.
+        """
+        try:
+            import pyarrow
+            data_path = os.path.join(self.import_cache_dir, cache_key + ".parquet")
+        except ImportError:
+            data_path = os.path.join(self.import_cache_dir, cache_key + ".pkl")
+        return data_path, os.path.join(self.import_cache_dir, cache_key + ".json")
+
+    def read_import_cache(self, cache_key, source_state):
+        """
+        Returns the cached dataset for cache_key, or None if there is none or the database has changed since.
+        """
+        if not self.import_cache_enabled:
+            return None
+
+        data_path, metadata_path = self.get_import_cache_paths(cache_key)
+        try:
+            with open(metadata_path, "r") as infile:
+                metadata = json.load(infile)
+        except (IOError, ValueError):
+            return None
+
+        if metadata["source_state"] != source_state or not os.path.exists(data_path):
+            print "DataProcessor: Cached import is out of date"
+            return None
+
+        print "DataProcessor: Reading cached import from %s" % data_path
+        self.tin_tagger.set_statusbar_text("Reading cached dataset..")
+        if data_path.endswith(".parquet"):
+            return pd.read_parquet(data_path)
+        return pd.read_pickle(data_path)
+
+    def write_import_cache(self, cache_key, source_state, df):
+        """
+        Stores an imported dataset on disk, along with the database state it was imported from. The cache is only
+        an optimization, so any error is printed and otherwise ignored.
+        """
+        if not self.import_cache_enabled:
             return
 
-        # Sample names
-        sample_names = ["sample%s" % str(x) for x in range(1, 11)]
+        data_path, metadata_path = self.get_import_cache_paths(cache_key)
+        try:
+            if not os.path.isdir(self.import_cache_dir):
+                os.makedirs(self.import_cache_dir)
+
+            # Write to temporary files first, so a crash never leaves a half-written cache entry behind
+            if data_path.endswith(".parquet"):
+                df.to_parquet(data_path + ".tmp")
+            else:
+                df.to_pickle(data_path + ".tmp")
+            with open(metadata_path + ".tmp", "w") as outfile:
+                json.dump({"source_state": source_state, "created": time.time()}, outfile)
+            os.rename(data_path + ".tmp", data_path)
+            os.rename(metadata_path + ".tmp", metadata_path)
+        except Exception as e:
+            # E.g. pyarrow refusing a column of mixed types
+            print "Error when writing import cache: %s" % e
+            for path in [data_path + ".tmp", metadata_path + ".tmp"]:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def select_samples(self, db, sample_selection=None):
+        """
+        Returns the names of the samples to import, in database order. sample_selection may be:
+            - None or an empty string: all samples in the sample table
+            - A list of sample names
+            - A comma-separated string of sample names and/or glob patterns, e.g. "sample1, tumor_*"
+        """
+        all_sample_names = list(self.read_sql("SELECT name FROM sample ORDER BY sample_id", db)["name"])
+
+        if not sample_selection:
+            return all_sample_names
+
+        if isinstance(sample_selection, basestring):
+            patterns = [s.strip() for s in sample_selection.split(",") if s.strip()]
+        else:
+            patterns = list(sample_selection)
+
+        selected = set()
+        for pattern in patterns:
+            matches = fnmatch.filter(all_sample_names, pattern)
+            if len(matches) == 0:
+                print "WARNING: No samples matching <%s>" % pattern
+            selected.update(matches)
+
+        return [s for s in all_sample_names if s in selected]
+
+    def import_dataset(self, db, sample_names):
+        """
+        Runs the import queries on connection db, and merges and preprocesses the results into the final dataset.
+        Samples are fetched in groups of self.sample_batch_size, so query size and peak memory grow linearly with
+        the number of samples.
+        """
+        batches = []
+        for start in range(0, len(sample_names), self.sample_batch_size):
+            batch_names = sample_names[start:start + self.sample_batch_size]
+            self.tin_tagger.set_statusbar_text("Importing samples %d-%d of %d" % (start + 1, start + len(batch_names), len(sample_names)))
+            batches.append(self.import_sample_batch(db, batch_names))
+
+        self.tin_tagger.set_statusbar_text("Merging sample batches..")
+        unprocessed_final = pd.concat(batches, ignore_index=True)
+        del batches
+
+        return self.preprocess_imported_dataset(unprocessed_final)
+
+    def import_sample_batch(self, db, sample_names):
+        """
+        Runs the import queries for a group of samples and merges the results into one row per (as_id, sample).
+        Everything done here is local to a sample, so batches can simply be concatenated afterwards.
+        """
+        sample_join, sample_where, sample_params = self.get_sample_filter(db, sample_names)
 
         # Find RPKM for flanking exons
         flanking_exons_query = """
@@ -553,6 +1143,7 @@ class TINDataProcessor(object):
             ec2.tot_reads AS next_exon_tot_reads, ec2.rpkm AS next_exon_rpkm \
         FROM \
             sample \
+            {sample_join} \
             INNER JOIN as_counts ON as_counts.sample_id=sample.sample_id \
             INNER JOIN as_ref AS ar ON ar.as_id=as_counts.as_id \
             INNER JOIN exon AS ex1 ON ar.start_ex=ex1.exon_id \
@@ -560,10 +1151,10 @@ class TINDataProcessor(object):
             LEFT JOIN exon_counts AS ec1 ON (ar.start_ex=ec1.exon_id AND sample.sample_id=ec1.sample_id) \
             LEFT JOIN exon_counts AS ec2 ON (ar.end_ex=ec2.exon_id AND sample.sample_id=ec2.sample_id)
         WHERE \
-            sample.name IN(%s)
-        """ % (",".join('"' + s + '"' for s in sample_names))
+            {sample_where}
+        """.format(sample_join=sample_join, sample_where=sample_where)
         self.tin_tagger.set_statusbar_text("Querying for flanking exons RPKM")
-        flanking_exons_df = pd.read_sql_query(flanking_exons_query, self.db)
+        flanking_exons_df = self.read_sql(flanking_exons_query, db, sample_params)
 
         # Find PSI and included/excluded counts for main exon
         main_exon_query = """
@@ -575,17 +1166,18 @@ class TINDataProcessor(object):
             gc.rpkm
         FROM
             sample \
+            {sample_join} \
             INNER JOIN as_counts AS ac ON ac.sample_id=sample.sample_id \
             INNER JOIN as_ref AS ar ON ar.as_id=ac.as_id \
             INNER JOIN graph AS g ON g.graph_id=ar.graph_id \
             INNER JOIN gene_counts AS gc ON gc.graph_id=ar.graph_id AND gc.sample_id=sample.sample_id \
         WHERE \
-            sample.name IN(%s)
-        """ % (",".join('"' + s + '"' for s in sample_names))
+            {sample_where}
+        """.format(sample_join=sample_join, sample_where=sample_where)
 
         print "\nQuerying for main exon"
         self.tin_tagger.set_statusbar_text("Querying for main exon PSI")
-        main_exon_df = pd.read_sql_query(main_exon_query, self.db)
+        main_exon_df = self.read_sql(main_exon_query, db, sample_params)
 
         # Merge flanking exons data and main exons data together into a single dataset
         merged_df = main_exon_df.merge(flanking_exons_df, on=["sample_id", "as_id", "name", "exons", "splice_type"], how="outer")
@@ -598,16 +1190,17 @@ class TINDataProcessor(object):
             exon_counts.rpkm, exon_counts.tot_reads, \
             exon.exon_name, exon.chr_start, exon.chr_stop
         FROM sample \
+            {sample_join} \
             INNER JOIN as_counts ON as_counts.sample_id=sample.sample_id \
             INNER JOIN as_ref ON as_ref.as_id=as_counts.as_id \
             INNER JOIN as_ref_exon ON as_ref_exon.as_id=as_ref.as_id \
             LEFT JOIN exon_counts ON exon_counts.sample_id=sample.sample_id AND exon_counts.exon_id=as_ref_exon.exon_id \
             LEFT JOIN exon ON exon.exon_id=as_ref_exon.exon_id AND exon.graph_id=as_ref.graph_id
         WHERE \
-            sample.name IN(%s);
-        """ % (",".join('"' + s + '"' for s in sample_names))
+            {sample_where}
+        """.format(sample_join=sample_join, sample_where=sample_where)
         self.tin_tagger.set_statusbar_text("Querying for main exon RPKM")
-        main_exon_rpkm_df = pd.read_sql_query(main_exon_rpkm_query, self.db)
+        main_exon_rpkm_df = self.read_sql(main_exon_rpkm_query, db, sample_params)
         # Replace NaNs with 0 (IGV-lookup shows that non-reported RPKMs is due to zero read count)
         main_exon_rpkm_df["rpkm"].fillna(0, inplace=True)
         # Calc average RPKM for all main exons in each sample
@@ -623,8 +1216,12 @@ class TINDataProcessor(object):
 
         self.tin_tagger.set_statusbar_text("Merging datasets..")
         # Merge together datasets to include average RPKM for main exon
-        unprocessed_final = merged_df.merge(main_exon_rpkm_deduped, on=["name", "sample_id", "as_id"], how="inner")
+        return merged_df.merge(main_exon_rpkm_deduped, on=["name", "sample_id", "as_id"], how="inner")
 
+    def preprocess_imported_dataset(self, unprocessed_final):
+        """
+        Fills in missing values, fixes datatypes and computes the cross-sample columns of an imported dataset.
+        """
         # Drop NaNs in prev_exon_tot_reads, prev_exon_rpkm, next_exon_tot_reads, next_exon_rpkm
         final_df = unprocessed_final.copy()
         final_df["prev_exon_tot_reads"].fillna(0, inplace=True)
@@ -644,36 +1241,10 @@ class TINDataProcessor(object):
         final_df["tot_reads"].fillna(0, inplace=True)
         final_df["avg_tot_reads"].fillna(0, inplace=True)
 
-        # Count occurrences if not already done
-        if "occurrences" not in list(final_df.columns):
-            final_df["occurrences"] = final_df.groupby("as_id")["name"].transform(len)
-
         # Add event_tag column if not present
         if "event_tag" not in list(final_df.columns):
             final_df["event_tag"] = TAG_NO_TAG  # Default to no tag
 
-        self.tin_tagger.set_statusbar_text("Finding RPKM max. values and ratios.")
-
-        # Calc max RPKM for prev exon
-        final_df["prev_exon_max_rpkm"] = final_df.groupby("as_id")["prev_exon_rpkm"].transform(max)
-
-        # Calc max RPKM for next exon
-        final_df["next_exon_max_rpkm"] = final_df.groupby("as_id")["next_exon_rpkm"].transform(max)
-
-        # Calc max average RPKM for main exon
-        final_df["max_avg_rpkm"] = final_df.groupby("as_id")["avg_rpkm"].transform(max)
-
-        # Calc max gene RPKM
-        final_df["max_gene_rpkm"] = final_df.groupby("as_id")["rpkm"].transform(max)
-
-        # TEST: Fill NaNs in max_gene_rpkm
-        final_df["max_gene_rpkm"] = final_df.groupby("as_id")["max_gene_rpkm"].transform(lambda s: s.loc[s.first_valid_index()])
-        # END TEST
-
-        # Calc max PSI
-        self.tin_tagger.set_statusbar_text("Finding PSI max. values and ratios")
-        final_df["max_psi"] = final_df.groupby("as_id")["psi"].transform(max)
-
         # Create coords column
         final_df["coords"] = final_df["chr"].map(str) + ":" + final_df["chr_start"].map(str) + "-" + final_df["chr_stop"].map(str)
 
@@ -707,57 +1278,19 @@ class TINDataProcessor(object):
         for column_name, column_type in datatypes.items():
             final_df[column_name] = final_df[column_name].astype(column_type)
 
-        # Variables to be used for learning purposes # TODO: Division by zero errors
+        # Features used for filtering and learning
         print "Assigning variables for algo learning purposes"
-        # Percent of max PSI
-        final_df["percent_of_max_psi"] = final_df["psi"] / final_df["max_psi"]
-        final_df["percent_of_max_psi"].fillna(0, inplace=True)
-        # Percent of max RPKM
-        final_df["percent_of_max_rpkm"] = final_df["avg_rpkm"] / final_df["max_avg_rpkm"]
-        final_df["percent_of_max_rpkm"].fillna(0, inplace=True)
-        # Main exon to upstream RPKM ratio
-        final_df["main_rpkm_to_upstream_rpkm_ratio"] = final_df["avg_rpkm"] / final_df["prev_exon_rpkm"]
-        final_df["main_rpkm_to_upstream_rpkm_ratio"].fillna(0, inplace=True)
-        final_df["main_rpkm_to_upstream_rpkm_ratio"] = final_df["main_rpkm_to_upstream_rpkm_ratio"].replace(np.inf, 1)
-        # Main exon to downstream RPKM ratio
-        final_df["main_rpkm_to_downstream_rpkm_ratio"] = final_df["avg_rpkm"] / final_df["next_exon_rpkm"]
-        final_df["main_rpkm_to_downstream_rpkm_ratio"].fillna(0, inplace=True)
-        final_df["main_rpkm_to_downstream_rpkm_ratio"] = final_df["main_rpkm_to_downstream_rpkm_ratio"].replace(np.inf, 1)
-
-        # PSI diff (in percentage) from mean PSI in other samples
-        final_df["sum_psi_all_samples"] = final_df.groupby("as_id")["psi"].transform(sum)
-        final_df["sum_psi_other_samples"] = final_df["sum_psi_all_samples"] - final_df["psi"]
-        final_df["mean_psi_other_samples"] = final_df["sum_psi_other_samples"] / (final_df["occurrences"].astype(float) - 1)
-        # For events only occurring in 1 sample, mean_psi_other_samples will be np.inf. We'll replace them with 0s and
-        # just ignore occurrences < 4 or something when training algos.
-        final_df["mean_psi_other_samples"].replace(np.inf, 0.00)
-        final_df["psi_diff_from_mean_other_samples"] = final_df["psi"] - final_df["mean_psi_other_samples"]
-
-        # RPKM diff (in percentage) from mean RPKM in other samples
-        final_df["sum_rpkm_all_samples"] = final_df.groupby("as_id")["avg_rpkm"].transform(sum)
-        final_df["sum_rpkm_other_samples"] = final_df["sum_rpkm_all_samples"] - final_df["avg_rpkm"]
-        final_df["mean_rpkm_other_samples"] = final_df["sum_rpkm_other_samples"] / (final_df["occurrences"].astype(float) - 1)
-        # For events only occurring in 1 sample, mean_rpkm_other_samples will be np.inf. We'll replace them with 0s and
-        # just ignore occurrences < 4 or something when training algos.
-        final_df["mean_rpkm_other_samples"].replace(np.inf, 0.00)
-        final_df["rpkm_percentage_of_mean_other_samples"] = final_df["avg_rpkm"] / final_df["mean_rpkm_other_samples"]
-        final_df["rpkm_percentage_of_mean_other_samples"].replace(np.inf, 0.00)
-        final_df["rpkm_percentage_of_mean_other_samples"].fillna(0.00)
-
-        # One-hot encode splice_type column
-        self.tin_tagger.set_statusbar_text("One-hot encoding splice type column")
-        splicetype_dummies = pd.get_dummies(final_df.splice_type, prefix="splicetype", drop_first=True)
-        final_df = pd.concat([final_df, splicetype_dummies], axis=1)
+        self.tin_tagger.set_statusbar_text("Computing features")
+        self.ensure_features(final_df, FILTER_INT_FIELDS + FILTER_FLOAT_FIELDS + self.tin_learner.training_columns)
 
         # Columns for ML assigned tags
-        final_df["decision_tree_tag"] = TAG_NO_TAG
-        final_df["random_forest_tag"] = TAG_NO_TAG
+        for model_type in MODEL_TYPES.values():
+            final_df[model_type.tag_column] = TAG_NO_TAG
         final_df["neural_net_tag"] = TAG_NO_TAG
 
         self.tin_tagger.set_statusbar_text("Done fetching and preprocessing data.")
 
-        # Finally, add dataframe to queue
-        queue.put(final_df)
+        return final_df
 
 
 
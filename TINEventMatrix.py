@@ -0,0 +1,137 @@
+import numpy as np
+from TINTagColumns import MODEL_TAG_COLUMNS
+
+TAG_NO_TAG = -1
+
+# Per-sample columns held as (n_events, n_samples) arrays. Float columns are NaN where the event isn't reported
+# in a sample, count and tag columns use the given fill value instead.
+MATRIX_FLOAT_COLUMNS = ["psi", "rpkm", "avg_rpkm", "prev_exon_rpkm", "next_exon_rpkm"]
+MATRIX_INT_COLUMNS = [
+    ("included_counts", 0),
+    ("excluded_counts", 0),
+    ("event_tag", TAG_NO_TAG)
+] + [(tag_column, TAG_NO_TAG) for tag_column in MODEL_TAG_COLUMNS.values()]
+
+# Columns that are the same for every sample of an event, kept once per event
+EVENT_INFO_COLUMNS = ["splice_type", "symbol", "strand", "exons", "chr", "prev_exon_name", "next_exon_name", "start_ex", "end_ex", "coords"]
+
+
+class TINEventMatrix(object):
+    """
+    A wide view of a long-form dataset (one row per as_id and sample): every per-sample column becomes a 2-D array
+    with one row per event and one column per sample, next to a boolean reported-mask. Per-event math across
+    samples then becomes an array row or an axis reduction:
+
+        psi = matrix.event_values("psi", as_id)
+        max_psi = matrix.max_over_samples("psi")
+
+    The matrix keeps the dataset's row labels, so tag edits can be written to both without searching the dataset.
+    """
+
+    def __init__(self, dataset, sample_names):
+        # Step 1: Event and sample axes
+        self.as_ids = np.array(sorted(dataset["as_id"].unique()))
+        self.sample_names = list(sample_names)
+        self.event_index = dict((as_id, i) for i, as_id in enumerate(self.as_ids))
+        self.sample_index = dict((name, j) for j, name in enumerate(self.sample_names))
+        shape = (len(self.as_ids), len(self.sample_names))
+
+        # Step 2: Position of every dataset row in the matrix. Rows of samples not on the sample axis are left out.
+        rows = np.searchsorted(self.as_ids, dataset["as_id"].values)
+        columns = dataset["name"].map(self.sample_index)
+        in_matrix = columns.notnull().values
+        rows = rows[in_matrix]
+        columns = columns.values[in_matrix].astype(int)
+        self.rows, self.columns, self.in_matrix = rows, columns, in_matrix  # Kept for set_column()
+
+        self.reported = np.zeros(shape, dtype=bool)
+        self.reported[rows, columns] = True
+        self.row_labels = np.full(shape, -1, dtype=np.int64)
+        self.row_labels[rows, columns] = dataset.index.values[in_matrix]
+
+        # Step 3: Scatter the per-sample columns into the arrays.
+        # Columns the dataset doesn't have are left at their fill value.
+        self.values = {}
+        for column in MATRIX_FLOAT_COLUMNS:
+            self.values[column] = np.full(shape, np.nan)
+            if column in dataset.columns:
+                self.values[column][rows, columns] = dataset[column].values[in_matrix].astype(float)
+        for column, fill_value in MATRIX_INT_COLUMNS:
+            self.values[column] = np.full(shape, fill_value, dtype=np.int64)
+            if column in dataset.columns:
+                self.set_column(column, dataset)
+
+        # Step 4: Per-event information, taken from each event's first row
+        info_columns = [column for column in EVENT_INFO_COLUMNS if column in dataset.columns]
+        self.event_info = dataset.drop_duplicates("as_id").set_index("as_id")[info_columns]
+
+    def set_column(self, column, dataset):
+        """
+        Copies an integer column (counts or tags) from dataset into the matrix. dataset must be the one the matrix
+        was built from, with its rows unchanged.
+        """
+        fill_value = dict(MATRIX_INT_COLUMNS)[column]
+        values = dataset[column].fillna(fill_value).values[self.in_matrix].astype(np.int64)
+        self.values[column][self.rows, self.columns] = values
+
+    def has_event(self, as_id):
+        return as_id in self.event_index
+
+    def event_values(self, column, as_id):
+        """
+        Returns the values of column for all samples of an event, in sample order.
+        """
+        return self.values[column][self.event_index[as_id]]
+
+    def event_reported(self, as_id):
+        """
+        Returns a boolean array telling which samples report the event.
+        """
+        return self.reported[self.event_index[as_id]]
+
+    def event_max(self, column, as_id):
+        """
+        Returns the largest value of column among the samples reporting an event, or NaN if there is none.
+        """
+        values = self.event_values(column, as_id)[self.event_reported(as_id)]
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return np.nan
+        return values.max()
+
+    def max_over_samples(self, column):
+        """
+        Returns the largest value of column per event, ignoring NaNs and samples that don't report it. Events
+        without any value get NaN.
+        """
+        values = np.where(self.reported & ~np.isnan(self.values[column]), self.values[column], -np.inf)
+        maxima = values.max(axis=1) if values.shape[1] > 0 else np.full(values.shape[0], -np.inf)
+        maxima[np.isneginf(maxima)] = np.nan
+        return maxima
+
+    def sum_over_samples(self, column):
+        """
+        Returns the sum of column per event over the samples that report it, treating NaNs as 0.
+        """
+        return np.where(self.reported, np.nan_to_num(self.values[column]), 0).sum(axis=1)
+
+    def occurrences(self):
+        """
+        Returns the number of samples reporting each event.
+        """
+        return self.reported.sum(axis=1)
+
+    def get_tag(self, as_id, sample_name):
+        return self.values["event_tag"][self.event_index[as_id], self.sample_index[sample_name]]
+
+    def set_tag(self, as_id, sample_name, tag, column="event_tag"):
+        """
+        Sets a tag in the matrix and returns the dataset row label of that event and sample, or None if the sample
+        doesn't report the event.
+        """
+        i = self.event_index[as_id]
+        j = self.sample_index[sample_name]
+        if not self.reported[i, j]:
+            return None
+        self.values[column][i, j] = tag
+        return self.row_labels[i, j]
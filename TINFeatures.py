@@ -0,0 +1,508 @@
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+
+# Per-event maximum columns: (source column, max column)
+EVENT_MAX_COLUMNS = [
+    ("prev_exon_rpkm", "prev_exon_max_rpkm"),
+    ("next_exon_rpkm", "next_exon_max_rpkm"),
+    ("avg_rpkm", "max_avg_rpkm"),
+    ("rpkm", "max_gene_rpkm"),
+    ("psi", "max_psi")
+]
+
+# Per-event sum columns: (source column, sum column)
+EVENT_SUM_COLUMNS = [
+    ("psi", "sum_psi_all_samples"),
+    ("avg_rpkm", "sum_rpkm_all_samples")
+]
+
+# Columns compared to the other samples of the same event: (source column, prefix of the feature names)
+LEAVE_ONE_OUT_COLUMNS = [
+    ("psi", "psi"),
+    ("avg_rpkm", "rpkm")
+]
+
+
+def group_by_event(df):
+    """
+    Factorizes the as_id column once. Returns (codes, counts, order, starts), where codes maps every row to its
+    event number, counts is the number of rows per event, order sorts rows so that each event is a contiguous slice,
+    and starts is the position of each event's first row in that order.
+    """
+    codes, uniques = pd.factorize(df["as_id"].values)
+    counts = np.bincount(codes, minlength=len(uniques))
+    order = np.argsort(codes, kind="mergesort")
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return codes, counts, order, starts
+
+
+def leave_one_out_stats(values, codes, counts):
+    """
+    Statistics of every row's value against the other rows of the same event ("the other samples"). codes and
+    counts are as returned by group_by_event(). NaN values count as 0 in the sums. Returns a dictionary of arrays,
+    one value per row:
+        - sum_other: Sum of the other samples
+        - mean_other: Mean of the other samples (0 if the event only occurs in this sample)
+        - std_other: Standard deviation (population) of the other samples
+        - zscore: (value - mean_other) / std_other (0 where std_other is 0)
+        - rank: Rank of the value within the event, 1 being the highest
+    """
+    filled_values = np.nan_to_num(np.asarray(values, dtype=float))
+
+    # Two passes: the event means first, then the sums of the deviations from them
+    shift = (np.bincount(codes, weights=filled_values, minlength=len(counts)) / counts)[codes]
+    deviations = filled_values - shift
+    sum_all = np.bincount(codes, weights=deviations, minlength=len(counts))[codes]
+    sum_squares_all = np.bincount(codes, weights=deviations * deviations, minlength=len(counts))[codes]
+    stats = leave_one_out_from_sums(values, sum_all, sum_squares_all, counts[codes], shift, codes)
+
+    # Sort by event, then by descending value, and number the rows within each event
+    rank_order = np.lexsort((-filled_values, codes))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    rank = np.empty(len(filled_values), dtype=int)
+    rank[rank_order] = np.arange(len(filled_values)) - starts[codes[rank_order]] + 1
+    stats["rank"] = rank
+
+    return stats
+
+
+def leave_one_out_from_sums(values, sum_all, sum_squares_all, count_all, shift=0.0, codes=None):
+    """
+    The part of leave_one_out_stats() that only needs each row's value and its event's sum, sum of squares and
+    row count. The sums are of value - shift, where shift is a value per row close to its event's values (e.g. the
+    event mean), so that large values with a small spread don't cancel out in the variance. With shift 0 they are
+    plain sums. If codes (see group_by_event()) are given for values, rows whose own value makes up nearly all of
+    their event's sum of squares get the standard deviation of the other samples from their values instead, see
+    exact_std_other(). Returns sum_other, mean_other, std_other and zscore.
+    """
+    values = np.asarray(values, dtype=float)
+    shift = np.asarray(shift, dtype=float)
+    deviations = np.nan_to_num(values) - shift
+    n_other = np.asarray(count_all, dtype=float) - 1.0
+    has_others = n_other > 0
+
+    sum_other_deviations = sum_all - deviations
+    mean_other_deviation = np.zeros(len(values))
+    np.divide(sum_other_deviations, n_other, out=mean_other_deviation, where=has_others)
+    sum_other = sum_other_deviations + n_other * shift
+    mean_other = np.where(has_others, mean_other_deviation + shift, 0.0)
+
+    # Variance of the other samples as E[d^2] - E[d]^2 of the deviations d from shift. Rounding can leave it slightly
+    # negative, or a tiny residue where all other samples are equal, so it's clamped at 0 and a standard deviation
+    # below 1e-7 of the mean counts as 0.
+    mean_squares_other = np.zeros(len(values))
+    np.divide(sum_squares_all - deviations * deviations, n_other, out=mean_squares_other, where=has_others)
+    std_other = np.maximum(mean_squares_other - mean_other_deviation * mean_other_deviation, 0.0)
+
+    # Leaving out such a row cancels out all but a few digits of the others' variance
+    imprecise = np.array([], dtype=int)
+    if codes is not None:
+        imprecise = np.flatnonzero(has_others & (n_other * std_other < 1e-6 * sum_squares_all))
+
+    std_other[std_other <= 1e-14 * mean_other * mean_other] = 0
+    np.sqrt(std_other, out=std_other)
+    if len(imprecise) > 0:
+        std_other[imprecise] = exact_std_other(values, codes, imprecise)
+
+    zscore = np.zeros(len(values))
+    np.divide((values - shift) - mean_other_deviation, std_other, out=zscore, where=std_other > 0)
+
+    return {
+        "sum_other": sum_other,
+        "mean_other": mean_other,
+        "std_other": std_other,
+        "zscore": zscore
+    }
+
+
+def exact_std_other(values, codes, rows):
+    """
+    Standard deviation (population) of the other samples of each of the given rows, computed from the values of
+    the other rows with the same code. NaN values count as 0.
+    """
+    filled_values = np.nan_to_num(np.asarray(values, dtype=float))
+
+    # Positions of the rows of the events involved, by code
+    event_rows = np.flatnonzero(np.isin(codes, codes[rows]))
+    event_rows = event_rows[np.argsort(codes[event_rows], kind="mergesort")]
+    event_codes, starts = np.unique(codes[event_rows], return_index=True)
+    rows_by_code = dict(zip(event_codes, np.split(event_rows, starts[1:])))
+
+    std_other = np.empty(len(rows))
+    for i, row in enumerate(rows):
+        others = rows_by_code[codes[row]]
+        std_other[i] = filled_values[others[others != row]].std()
+    return std_other
+
+
+class EventGroups(object):
+    """
+    The per-event grouping of a dataset's rows (see group_by_event()), computed once and shared by all features
+    computed in the same FeatureRegistry.ensure() call. Intermediate results used by several features, like the
+    leave-one-out statistics, are memoized here as well.
+    """
+
+    def __init__(self, df):
+        self.codes, self.counts, self.order, self.starts = group_by_event(df)
+        self.cache = {}
+
+    def memoize(self, key, function):
+        if key not in self.cache:
+            self.cache[key] = function()
+        return self.cache[key]
+
+    def broadcast(self, per_event_values):
+        """
+        Returns per-event values repeated for every row of the event.
+        """
+        return per_event_values[self.codes]
+
+    def max(self, values):
+        """
+        Max of values per event, broadcast to the rows. NaNs are skipped, as in pandas' groupby max.
+        """
+        sorted_values = np.asarray(values, dtype=float)[self.order]
+        return self.broadcast(np.fmax.reduceat(sorted_values, self.starts))
+
+    def sum(self, values):
+        """
+        Sum of values per event, broadcast to the rows. NaNs count as 0.
+        """
+        weights = np.nan_to_num(np.asarray(values, dtype=float))
+        return self.broadcast(np.bincount(self.codes, weights=weights, minlength=len(self.counts)))
+
+    def leave_one_out(self, df, column):
+        return self.memoize(("leave_one_out", column), lambda: leave_one_out_stats(df[column].values, self.codes, self.counts))
+
+
+class Feature(object):
+    """
+    A derived column: its name, the columns it is computed from, and a vectorized function compute(df, groups)
+    returning the column values for all rows of df, where groups is an EventGroups for df.
+    """
+
+    def __init__(self, name, dependencies, compute):
+        self.name = name
+        self.dependencies = dependencies
+        self.compute = compute
+
+
+class FeatureRegistry(object):
+    """
+    Declares how every derived column is computed, so that a dataset only gets the features somebody asks for,
+    from whatever columns its source provided. Computed features are stored as columns on the dataset itself, so
+    asking again is free.
+    """
+
+    def __init__(self):
+        self.features = OrderedDict()
+
+    def register(self, name, dependencies, compute):
+        self.features[name] = Feature(name, dependencies, compute)
+
+    def ensure(self, df, names, recompute=False):
+        """
+        Makes sure df has all columns in names, computing missing features and the features they depend on, in
+        place. Columns already present are kept, unless recompute is set, in which case the requested features and
+        their derived dependencies are computed anew (e.g. after rows have been added). Returns the names that
+        could not be provided, because they are not registered or depend on columns df doesn't have.
+        """
+        state = {"done": set(), "groups": None}
+        return [name for name in names if not self.compute_feature(df, name, recompute, state)]
+
+    def compute_feature(self, df, name, recompute, state):
+        if name in state["done"]:
+            return True
+
+        is_registered = name in self.features
+        if name in df.columns and not (recompute and is_registered):
+            state["done"].add(name)
+            return True
+
+        if not is_registered:
+            return False
+
+        feature = self.features[name]
+        for dependency in feature.dependencies:
+            if not self.compute_feature(df, dependency, recompute, state):
+                return False
+
+        if len(df) == 0:
+            df[name] = np.nan
+        else:
+            if state["groups"] is None:
+                state["groups"] = EventGroups(df)
+            df[name] = feature.compute(df, state["groups"])
+
+        state["done"].add(name)
+        return True
+
+    def compute(self, df, names):
+        """
+        Computes the given features in place, assuming their dependencies are already present in df.
+        """
+        groups = EventGroups(df) if len(df) > 0 else None
+        for name in names:
+            df[name] = self.features[name].compute(df, groups) if groups is not None else np.nan
+
+
+def ratio(numerator, denominator, nan_value=0, inf_value=None):
+    """
+    Returns a compute function for numerator / denominator, with NaNs (0/0) replaced by nan_value and, if given,
+    infinities (x/0) replaced by inf_value.
+    """
+    def compute(df, groups):
+        values = df[numerator] / df[denominator]
+        if inf_value is not None:
+            values = values.replace(np.inf, inf_value)
+        return values.fillna(nan_value)
+    return compute
+
+
+FEATURES = FeatureRegistry()
+
+# Number of samples an event is present in
+FEATURES.register("occurrences", ["as_id"], lambda df, groups: groups.broadcast(groups.counts))
+
+# Max values per event
+for column, max_column in EVENT_MAX_COLUMNS:
+    FEATURES.register(max_column, [column], lambda df, groups, column=column: groups.max(df[column].values))
+
+# Sums per event
+for column, sum_column in EVENT_SUM_COLUMNS:
+    FEATURES.register(sum_column, [column], lambda df, groups, column=column: groups.sum(df[column].values))
+
+# Ratios
+FEATURES.register("percent_of_max_psi", ["psi", "max_psi"], ratio("psi", "max_psi"))
+FEATURES.register("percent_of_max_rpkm", ["avg_rpkm", "max_avg_rpkm"], ratio("avg_rpkm", "max_avg_rpkm"))
+FEATURES.register("main_rpkm_to_upstream_rpkm_ratio", ["avg_rpkm", "prev_exon_rpkm"], ratio("avg_rpkm", "prev_exon_rpkm", inf_value=1))
+FEATURES.register("main_rpkm_to_downstream_rpkm_ratio", ["avg_rpkm", "next_exon_rpkm"], ratio("avg_rpkm", "next_exon_rpkm", inf_value=1))
+
+# Main exon PSI and RPKM compared to the other samples of the same event. Events that only occur in one sample
+# get 0 for the means and everything derived from them.
+for column, prefix in LEAVE_ONE_OUT_COLUMNS:
+    FEATURES.register("sum_%s_other_samples" % prefix, [column], lambda df, groups, column=column: groups.leave_one_out(df, column)["sum_other"])
+    FEATURES.register("mean_%s_other_samples" % prefix, [column], lambda df, groups, column=column: groups.leave_one_out(df, column)["mean_other"])
+    FEATURES.register("std_%s_other_samples" % prefix, [column], lambda df, groups, column=column: groups.leave_one_out(df, column)["std_other"])
+    FEATURES.register("%s_zscore_other_samples" % prefix, [column], lambda df, groups, column=column: groups.leave_one_out(df, column)["zscore"])
+    FEATURES.register("%s_rank_in_event" % prefix, [column], lambda df, groups, column=column: groups.leave_one_out(df, column)["rank"])
+
+
+def psi_diff_from_mean_other_samples(df, groups):
+    return df["psi"].values - groups.leave_one_out(df, "psi")["mean_other"]
+
+
+def rpkm_percentage_of_mean_other_samples(df, groups):
+    mean_other = groups.leave_one_out(df, "avg_rpkm")["mean_other"]
+    percentage = np.zeros(len(df))
+    np.divide(df["avg_rpkm"].values.astype(float), mean_other, out=percentage, where=mean_other != 0)
+    return np.nan_to_num(percentage)
+
+
+FEATURES.register("psi_diff_from_mean_other_samples", ["psi"], psi_diff_from_mean_other_samples)
+FEATURES.register("rpkm_percentage_of_mean_other_samples", ["avg_rpkm"], rpkm_percentage_of_mean_other_samples)
+
+# One-hot encoded splice type
+for splice_type in ["AA", "AD", "AP", "AT", "ES", "ME", "RI"]:
+    FEATURES.register("splicetype_%s" % splice_type, ["splice_type"], lambda df, groups, splice_type=splice_type: (df["splice_type"] == splice_type).astype(int))
+
+
+class EventAggregates(object):
+    """
+    Running per-event aggregates of a dataset: row count, sums and sums of squares of the leave-one-out columns, and
+    the largest and second-largest value of every max column. Adding or removing the rows of a sample then only
+    updates the aggregates of the events that sample is part of, instead of regrouping the whole dataset. The
+    second-largest value lets the max survive the removal of its row; once used it's marked stale, and only
+    re-read from the dataset if a later removal needs it.
+
+    The sums are of the deviations from a per-event shift, the event's mean when it was first summarized (see
+    leave_one_out_from_sums()). When removals move an event's mean far from its shift, its sums are re-read from the
+    dataset with a new shift instead of being left to cancel out.
+    """
+
+    def __init__(self, df):
+        self.max_sources = [column for column, max_column in EVENT_MAX_COLUMNS]
+        self.sum_sources = sorted(set([column for column, sum_column in EVENT_SUM_COLUMNS] + [column for column, prefix in LEAVE_ONE_OUT_COLUMNS]))
+        self.table = self.summarize(df)
+
+    def summarize(self, rows, shifts=None):
+        """
+        Computes the aggregates of the given rows, one row per as_id. The sums are taken around the shift_* columns
+        of shifts for the events it has, and around the mean of the rows for the others.
+        """
+        table = pd.DataFrame({"count": rows.groupby("as_id").size()})
+        for column in self.sum_sources:
+            values = rows[column].fillna(0).astype(float)
+            event_shift = values.groupby(rows["as_id"]).mean()
+            if shifts is not None:
+                event_shift = shifts["shift_" + column].reindex(table.index).fillna(event_shift)
+            deviations = values.values - event_shift.reindex(rows["as_id"].values).values
+            table["shift_" + column] = event_shift
+            table["sum_" + column] = pd.Series(deviations, index=rows.index).groupby(rows["as_id"]).sum()
+            table["sumsq_" + column] = pd.Series(deviations * deviations, index=rows.index).groupby(rows["as_id"]).sum()
+        for column in self.max_sources:
+            first, second = self.top_two(rows, column)
+            table["max1_" + column] = first
+            table["max2_" + column] = second
+            table["stale_" + column] = False
+        return table
+
+    def top_two(self, rows, column):
+        """
+        Returns the largest and second-largest value of column per as_id, skipping NaNs.
+        """
+        ordered = rows[["as_id", column]].sort_values(["as_id", column], ascending=[True, False], na_position="last")
+        position = ordered.groupby("as_id").cumcount().values
+        first = ordered.loc[position == 0].set_index("as_id")[column]
+        second = ordered.loc[position == 1].set_index("as_id")[column]
+        return first, second
+
+    def add_rows(self, rows):
+        """
+        Adds the aggregates of rows, e.g. the rows of a new sample. Returns the as_ids whose aggregates changed.
+        """
+        added = self.summarize(rows, self.table)
+        affected = added.index
+        table = self.table.reindex(self.table.index.union(affected))
+        table["count"] = table["count"].fillna(0)
+        for column in self.sum_sources:
+            table["sum_" + column] = table["sum_" + column].fillna(0)
+            table["sumsq_" + column] = table["sumsq_" + column].fillna(0)
+        current = table.loc[affected]
+
+        table.loc[affected, "count"] = current["count"].values + added["count"].values
+        for column in self.sum_sources:
+            # New events keep the shift of their first rows
+            table.loc[affected, "shift_" + column] = added["shift_" + column].values
+            for prefix in ["sum_", "sumsq_"]:
+                table.loc[affected, prefix + column] = current[prefix + column].values + added[prefix + column].values
+
+        for column in self.max_sources:
+            max1, max2 = current["max1_" + column].values, current["max2_" + column].values
+            added_max1, added_max2 = added["max1_" + column].values, added["max2_" + column].values
+            stale = current["stale_" + column].fillna(False).values.astype(bool)
+            # The new second-largest is the smaller of the two maxima or the larger of the two runner-ups. np.minimum
+            # keeps NaN (no rows yet), so an event's first rows don't count their own max twice.
+            table.loc[affected, "max1_" + column] = np.fmax(max1, added_max1)
+            table.loc[affected, "max2_" + column] = np.fmax(np.minimum(max1, added_max1), np.fmax(max2, added_max2))
+            # An unknown runner-up stays unknown, unless the new rows pushed the old max down to second place
+            table.loc[affected, "stale_" + column] = stale & ~(added_max1 >= max1)
+
+        table["count"] = table["count"].astype(int)
+        self.table = table
+        return affected
+
+    def remove_rows(self, rows, remaining):
+        """
+        Removes the aggregates of rows, which must already be gone from the dataset remaining. Returns the as_ids
+        whose aggregates changed and that still have rows.
+        """
+        removed = self.summarize(rows, self.table)
+        affected = removed.index
+        current = self.table.loc[affected]
+
+        self.table.loc[affected, "count"] = current["count"].values - removed["count"].values
+        for column in self.sum_sources:
+            for prefix in ["sum_", "sumsq_"]:
+                self.table.loc[affected, prefix + column] = current[prefix + column].values - removed[prefix + column].values
+
+        # Events that lost all their rows are gone
+        self.table = self.table.loc[self.table["count"] > 0]
+        affected = affected[affected.isin(self.table.index)]
+        current = current.loc[affected]
+        removed = removed.loc[affected]
+
+        # Re-read the sums of events whose mean moved so far from their shift (compared to the spread of their values)
+        # that the variance would cancel out, e.g. after removing an outlier. This includes events left with only
+        # equal values.
+        counts = self.table.loc[affected, "count"].values.astype(float)
+        drifted = np.zeros(len(affected), dtype=bool)
+        for column in self.sum_sources:
+            sums = self.table.loc[affected, "sum_" + column].values
+            sum_squares = self.table.loc[affected, "sumsq_" + column].values
+            mean_deviation = sums / counts
+            spread = np.maximum(sum_squares - sums * mean_deviation, 0)
+            drifted |= mean_deviation * mean_deviation * counts > 1e4 * spread
+        rescan = affected[drifted]
+        if len(rescan) > 0:
+            rescanned = self.summarize(remaining.loc[remaining["as_id"].isin(rescan)])
+            for column in self.sum_sources:
+                for prefix in ["shift_", "sum_", "sumsq_"]:
+                    self.table.loc[rescan, prefix + column] = rescanned[prefix + column].reindex(rescan).values
+
+        for column in self.max_sources:
+            max1, max2 = current["max1_" + column].values, current["max2_" + column].values
+            stale = current["stale_" + column].values.astype(bool)
+            removed_max = removed["max1_" + column].values
+            single_removal = removed["count"].values == 1
+
+            # Removed values below the max (or only NaNs) don't change it, but may have included the runner-up
+            removed_nothing = np.isnan(removed_max)
+            keeps_max = removed_nothing | (removed_max < max1)
+            runner_up_gone = keeps_max & ~removed_nothing & ~(removed_max < max2)
+            self.table.loc[affected[runner_up_gone], "stale_" + column] = True
+
+            # The max itself was removed: promote the runner-up if it's known and nothing else was removed
+            promote = ~keeps_max & single_removal & ~stale
+            self.table.loc[affected[promote], "max1_" + column] = max2[promote]
+            self.table.loc[affected[promote], "stale_" + column] = True
+
+            # Otherwise, read the top two values of just these events from the dataset again
+            rescan = affected[~keeps_max & ~promote]
+            if len(rescan) > 0:
+                first, second = self.top_two(remaining.loc[remaining["as_id"].isin(rescan)], column)
+                self.table.loc[rescan, "max1_" + column] = first.reindex(rescan).values
+                self.table.loc[rescan, "max2_" + column] = second.reindex(rescan).values
+                self.table.loc[rescan, "stale_" + column] = False
+
+        return affected
+
+    def apply(self, df, as_ids):
+        """
+        Writes occurrences, max_*, sum_* and the features derived from them to the rows of df belonging to the given
+        events, in place. Only columns df already has are written.
+        """
+        mask = df["as_id"].isin(as_ids).values
+        if not mask.any():
+            return
+
+        aggregates = self.table.loc[df["as_id"].values[mask]]
+        codes = pd.factorize(df["as_id"].values[mask])[0]
+        updates = {"occurrences": aggregates["count"].values}
+        for column, max_column in EVENT_MAX_COLUMNS:
+            updates[max_column] = aggregates["max1_" + column].values
+        for column, sum_column in EVENT_SUM_COLUMNS:
+            updates[sum_column] = aggregates["sum_" + column].values + aggregates["count"].values * aggregates["shift_" + column].values
+
+        # Comparisons to the other samples follow from the sums
+        leave_one_out = {}
+        for column, prefix in LEAVE_ONE_OUT_COLUMNS:
+            leave_one_out[column] = leave_one_out_from_sums(
+                df[column].values[mask],
+                aggregates["sum_" + column].values,
+                aggregates["sumsq_" + column].values,
+                aggregates["count"].values,
+                aggregates["shift_" + column].values,
+                codes
+            )
+            updates["sum_%s_other_samples" % prefix] = leave_one_out[column]["sum_other"]
+            updates["mean_%s_other_samples" % prefix] = leave_one_out[column]["mean_other"]
+            updates["std_%s_other_samples" % prefix] = leave_one_out[column]["std_other"]
+            updates["%s_zscore_other_samples" % prefix] = leave_one_out[column]["zscore"]
+        updates["psi_diff_from_mean_other_samples"] = df["psi"].values[mask] - leave_one_out["psi"]["mean_other"]
+        rpkm_mean_other = leave_one_out["avg_rpkm"]["mean_other"]
+        rpkm_percentage = np.zeros(mask.sum())
+        np.divide(df["avg_rpkm"].values[mask].astype(float), rpkm_mean_other, out=rpkm_percentage, where=rpkm_mean_other != 0)
+        updates["rpkm_percentage_of_mean_other_samples"] = np.nan_to_num(rpkm_percentage)
+
+        for name, values in updates.items():
+            if name in df.columns:
+                df.loc[mask, name] = values
+
+        # Features that need the updated maxima or a look at the whole event, recomputed for these events only
+        derived = [name for name in ["percent_of_max_psi", "percent_of_max_rpkm", "psi_rank_in_event", "rpkm_rank_in_event"] if name in df.columns]
+        if len(derived) > 0:
+            events = df.loc[mask].copy()
+            FEATURES.compute(events, derived)
+            df.loc[mask, derived] = events[derived].values
@@ -1,6 +1,376 @@
 from sklearn.tree import DecisionTreeClassifier, export_graphviz
-from sklearn.model_selection import train_test_split
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.pipeline import Pipeline
+from sklearn.model_selection import train_test_split, GridSearchCV, GroupKFold, ParameterGrid
 from sklearn.exceptions import NotFittedError
+import numpy as np
+import pandas as pd
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from TINTagColumns import MODEL_TAG_COLUMNS
+
+try:
+    import joblib
+except ImportError:
+    # Older scikit-learn versions ship their own copy
+    from sklearn.externals import joblib
+
+try:
+    from sklearn.ensemble import HistGradientBoostingClassifier
+except ImportError:
+    try:
+        # scikit-learn 0.21 - 0.23 have it as an experimental feature
+        from sklearn.experimental import enable_hist_gradient_boosting
+        from sklearn.ensemble import HistGradientBoostingClassifier
+    except ImportError:
+        HistGradientBoostingClassifier = None
+
+TAG_NO_TAG = -1
+TAG_INTERESTING = 0
+TAG_NOT_INTERESTING = 1
+TAG_UNCERTAIN = 2
+ALL_TAGS = [TAG_INTERESTING, TAG_NOT_INTERESTING, TAG_UNCERTAIN]
+TAG_COLUMN_NAMES = ["interesting", "not_interesting", "uncertain"]  # Used in column names, in the order of ALL_TAGS
+
+# Bump whenever the saved model format changes, so old model files are not loaded
+MODEL_FORMAT_VERSION = 4
+
+# Ways to rank events for active learning, see uncertainty_from_probabilities()
+UNCERTAINTY_MEASURES = OrderedDict([("least_confident", "Least confident"), ("margin", "Smallest margin")])
+
+
+class ModelType(object):
+    """
+    A kind of model TINLearner can train: how to create one, which hyperparameters to search, and which dataset
+    columns its predicted tags and their probabilities are stored in. Models that use all cores themselves (parallel=True) are
+    cross-validated one fold at a time, so the cores aren't oversubscribed. Incremental models (incremental=True)
+    can also be updated with just the newest tags, see partial_fit_model().
+    """
+
+    def __init__(self, name, label, tag_column, create_estimator, param_grid, parallel=False, incremental=False):
+        self.name = name
+        self.label = label
+        self.tag_column = tag_column
+        # Probability of the predicted tag, and of each tag in ALL_TAGS
+        self.confidence_column = "%s_confidence" % name
+        self.probability_columns = ["%s_probability_%s" % (name, tag_name) for tag_name in TAG_COLUMN_NAMES]
+        self.create_estimator = create_estimator  # Called with n_jobs, returns an unfitted estimator
+        self.param_grid = param_grid
+        self.parallel = parallel
+        self.incremental = incremental
+
+
+def create_gradient_boosting(n_jobs):
+    """
+    Histogram-based gradient boosting if this scikit-learn has it (it bins features and uses all cores), otherwise
+    the exact, single-core implementation.
+    """
+    if HistGradientBoostingClassifier is not None:
+        return HistGradientBoostingClassifier()
+    return GradientBoostingClassifier()
+
+
+def create_online_model(n_jobs):
+    """
+    A linear model trained with stochastic gradient descent on standardized features. Both steps support
+    partial_fit(), so it can learn from a few new tags at a time. The modified Huber loss gives class probabilities.
+    """
+    return Pipeline([
+        ("scaler", StandardScaler()),
+        ("classifier", SGDClassifier(loss="modified_huber"))
+    ])
+
+
+def partial_fit_model(model, features, tags):
+    """
+    Updates a model made by create_online_model() with new tagged rows.
+    """
+    scaler = model.named_steps["scaler"]
+    scaler.partial_fit(features)
+    model.named_steps["classifier"].partial_fit(scaler.transform(features), tags, classes=ALL_TAGS)
+    return model
+
+
+MODEL_TYPES = OrderedDict([
+    ("decision_tree", ModelType(
+        "decision_tree", "Decision tree", MODEL_TAG_COLUMNS["decision_tree"],
+        lambda n_jobs: DecisionTreeClassifier(),
+        {
+            "max_depth": [None, 4, 8, 16],
+            "min_samples_leaf": [1, 5, 20],
+            "class_weight": [None, "balanced"]
+        }
+    )),
+    ("random_forest", ModelType(
+        "random_forest", "Random forest", MODEL_TAG_COLUMNS["random_forest"],
+        lambda n_jobs: RandomForestClassifier(n_estimators=200, n_jobs=n_jobs),
+        {
+            "max_depth": [None, 16],
+            "min_samples_leaf": [1, 5],
+            "class_weight": [None, "balanced"]
+        },
+        parallel=True
+    )),
+    ("gradient_boosting", ModelType(
+        "gradient_boosting", "Gradient boosting", MODEL_TAG_COLUMNS["gradient_boosting"],
+        create_gradient_boosting,
+        {
+            "learning_rate": [0.05, 0.1],
+            "max_depth": [3, 6]
+        },
+        parallel=HistGradientBoostingClassifier is not None
+    )),
+    ("online", ModelType(
+        "online", "Online linear model", MODEL_TAG_COLUMNS["online"],
+        create_online_model,
+        {
+            "classifier__alpha": [0.0001, 0.001, 0.01]
+        },
+        incremental=True
+    ))
+])
+
+
+def fit_model(model_type, features, tags, groups, search_settings, report_status=None):
+    """
+    Searches the hyperparameter grid of model_type for the model with the best cross-validated accuracy, and
+    returns that model fitted on all rows together with its scores. Folds are split by groups (the rows' as_ids), so
+    the samples of one event never end up on both sides of a split. report_status, if given, is called with a short
+    description of each step.
+
+    search_settings is a dict with keys "cv_folds" and "n_jobs", see TINLearner.get_search_settings().
+    """
+    n_jobs = search_settings["n_jobs"]
+
+    # Can't have more folds than events
+    cv_folds = min(search_settings["cv_folds"], len(np.unique(groups)))
+    if cv_folds < 2:
+        # Everything is from one event, so fall back to a single split
+        if report_status is not None:
+            report_status("fitting on %d tagged rows" % len(features))
+        training_features, validation_features, training_tags, validation_tags = train_test_split(features, tags, test_size=0.2)
+        model = model_type.create_estimator(n_jobs)
+        model.fit(training_features, training_tags)
+        scores = {"mean": model.score(validation_features, validation_tags), "std": 0.0, "folds": 1, "params": {}}
+        print "%s prediction accuracy: %s" % (model_type.label, format_scores(scores))
+        return model, scores
+
+    if report_status is not None:
+        report_status("searching %d parameter combinations with %d-fold cross-validation on %d tagged rows" % (
+            len(ParameterGrid(model_type.param_grid)), cv_folds, len(features)))
+    search = GridSearchCV(
+        model_type.create_estimator(n_jobs),
+        model_type.param_grid,
+        cv=GroupKFold(n_splits=cv_folds),
+        n_jobs=1 if model_type.parallel else n_jobs,
+        refit=True
+    )
+    search.fit(features, tags, groups=groups)
+
+    scores = {
+        "mean": float(search.cv_results_["mean_test_score"][search.best_index_]),
+        "std": float(search.cv_results_["std_test_score"][search.best_index_]),
+        "folds": cv_folds,
+        "params": search.best_params_
+    }
+    print "%s prediction accuracy: %s, parameters: %s" % (model_type.label, format_scores(scores), scores["params"])
+    return search.best_estimator_, scores
+
+
+def format_scores(scores):
+    """
+    Formats the scores returned by fit_model() for display.
+    """
+    if scores["folds"] < 2:
+        return "%.2f" % scores["mean"]
+    return "%.2f +/- %.2f (%d-fold CV)" % (scores["mean"], scores["std"], scores["folds"])
+
+
+def predict_in_chunks(model, features, chunk_size, progress_callback=None):
+    """
+    Predicts the tags of all rows in features, chunk_size rows at a time, along with the probability of every tag
+    and how unsure the model is of each prediction (see uncertainty_from_probabilities()). progress_callback, if
+    given, is called with the number of rows done after each chunk.
+
+    :return: The predicted tags, a dict with an array per measure in UNCERTAINTY_MEASURES, and a float32 array
+    with a column per tag in ALL_TAGS holding its probability. Tags the model was never trained on get 0.
+    """
+    predictions = np.full(len(features), TAG_NO_TAG, dtype=int)
+    uncertainty = dict((measure, np.zeros(len(features))) for measure in UNCERTAINTY_MEASURES)
+    all_probabilities = np.zeros((len(features), len(ALL_TAGS)), dtype=np.float32)
+    tag_columns = [ALL_TAGS.index(tag) for tag in model.classes_]
+    for start in range(0, len(features), chunk_size):
+        stop = min(start + chunk_size, len(features))
+        # The predicted tag is the most probable class, so one predict_proba() gives all three
+        probabilities = model.predict_proba(features[start:stop])
+        predictions[start:stop] = model.classes_[probabilities.argmax(axis=1)]
+        all_probabilities[start:stop, tag_columns] = probabilities
+        for measure, values in uncertainty_from_probabilities(probabilities).items():
+            uncertainty[measure][start:stop] = values
+        if progress_callback is not None:
+            progress_callback(stop)
+    return predictions, uncertainty, all_probabilities
+
+
+def uncertainty_from_probabilities(probabilities):
+    """
+    Turns class probabilities (one row per sample) into uncertainty scores, where higher means the model is less
+    sure and a tag would teach it more:
+        - least_confident: 1 - probability of the most likely class
+        - margin: 1 - difference between the two most likely classes
+    """
+    ordered = np.sort(probabilities, axis=1)
+    top = ordered[:, -1]
+    second = ordered[:, -2] if ordered.shape[1] > 1 else np.zeros(len(ordered))
+    return {"least_confident": 1.0 - top, "margin": 1.0 - (top - second)}
+
+
+def tree_contributions(tree_model, features, class_columns):
+    """
+    Splits the class probabilities a fitted decision tree gives each row of features into a bias (the
+    probabilities at the root) plus one contribution per feature: every split on a row's path from the root to its
+    leaf changes the probabilities, and the change is credited to the feature that was split on. The bias plus the
+    contributions summed over the features equals the tree's predicted probabilities.
+
+    class_columns gives the column in ALL_TAGS of each of the tree's classes.
+
+    :return: The bias (one value per tag in ALL_TAGS), and an array of shape (rows, features, tags).
+    """
+    tree = tree_model.tree_
+    node_values = tree.value[:, 0, :]
+    node_probabilities = np.zeros((tree.node_count, len(ALL_TAGS)))
+    node_probabilities[:, class_columns] = node_values / node_values.sum(axis=1)[:, np.newaxis]
+
+    # Parent of every node. The root is its own parent, so it adds nothing below.
+    parents = np.zeros(tree.node_count, dtype=int)
+    is_split = tree.children_left > -1
+    parents[tree.children_left[is_split]] = np.flatnonzero(is_split)
+    parents[tree.children_right[is_split]] = np.flatnonzero(is_split)
+
+    # Every (row, node) pair on the decision paths, all rows at once
+    paths = tree_model.decision_path(features).tocoo()
+    rows, nodes = paths.row, paths.col
+    below_root = nodes != 0
+    rows, nodes = rows[below_root], nodes[below_root]
+
+    contributions = np.zeros((len(features), features.shape[1], len(ALL_TAGS)))
+    np.add.at(contributions, (rows, tree.feature[parents[nodes]]), node_probabilities[nodes] - node_probabilities[parents[nodes]])
+    return node_probabilities[0], contributions
+
+
+def explain_predictions(model, features):
+    """
+    Predicts the tags of features and splits each prediction into per-feature contributions, see
+    tree_contributions(). Forests average the contributions of their trees. Returns None for models that aren't
+    made of decision trees.
+
+    :return: The predicted tags, their probabilities (a column per tag in ALL_TAGS), the bias and the
+    contributions, or None.
+    """
+    class_columns = [ALL_TAGS.index(tag) for tag in model.classes_]
+    if isinstance(model, DecisionTreeClassifier):
+        bias, contributions = tree_contributions(model, features, class_columns)
+    elif isinstance(model, RandomForestClassifier):
+        # The trees of a forest know their classes by position in the forest's classes_
+        bias = np.zeros(len(ALL_TAGS))
+        contributions = np.zeros((len(features), features.shape[1], len(ALL_TAGS)))
+        for tree_model in model.estimators_:
+            tree_bias, tree_contribution = tree_contributions(tree_model, features, [class_columns[int(i)] for i in tree_model.classes_])
+            bias += tree_bias
+            contributions += tree_contribution
+        bias /= len(model.estimators_)
+        contributions /= len(model.estimators_)
+    else:
+        return None
+
+    # Same pass: the probabilities are the bias plus all contributions
+    probabilities = bias + contributions.sum(axis=1)
+    predictions = np.array(ALL_TAGS)[probabilities.argmax(axis=1)]
+    return predictions, probabilities, bias, contributions
+
+
+def rank_events(scores, as_ids, untagged):
+    """
+    Ranks events for active learning: most informative first. An event scores the highest uncertainty (see
+    uncertainty_from_probabilities()) among its untagged samples; events without any untagged, predicted sample are
+    left out. scores, as_ids and untagged are arrays with one value per row. Returns an array of as_ids.
+    """
+    usable = untagged & ~np.isnan(scores)
+    event_scores = pd.Series(scores[usable]).groupby(as_ids[usable]).max()
+    return event_scores.sort_values(ascending=False).index.values
+
+
+def rank_events_by_measure(uncertainty, as_ids, untagged):
+    """
+    Ranks events with rank_events() by every measure in UNCERTAINTY_MEASURES. uncertainty is a dict with an array
+    per measure, as returned by predict_in_chunks(). Returns a dict with the ranking per measure.
+    """
+    return dict((measure, rank_events(uncertainty[measure], as_ids, untagged)) for measure in UNCERTAINTY_MEASURES)
+
+
+def train_models_worker(model_names, features, tags, groups, prediction_features, ranking_data, search_settings, chunk_size, queue):
+    """
+    Trains the given models (names in MODEL_TYPES) one after the other, and predicts the tags of
+    prediction_features with each. The events are then ranked for active learning by each model's uncertainty,
+    with the as_ids and untagged arrays in ranking_data (see TINLearner.get_ranking_data()). Meant to run in its
+    own process: it only gets numpy arrays, and reports back through queue with these messages:
+
+        ("status", <text>)                                  Progress to show in the status bar
+        ("done", <name>, <model>, <scores>, <predictions>, <uncertainty>, <probabilities>, <ranking>)
+                                                            A model is trained, see fit_model() for the scores,
+                                                            predict_in_chunks() for the predictions and
+                                                            rank_events_by_measure() for the ranking
+        ("error", <name>, <text>)                           A model failed to train
+        ("finished",)                                       All models are done
+    """
+    for name in model_names:
+        model_type = MODEL_TYPES[name]
+
+        def report_status(text):
+            queue.put(("status", "Training %s: %s.." % (model_type.label.lower(), text)))
+
+        def report_progress(rows_done):
+            report_status("predicted %d of %d rows" % (rows_done, len(prediction_features)))
+
+        try:
+            model, scores = fit_model(model_type, features, tags, groups, search_settings, report_status)
+            report_status("predicting")
+            predictions, uncertainty, probabilities = predict_in_chunks(model, prediction_features, chunk_size, report_progress)
+            ranking = rank_events_by_measure(uncertainty, *ranking_data)
+            queue.put(("done", name, model, scores, predictions, uncertainty, probabilities, ranking))
+        except Exception as e:
+            queue.put(("error", name, str(e)))
+
+    queue.put(("finished",))
+
+
+def update_model_worker(name, model, features, tags, refit, prediction_features, ranking_data, chunk_size, queue):
+    """
+    Updates an incremental model (see partial_fit_model()) with new tagged rows, or if refit is set fits it anew on
+    all tagged rows, predicts the tags of prediction_features and ranks the events by its uncertainty. Meant to run in its own process, and reports back
+    with the same messages as train_models_worker(). The scores in the "done" message are None, as the update isn't
+    cross-validated.
+    """
+    label = MODEL_TYPES[name].label.lower()
+    try:
+        if refit:
+            queue.put(("status", "Fitting %s on %d tags.." % (label, len(features))))
+            model.fit(features, tags)
+        else:
+            queue.put(("status", "Updating %s with %d tags.." % (label, len(features))))
+            partial_fit_model(model, features, tags)
+        predictions, uncertainty, probabilities = predict_in_chunks(model, prediction_features, chunk_size)
+        ranking = rank_events_by_measure(uncertainty, *ranking_data)
+        queue.put(("done", name, model, None, predictions, uncertainty, probabilities, ranking))
+    except Exception as e:
+        queue.put(("error", name, str(e)))
+
+    queue.put(("finished",))
 
 
 class TINLearner(object):
@@ -8,7 +378,46 @@ class TINLearner(object):
     def __init__(self, tin_dataprocessor):
         self.data_processor = tin_dataprocessor
         self.tag_column = "event_tag"
-        self.decision_tree = DecisionTreeClassifier()
+        self.prediction_chunk_size = 50000  # Rows per predict() call when predicting a whole dataset
+
+        # Trained models by name (see MODEL_TYPES), None until trained or loaded
+        self.enabled_models = list(MODEL_TYPES.keys())
+        self.models = dict((name, None) for name in MODEL_TYPES)
+
+        # Saved models, one per model and dataset. model_info describes each current model if it was trained or loaded.
+        self.model_dir = os.path.join(os.path.expanduser("~"), ".tin_tagger", "models")
+        self.model_info = dict((name, None) for name in MODEL_TYPES)
+
+        # Active learning: per-row uncertainty of each model's predictions (a DataFrame aligned with the dataset,
+        # see predict_in_chunks()), and the model whose uncertainty decides which event to show next
+        self.uncertainty = dict((name, None) for name in MODEL_TYPES)
+        self.active_learning_model = "random_forest"
+        self.rankings = dict((name, None) for name in MODEL_TYPES)  # Events ranked by each measure, see rank_events_by_measure()
+
+        # Per-row confidence and tag probabilities of each model's predictions (a DataFrame aligned with the
+        # dataset, with the model's confidence_column and probability_columns), see set_probabilities()
+        self.probabilities = dict((name, None) for name in MODEL_TYPES)
+
+        # Explanations of explanation_model's predictions, by as_id, see explain_events(). Only kept for the events
+        # around the one being shown, and dropped whenever that model changes.
+        self.explanation_model = "decision_tree"
+        self.explanations = {}
+        self.explanation_top_features = 5
+        self.explanation_prefetch_window = 100  # Number of events to explain in one batch, from the current one on
+
+        # Incremental learning: incremental models are updated with every online_update_interval new tags
+        self.online_learning_enabled = True
+        self.online_update_interval = 10
+        self.stale_incremental_models = set()  # Models that learned tags since taken back, see retract_incremental_tags()
+
+        # Feature matrix of the training columns, see get_feature_matrix()
+        self.feature_matrix = None
+        self.feature_matrix_finite = None  # True for rows whose features were all finite before sanitising
+        self.feature_matrix_dataset = None  # Dataset the matrix was built from
+
+        # Cross-validated hyperparameter search, run on all cores
+        self.cv_folds = 5
+        self.n_jobs = -1
 
         # Present columns to include in training
         self.training_columns = [
@@ -43,7 +452,8 @@ class TINLearner(object):
     def prepare_dataset(self, dataset):
         """
         Prepares dataset for training. Ensures all appropriate columns are present
-        in the dataset. Extract only events that have been tagged.
+        in the dataset. Extract only events that have been tagged and have finite features, or
+        returns False if there are too few of them.
         """
         # TODO: Sanitize column names and dataset size
 
@@ -72,6 +482,9 @@ class TINLearner(object):
         # Extract events that have been tagged
         tagged_events = dataset.loc[dataset[self.tag_column] > -1]  # -1 means they're not tagged. 0, 1, 2 are valid tags.
         tagged_events = tagged_events.loc[tagged_events["occurrences"] > 1]  # NaNs are present if event's only present in a single sample
+        # Rows with missing or infinite feature values can't be trained on
+        features, finite = self.get_feature_matrix(dataset)
+        tagged_events = tagged_events.loc[finite[dataset.index.get_indexer(tagged_events.index)]]
         print "Tagged events:", len(tagged_events)
         minimum_tagged_events = 20
         if len(tagged_events) < minimum_tagged_events:
@@ -79,66 +492,380 @@ class TINLearner(object):
 
         return tagged_events
 
-    def train_decision_tree(self, dataset):
+    def get_training_data(self, dataset):
         """
-        Trains a decision tree on the provided dataset.
+        Returns the feature matrix, tags and as_ids (for grouping cross-validation folds) of the tagged rows in
+        dataset, as numpy arrays, or False if there are too few tagged events to train on.
         """
 
+        # Compute any training features the dataset is missing
+        self.data_processor.ensure_features(dataset, self.training_columns)
+
         # Get a sanitized dataset. This returns False if there are too few event tags to train the tree
-        dataset = self.prepare_dataset(dataset)
+        tagged_events = self.prepare_dataset(dataset)
 
         try:
-            if not dataset:
+            if not tagged_events:
                 print "Cannot train decision tree: Too few tagged events"
                 return False
         except ValueError:
-            # It's a dataframe, not a boolean, which means training succeeded. Continue operation
+            # It's a dataframe, not a boolean, which means there is enough to train on. Continue operation
             pass
 
-        # Split data into training set and validation set
-        training_set, validation_set = train_test_split(dataset, test_size=0.2)
+        features, finite = self.get_feature_matrix(dataset)
+        rows = dataset.index.get_indexer(tagged_events.index)
+        return features[rows], tagged_events[self.tag_column].values.astype(int), tagged_events["as_id"].values
+
+    def get_prediction_data(self, dataset):
+        """
+        Returns the feature matrix of the rows in dataset that can be predicted, and their positions in dataset.
+        Events found in a single sample, and rows with missing feature values, are left out.
+        """
+        features, finite = self.get_feature_matrix(dataset)
+
+        # Same rule as for training: single-sample events have too many NaNs to say anything about
+        predictable = (dataset["occurrences"].values > 1) & finite
+        predictable_rows = np.flatnonzero(predictable)
+        if len(predictable_rows) == len(dataset):
+            return features, predictable_rows
+        return features[predictable_rows], predictable_rows
 
-        # TEST
-        #print "Training set:"
-        #print training_set
-        #print "\nValidation set:"
-        #print validation_set
-        # END TEST
+    def get_ranking_data(self, dataset, rows):
+        """
+        Returns the as_ids of the given rows (positions in dataset) and whether each is untagged, for ranking the
+        events in a training or update process. See rank_events().
+        """
+        return dataset["as_id"].values[rows], dataset[self.tag_column].values[rows] == TAG_NO_TAG
 
-        # Fit tree
-        self.decision_tree.fit(training_set[self.training_columns], training_set[self.tag_column])
+    def get_feature_matrix(self, dataset):
+        """
+        Returns the training columns of dataset as a C-contiguous float32 matrix with one row per dataset row (by
+        position), and a boolean array telling which rows had only finite feature values. NaN and inf are
+        replaced by 0 in the matrix, so rows that weren't finite must be left out using that array.
 
-        # Test accuracy of tree
-        score = self.decision_tree.score(validation_set[self.training_columns], validation_set[self.tag_column])
+        The matrix is built once per dataset and reused until invalidate_feature_matrix() is called. It must not
+        be modified.
+        """
+        if self.feature_matrix is not None and self.feature_matrix_dataset is dataset and len(self.feature_matrix) == len(dataset):
+            return self.feature_matrix, self.feature_matrix_finite
+
+        self.data_processor.ensure_features(dataset, self.training_columns)
 
-        print "Decision tree prediction accuracy: %.2f" % score
+        # Step 1: Copy the columns one by one into a float32 matrix, instead of going through a mixed-dtype block
+        features = np.empty((len(dataset), len(self.training_columns)), dtype=np.float32)
+        with np.errstate(over="ignore", invalid="ignore"):
+            for i, column in enumerate(self.training_columns):
+                features[:, i] = dataset[column].values
 
-        # Training successful, return accuracy
-        return score
+        # Step 2: Sanitise. Values too large for float32 became inf in the copy, and are left out too.
+        finite = np.isfinite(features)
+        finite_rows = finite.all(axis=1)
+        features[~finite] = 0
 
-    def predict_tag_decision_tree(self, event_df):
+        self.feature_matrix = features
+        self.feature_matrix_finite = finite_rows
+        self.feature_matrix_dataset = dataset
+        print "TINLearner: Built %d x %d feature matrix" % features.shape
+        return features, finite_rows
+
+    def invalidate_feature_matrix(self):
+        """
+        Drops the cached feature matrix, and the explanations made from it. Call when the feature values of the
+        dataset change in place.
         """
-        Takes an event DataFrame and predicts the value of event_tag column
+        self.feature_matrix = None
+        self.feature_matrix_finite = None
+        self.feature_matrix_dataset = None
+        self.explanations = {}
 
-        :return: False if tree has not yet been fitted, np.array of tags if it has been fitted.
+    @property
+    def decision_tree(self):
+        return self.models["decision_tree"]
+
+    def get_row_training_data(self, dataset, row_labels):
+        """
+        Returns the feature matrix and tags of the given rows (index labels of dataset) that are tagged and can be
+        trained on, as get_training_data() does for the whole dataset.
         """
+        features, finite = self.get_feature_matrix(dataset)
+
+        positions = dataset.index.get_indexer(row_labels)
+        positions = positions[positions > -1]
+        tags = dataset[self.tag_column].values[positions]
+        usable = (tags > TAG_NO_TAG) & (dataset["occurrences"].values[positions] > 1) & finite[positions]
+        return features[positions[usable]], tags[usable].astype(int)
 
-        # Only predict if the event occurs in more than one sample (otherwise a lot of the params are NaNs)
-        if event_df["occurrences"].iloc[0] <= 1:
-            print "Occurrence == 1, cancelling prediction."
+    def can_update_incrementally(self, name):
+        """
+        Returns True if the named model can learn new tags with partial_fit_model(). Models fitted from scratch
+        (with fit()) only know the tags they were trained on, and have to be refitted to learn other tags.
+        """
+        model = self.models[name]
+        if not MODEL_TYPES[name].incremental or model is None or name in self.stale_incremental_models:
             return False
+        return sorted(model.classes_) == sorted(ALL_TAGS)
 
+    def retract_incremental_tags(self):
+        """
+        Marks the incremental models as having learned tags that have since been undone. They can't unlearn them, so
+        they're fitted anew on all tags when they're next updated.
+        """
+        self.stale_incremental_models = set(name for name in MODEL_TYPES if MODEL_TYPES[name].incremental and self.models[name] is not None)
+
+    def create_model(self, name):
+        return MODEL_TYPES[name].create_estimator(self.n_jobs)
+
+    def set_model(self, name, model):
+        """
+        Replaces a model with one trained elsewhere, e.g. in a training process.
+        """
+        self.models[name] = model
+        self.model_info[name] = None  # Set again by save_model() or load_model()
+        self.uncertainty[name] = None  # Set again by set_uncertainty() or load_model()
+        self.rankings[name] = None
+        self.probabilities[name] = None  # Set again by set_probabilities() or load_model()
+        self.stale_incremental_models.discard(name)
+        if name == self.explanation_model:
+            self.explanations = {}
+
+    def train_model(self, name, dataset):
+        """
+        Trains the named model on the provided dataset.
+        """
+        training_data = self.get_training_data(dataset)
+        if not training_data:
+            return False
+
+        # Fit a new model, and only replace the current one when it's done
+        features, tags, groups = training_data
+        model, scores = fit_model(MODEL_TYPES[name], features, tags, groups, self.get_search_settings())
+        self.set_model(name, model)
+
+        # Training successful, return cross-validated accuracy
+        return scores
+
+    def get_search_settings(self):
+        """
+        Returns the cross-validation settings passed to fit_model().
+        """
+        return {"cv_folds": self.cv_folds, "n_jobs": self.n_jobs}
+
+    def predict_dataset(self, name, dataset):
+        """
+        Predicts the event tag of every row in dataset with the named model, in chunks of prediction_chunk_size rows.
+
+        :return: A Series of tags aligned with dataset's index, or False if the model has not been trained. Rows
+        that can't be predicted (events found in a single sample, or missing feature values) get TAG_NO_TAG.
+        """
+        if self.models[name] is None:
+            return False
+
+        features, predictable_rows = self.get_prediction_data(dataset)
+
+        predictions = np.full(len(dataset), TAG_NO_TAG, dtype=int)
         try:
-            tag_predictions = self.decision_tree.predict(event_df[self.training_columns])
-            print "##########################################################"
-            print "################### TAG PREDICTIONS ######################"
-            print "##########################################################"
-            print tag_predictions
-            print "##########################################################"
-            return tag_predictions
+            predictions[predictable_rows], uncertainty, probabilities = predict_in_chunks(self.models[name], features, self.prediction_chunk_size)
         except NotFittedError:
             return False
-        except ValueError as e:
-            print "ERROR when fitting: %s" % e.message
-            print "--Occurrences:", event_df["occurrences"]
+        self.set_uncertainty(name, dataset, predictable_rows, uncertainty)
+        self.set_probabilities(name, dataset, predictable_rows, probabilities)
+
+        print "%s predicted tags for %d of %d rows" % (MODEL_TYPES[name].label, len(predictable_rows), len(dataset))
+        return pd.Series(predictions, index=dataset.index)
+
+    def set_uncertainty(self, name, dataset, rows, uncertainty):
+        """
+        Stores the uncertainty of the named model's predictions for the given rows (positions in dataset), as
+        returned by predict_in_chunks(). Rows that weren't predicted get NaN.
+        """
+        frame = pd.DataFrame(index=dataset.index)
+        for measure in UNCERTAINTY_MEASURES:
+            values = np.full(len(dataset), np.nan)
+            values[rows] = uncertainty[measure]
+            frame[measure] = values
+        self.uncertainty[name] = frame
+        self.rankings[name] = None  # Set again by the training process, or get_active_learning_ranking()
+
+    def set_probabilities(self, name, dataset, rows, probabilities):
+        """
+        Stores the tag probabilities of the named model's predictions for the given rows (positions in dataset), as
+        returned by predict_in_chunks(), along with the probability of the predicted tag as its confidence. Rows
+        that weren't predicted get NaN.
+        """
+        model_type = MODEL_TYPES[name]
+        frame = pd.DataFrame(index=dataset.index)
+        values = np.full(len(dataset), np.nan, dtype=np.float32)
+        values[rows] = probabilities.max(axis=1)
+        frame[model_type.confidence_column] = values
+        for i, column in enumerate(model_type.probability_columns):
+            values = np.full(len(dataset), np.nan, dtype=np.float32)
+            values[rows] = probabilities[:, i]
+            frame[column] = values
+        self.probabilities[name] = frame
+
+    def explain_events(self, dataset, as_ids):
+        """
+        Explains the predictions of explanation_model for all rows of the given events in one batch, see
+        explain_predictions(), and caches them by as_id. Events explained before are skipped, and the cache is
+        replaced by these events, so it only covers the window being browsed.
+
+        Each event's explanation is a dict by sample name with the predicted "tag", its "probability", and its
+        "top_features": (feature, contribution to the predicted tag's probability) tuples, largest first. Samples
+        that can't be predicted are left out.
+        """
+        model = self.models[self.explanation_model]
+        if model is None:
+            return
+
+        explanations = dict((as_id, self.explanations[as_id]) for as_id in as_ids if as_id in self.explanations)
+        new_as_ids = [as_id for as_id in as_ids if as_id not in explanations]
+
+        features, finite = self.get_feature_matrix(dataset)
+        rows = np.flatnonzero(dataset["as_id"].isin(new_as_ids).values & (dataset["occurrences"].values > 1) & finite)
+        explained = explain_predictions(model, features[rows]) if len(rows) > 0 else None
+        for as_id in new_as_ids:
+            explanations[as_id] = {}
+
+        if explained is not None:
+            predictions, probabilities, bias, contributions = explained
+            as_id_values = dataset["as_id"].values[rows]
+            sample_names = dataset["name"].values[rows]
+            for i in range(len(rows)):
+                tag_column = ALL_TAGS.index(predictions[i])
+                tag_contributions = contributions[i, :, tag_column]
+                top = np.argsort(-np.abs(tag_contributions))[:self.explanation_top_features]
+                explanations[as_id_values[i]][sample_names[i]] = {
+                    "tag": int(predictions[i]),
+                    "probability": float(probabilities[i, tag_column]),
+                    "top_features": [(self.training_columns[j], float(tag_contributions[j])) for j in top if tag_contributions[j] != 0]
+                }
+
+        self.explanations = explanations
+        print "TINLearner: Explained %s predictions for %d rows of %d events" % (MODEL_TYPES[self.explanation_model].label.lower(), len(rows), len(new_as_ids))
+
+    def get_active_learning_model_name(self):
+        """
+        Returns the model to rank events by: active_learning_model if it has been trained, otherwise the first
+        enabled model that has. Returns None if no model has been trained.
+        """
+        for name in [self.active_learning_model] + self.enabled_models:
+            if self.uncertainty.get(name) is not None:
+                return name
+        return None
+
+    def get_active_learning_ranking(self, dataset, measure):
+        """
+        Returns the events of dataset ranked by the given measure of the active learning model's uncertainty, or None
+        if no model has been trained. Training and update processes rank the events themselves; models that were
+        loaded, or predicted another dataset than they were trained on, are ranked here once.
+        """
+        name = self.get_active_learning_model_name()
+        if name is None:
+            return None
+        if self.rankings[name] is None:
+            uncertainty = self.uncertainty[name].reindex(dataset.index)
+            scores = dict((column, uncertainty[column].values) for column in UNCERTAINTY_MEASURES)
+            self.rankings[name] = rank_events_by_measure(scores, *self.get_ranking_data(dataset, slice(None)))
+        return self.rankings[name][measure]
+
+    def get_dataset_fingerprint(self, dataset):
+        """
+        Returns a fingerprint of which events and samples dataset contains, independent of row order.
+        """
+        rows = dataset["as_id"].astype(str) + "|" + dataset["name"].astype(str)
+        return hashlib.sha1("\n".join(sorted(rows))).hexdigest()
+
+    def get_tag_fingerprint(self, dataset):
+        """
+        Returns a fingerprint of the tags in dataset. It only changes when a tag is set, changed or removed.
+        """
+        tagged = dataset.loc[dataset[self.tag_column] > TAG_NO_TAG]
+        rows = tagged["as_id"].astype(str) + "|" + tagged["name"].astype(str) + "|" + tagged[self.tag_column].astype(str)
+        return hashlib.sha1("\n".join(sorted(rows))).hexdigest()
+
+    def get_model_path(self, name, dataset_fingerprint):
+        return os.path.join(self.model_dir, "%s_%s.pkl" % (name, dataset_fingerprint))
+
+    def is_model_up_to_date(self, name, dataset):
+        """
+        Returns True if the named model was trained on dataset with the tags it has now.
+        """
+        info = self.model_info[name]
+        if info is None or name in self.stale_incremental_models:
+            return False
+        return info["dataset_fingerprint"] == self.get_dataset_fingerprint(dataset) and \
+            info["tag_fingerprint"] == self.get_tag_fingerprint(dataset)
+
+    def save_model(self, name, dataset, tag_fingerprint, scores, predictions):
+        """
+        Saves the named model to disk, along with what it was trained on and its predicted tags for dataset (a
+        Series aligned with dataset's index), their uncertainty and their probabilities. tag_fingerprint is that of the tags it was
+        trained on.
+        """
+        model = self.models[name]
+        dataset_fingerprint = self.get_dataset_fingerprint(dataset)
+        self.model_info[name] = {
+            "format_version": MODEL_FORMAT_VERSION,
+            "features": list(self.training_columns),
+            "classes": [int(tag) for tag in model.classes_],
+            "trained": time.time(),
+            "scores": scores,
+            "dataset_fingerprint": dataset_fingerprint,
+            "tag_fingerprint": tag_fingerprint
+        }
+        saved_predictions = pd.DataFrame({
+            "as_id": dataset["as_id"].values,
+            "name": dataset["name"].values,
+            "tag": predictions.reindex(dataset.index).values
+        })
+        if self.uncertainty[name] is not None:
+            for measure in UNCERTAINTY_MEASURES:
+                saved_predictions[measure] = self.uncertainty[name][measure].reindex(dataset.index).values
+        if self.probabilities[name] is not None:
+            for column in self.probabilities[name].columns:
+                saved_predictions[column] = self.probabilities[name][column].reindex(dataset.index).values
+
+        model_path = self.get_model_path(name, dataset_fingerprint)
+        try:
+            if not os.path.isdir(self.model_dir):
+                os.makedirs(self.model_dir)
+            # Write to a temporary file first, so a crash never leaves a half-written model behind
+            joblib.dump({"info": self.model_info[name], "model": model, "predictions": saved_predictions}, model_path + ".tmp")
+            os.rename(model_path + ".tmp", model_path)
+            print "Saved %s to %s" % (MODEL_TYPES[name].label.lower(), model_path)
+        except (IOError, OSError) as e:
+            print "Error when saving %s: %s" % (MODEL_TYPES[name].label.lower(), e)
+
+    def load_model(self, name, dataset):
+        """
+        Loads the named model saved for dataset, if any, and returns its predicted tags as a Series aligned with
+        dataset's index. Returns False if there is no usable saved model.
+        """
+        model_path = self.get_model_path(name, self.get_dataset_fingerprint(dataset))
+        if not os.path.exists(model_path):
+            return False
+
+        try:
+            saved = joblib.load(model_path)
+        except Exception as e:
+            print "Error when loading model from %s: %s" % (model_path, e)
             return False
+
+        info = saved["info"]
+        if info["format_version"] != MODEL_FORMAT_VERSION or info["features"] != self.training_columns:
+            print "Saved model at %s was trained on other features, ignoring it" % model_path
+            return False
+
+        self.set_model(name, saved["model"])
+        self.model_info[name] = info
+        print "Loaded %s from %s" % (MODEL_TYPES[name].label.lower(), model_path)
+
+        # Match the saved predictions to this dataset's rows
+        predictions = dataset[["as_id", "name"]].merge(saved["predictions"], on=["as_id", "name"], how="left")
+        predictions.index = dataset.index
+        if all(measure in predictions.columns for measure in UNCERTAINTY_MEASURES):
+            self.uncertainty[name] = predictions[list(UNCERTAINTY_MEASURES)]
+        probability_columns = [MODEL_TYPES[name].confidence_column] + MODEL_TYPES[name].probability_columns
+        if all(column in predictions.columns for column in probability_columns):
+            self.probabilities[name] = predictions[probability_columns]
+        return predictions["tag"].fillna(TAG_NO_TAG).astype(int)
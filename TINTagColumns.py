@@ -0,0 +1,10 @@
+from collections import OrderedDict
+
+# Dataset columns holding each model's predicted tags, by model name (see TINLearner.MODEL_TYPES). Kept out of
+# TINLearner so modules that only handle the dataset don't have to import scikit-learn.
+MODEL_TAG_COLUMNS = OrderedDict([
+    ("decision_tree", "decision_tree_tag"),
+    ("random_forest", "random_forest_tag"),
+    ("gradient_boosting", "gradient_boosting_tag"),
+    ("online", "online_tag")
+])
@@ -9,9 +9,12 @@ import numpy as np
 import os
 import copy
 import random
+import time
 import subprocess
 import tkMessageBox
+import tkSimpleDialog
 from TINDataProcessor import TINDataProcessor
+from TINLearner import train_models_worker, update_model_worker, format_scores, MODEL_TYPES, UNCERTAINTY_MEASURES
 from multiprocessing import Process, Queue
 from Queue import Empty
 
@@ -70,9 +73,18 @@ TAG_INTERESTING = 0
 TAG_NOT_INTERESTING = 1
 TAG_UNCERTAIN = 2
 TAG_NO_TAG = -1
+TAG_LABELS = {TAG_INTERESTING: "interesting", TAG_NOT_INTERESTING: "not interesting", TAG_UNCERTAIN: "uncertain"}
 
 TEXTTAG_COVERAGE = "exon_rpkm_text"
 TEXTTAG_SHADOW = "text_shadow"
+TEXTTAG_POOLED = "pooled"  # All items drawn with ResizingCanvas.draw_*()
+
+# Options of reused canvas items that are reset unless given, see ResizingCanvas.draw_item()
+CANVAS_ITEM_DEFAULTS = {
+    "rectangle": {"fill": "", "outline": "black", "width": 1},
+    "text": {"fill": "black", "font": "TkDefaultFont", "anchor": tk.CENTER, "text": ""},
+    "polygon": {"fill": "black", "outline": "", "width": 1}
+}
 
 STYLE_BUTTON_INTERESTING_ON = "InterestingOn.TButton"
 STYLE_BUTTON_NOT_INTERESTING_ON = "Not_interestingOn.TButton"
@@ -87,49 +99,136 @@ def natural_sort_key(s, _nsre=re.compile('([0-9]+)')):
     return [int(text) if text.isdigit() else text.lower() for text in re.split(_nsre, s)]
 
 
+class CanvasResizeCoordinator(object):
+    """
+    Collects the <Configure> events of all ResizingCanvases, and resizes them together once the events stop
+    coming for delay milliseconds. Dragging the window edge sends a stream of events to every row canvas; only the
+    last size of each canvas is applied.
+    """
+    def __init__(self, widget, delay=50):
+        self.widget = widget  # Any widget that outlives the canvases, used to schedule the resize
+        self.delay = delay
+        self.pending = {}  # New (width, height) by canvas
+        self.timer = None
+
+    def schedule(self, canvas, width, height):
+        self.pending[canvas] = (width, height)
+        if self.timer is not None:
+            self.widget.after_cancel(self.timer)
+        self.timer = self.widget.after(self.delay, self.flush)
+
+    def flush(self):
+        self.timer = None
+        pending, self.pending = self.pending, {}
+        for canvas, (width, height) in pending.items():
+            if canvas.winfo_exists():
+                canvas.resize_to(width, height)
+
+
 class ResizingCanvas(tk.Canvas):
     """
-    This function resizes the canvas AND the objects within the canvas
-    (except text). It is bound to the <Configure> event, which is invoked
-    upon window resize (I think).
+    This function resizes the canvas AND the objects within the canvas. It is bound to the <Configure> event,
+    which is invoked upon window resize (I think). Resizes are coalesced by resize_coordinator, a
+    CanvasResizeCoordinator shared by all canvases in the window.
     """
-    def __init__(self, parent, **kwargs):
+    def __init__(self, parent, resize_coordinator, **kwargs):
         tk.Canvas.__init__(self, parent, **kwargs)
         self.bind("<Configure>", self.on_resize)
+        self.resize_coordinator = resize_coordinator
         self.height = self.winfo_reqheight()
         self.width = self.winfo_reqwidth()
 
+        # Items made by draw_rectangle(), draw_text() and draw_polygon(), by type, reused in drawing order after
+        # every reset()
+        self.item_pools = dict((item_type, []) for item_type in CANVAS_ITEM_DEFAULTS)
+        self.items_used = dict((item_type, 0) for item_type in CANVAS_ITEM_DEFAULTS)
+
     def on_resize(self, event):
+        self.resize_coordinator.schedule(self, event.width, event.height)
+
+    def reset(self, width, height):
+        """
+        Clears the canvas so it can be reused for another event. Its items are only hidden, and are moved and
+        reconfigured by the next draw_*() calls. Items drawn next are in a width x height coordinate system, and are
+        scaled to the canvas' actual size on the next resize or by fit_to_size().
+        """
+        self.itemconfigure(TEXTTAG_POOLED, state="hidden")
+        self.items_used = dict((item_type, 0) for item_type in CANVAS_ITEM_DEFAULTS)
+        self.width = width
+        self.height = height
+        self.config(width=width, height=height)
+
+    def fit_to_size(self):
+        """
+        Scales the items to the canvas' current size. A reused canvas that keeps its size gets no <Configure> event,
+        so this does what on_resize() would have done.
+        """
+        width = self.winfo_width()
+        height = self.winfo_height()
+        # Not laid out yet, on_resize() takes care of it once it is
+        if width <= 1 or height <= 1:
+            return
+        self.resize_to(width, height)
+
+    def draw_rectangle(self, *coords, **options):
+        return self.draw_item("rectangle", coords, options)
+
+    def draw_text(self, *coords, **options):
+        return self.draw_item("text", coords, options)
+
+    def draw_polygon(self, *coords, **options):
+        return self.draw_item("polygon", coords, options)
+
+    def draw_item(self, item_type, coords, options):
+        """
+        Draws an item like create_rectangle() etc. would, but takes the next hidden item of that type if there is
+        one, and only updates its coordinates and options. Options that aren't given are set to their defaults, so
+        nothing carries over from the item's previous use. Creating items, text in particular, is slow on Tk canvases.
+        """
+        tags = options.pop("tags", ())
+        if not isinstance(tags, tuple):
+            tags = (tags,)
+        item_options = dict(CANVAS_ITEM_DEFAULTS[item_type])
+        item_options.update(options)
+        item_options["tags"] = tags + (TEXTTAG_POOLED,)
+
+        pool = self.item_pools[item_type]
+        index = self.items_used[item_type]
+        self.items_used[item_type] += 1
+        if index < len(pool):
+            item = pool[index]
+            self.coords(item, *coords)
+            self.itemconfigure(item, state="normal", **item_options)
+            # Keep the stacking order of drawing order, as if the item was new
+            self.tag_raise(item)
+            return item
+
+        if item_type == "rectangle":
+            item = self.create_rectangle(*coords, **item_options)
+        elif item_type == "text":
+            item = self.create_text(*coords, **item_options)
+        else:
+            item = self.create_polygon(*coords, **item_options)
+        pool.append(item)
+        return item
+
+    def resize_to(self, width, height):
+        if width == self.width and height == self.height:
+            return
+
         # Determine the ratio of old width/height to new width/height
-        wscale = float(event.width) / self.width
-        hscale = float(event.height) / self.height
-        self.width = event.width
-        self.height = event.height
+        wscale = float(width) / self.width
+        hscale = float(height) / self.height
+        self.width = width
+        self.height = height
         # Resize the canvas
         self.config(width=self.width, height=self.height)
         # Rescale all the objects tagged with the "all" tag
         self.scale("all", 0, 0, wscale, hscale)
 
-        # Redraw text and text shadow to keep the 1-pixel difference upon resize
-        # Delete all text shadows
-        self.delete(TEXTTAG_SHADOW)
-        for item in self.find_withtag(TEXTTAG_COVERAGE):
-            if self.type(item) == "text":
-                # Get current font
-                font = self.itemcget(item, "font")
-
-                # Get the current text
-                current_text = self.itemcget(item, "text")
-
-                # Get coordinates of the text object
-                text_x, text_y = self.coords(item)
-
-                # Draw shadow first, then a new instance of the text
-                self.create_text(text_x + 1, text_y + 1, text=current_text, tags=TEXTTAG_SHADOW, font=font, fill=COLOR_CANVAS_TEXT_SHADOW)
-                self.create_text(text_x, text_y, text=current_text, font=font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
-
-                # Finally, delete this item
-                self.delete(item)
+        # Scaling moved each text shadow away from its text along with everything else. Move it back, so it stays
+        # 1 pixel below and right of the text.
+        self.move(TEXTTAG_SHADOW, 1 - wscale, 1 - hscale)
 
 
 class TINTagger(tk.Tk):
@@ -145,10 +244,6 @@ class TINTagger(tk.Tk):
         self.current_theme.set(self.style.theme_use())
         self.current_theme.trace("w", self.change_theme)
 
-        # TEST
-        self.all_uninteresting_buttons = []
-        # END TEST
-
         # Text size for all canvas text items
         self.canvas_text_size = 16
         self.canvas_font = ("tkDefaultFont", self.canvas_text_size)
@@ -167,6 +262,19 @@ class TINTagger(tk.Tk):
         # Keep track of all of the canvases in the center window
         self.canvases = []
 
+        # Widgets of the exon and sample frames are created once and reused for every event, see get_row_canvas(),
+        # add_tagging_buttons() and populate_samples_frame(). New ones are only made when there are more samples.
+        self.exon_name_canvas = None
+        self.canvas_resize_coordinator = CanvasResizeCoordinator(self)  # Resizes all of these canvases together
+        self.exon_rows = []  # One dict of widgets per sample row in the exon frame
+        self.sample_rows = []  # One dict of widgets per sample row in the sample frame
+
+        # Only the samples that fit in the window are drawn, the rest are reached by scrolling. See draw_event().
+        self.sample_row_min_height = 60  # Pixels
+        self.first_visible_sample = 0  # Position of the top drawn sample, in sorted order
+        self.current_row_data = None  # get_row_data() of the event being shown, redrawn when scrolling
+        self.sample_redraw_pending = False
+
         # No dataset loaded by default
         self.dataset = None
         # Keep a copy of the original dataset to use when filtering
@@ -182,6 +290,25 @@ class TINTagger(tk.Tk):
         self.all_asids = []
         self.current_asid = 0
 
+        # as_ids of all mutually exclusive exons events in the dataset
+        self.me_asids = set()
+
+        # Model training runs in a background process, see train_models()
+        self.training_process = None
+        self.training_dataset = None  # Dataset the running training was started for
+        self.training_prediction_rows = None  # Positions in that dataset of the rows being predicted
+        self.training_tag_fingerprint = None  # Fingerprint of the tags it was started with
+        self.training_errors = []  # Labels of the models that failed to train
+
+        # Incremental models are updated in a background process of their own, see start_online_update()
+        self.online_update_process = None
+        self.online_update_dataset = None
+        self.online_update_prediction_rows = None
+        self.online_update_tag_fingerprint = None
+
+        # (as_id, sample name) of tags entered since incremental models were last updated
+        self.pending_online_tags = []
+
         # Mapping exon skipping abbreviations to full text
         self.splice_type_map = {
             "ES": "Exon skipping",
@@ -201,6 +328,12 @@ class TINTagger(tk.Tk):
         self.sorting_options["sort_by_column"].set("as_id")  # Default to as_id
         self.sorting_options["ascending"].set(True)  # Default to True
 
+        # Active learning: jump to the events the models are least sure about, see refresh_active_learning_ranking()
+        self.active_learning_enabled = tk.BooleanVar()
+        self.active_learning_measure = tk.StringVar()
+        self.active_learning_measure.set(UNCERTAINTY_MEASURES.values()[0])
+        self.active_learning_ranking = None  # as_ids, most informative first
+
         ###########################
         # Bind various keypresses #
         ###########################
@@ -209,6 +342,7 @@ class TINTagger(tk.Tk):
         self.bind("<Control-s>", lambda event=None: self.save_file())
         self.bind("<Control-f>", lambda event=None: self.show_filter_dataset_window())
         self.bind("<Control-a>", lambda event=None: self.show_options())
+        self.bind("<Control-z>", lambda event=None: self.undo_bulk_tagging())
         self.bind("<Left>", self.left_arrow_clicked)
         self.bind("<Right>", self.right_arrow_clicked)
         self.bind("<Up>", self.up_arrow_clicked)
@@ -220,6 +354,7 @@ class TINTagger(tk.Tk):
 
         # Prepare visual styles
         self.setup_ttk_styles()
+        self.frame_background = self.get_frame_background()
 
         # Create a menu
         self.main_menu = self.create_menu()
@@ -241,6 +376,9 @@ class TINTagger(tk.Tk):
         # Create exon frame
         self.exon_frame = self.create_exon_frame()
 
+        # Create sample scrollbar, for when not all samples fit
+        self.sample_scrollbar = self.create_sample_scrollbar()
+
         # Create sidebar
         self.right_sidebar = self.create_right_sidebar()
 
@@ -301,8 +439,8 @@ class TINTagger(tk.Tk):
         """
         sample_header = ttk.Frame(self.sample_frame, padding=1)  # The 1 padding is to compensate for the bold text in exon name increasing the exon name frame's height. The padding is to align the two frames better.
         sample_header.grid(column=0, row=0, sticky="NEW")
-        header_label = ttk.Label(sample_header, text="Samples", font="TkDefaultFont 16", anchor="center")
-        header_label.grid(column=0, row=0, sticky="NEWS")
+        self.sample_header_label = ttk.Label(sample_header, text="Samples", font="TkDefaultFont 16", anchor="center")
+        self.sample_header_label.grid(column=0, row=0, sticky="NEWS")
         sample_header.columnconfigure(0, weight=1)
 
     def create_exon_frame(self):
@@ -314,6 +452,23 @@ class TINTagger(tk.Tk):
 
         return exon_frame
 
+    def create_sample_scrollbar(self):
+        """
+        Creates the scrollbar right of the exon frame, and binds the mouse wheel to scroll the samples. It's hidden
+        while all samples fit.
+        """
+        sample_scrollbar = ttk.Scrollbar(self.left_frame, orient=tk.VERTICAL, command=self.scroll_samples)
+        sample_scrollbar.grid(column=2, row=0, sticky="NS")
+        sample_scrollbar.grid_remove()
+
+        self.bind("<MouseWheel>", self.on_sample_mouse_wheel)
+        self.bind("<Button-4>", self.on_sample_mouse_wheel)
+        self.bind("<Button-5>", self.on_sample_mouse_wheel)
+        # More or fewer samples fit when the window is resized
+        self.left_frame.bind("<Configure>", lambda event: self.schedule_sample_redraw())
+
+        return sample_scrollbar
+
     def create_right_sidebar(self):
         """ Creates the sidebar to the right"""
 
@@ -394,15 +549,41 @@ class TINTagger(tk.Tk):
         current_row += 1
 
         # TEST: Button for training decision tree
-        decision_tree_training_button = ttk.Button(sidebar_information, text="Train decision tree", command=self.train_decision_tree)
-        decision_tree_training_button.grid(column=0, row=current_row, sticky="W")
+        self.model_training_button = ttk.Button(sidebar_information, text="Train models", command=self.train_models)
+        self.model_training_button.grid(column=0, row=current_row, sticky="W")
         current_row += 1
 
         next_untagged_button = ttk.Button(sidebar_information, text="Jump to next untagged event", command=self.next_untagged_event_button_clicked)
         next_untagged_button.grid(column=0, row=current_row, sticky="W")
         current_row += 1
+
+        # Active learning: "Jump to next untagged event" picks the most informative event instead of the first
+        active_learning_checkbox = ttk.Checkbutton(
+            sidebar_information,
+            variable=self.active_learning_enabled,
+            onvalue=True,
+            offvalue=False,
+            text="Most informative first:"
+        )
+        active_learning_checkbox.grid(column=0, row=current_row, sticky="W")
+        active_learning_measure_box = ttk.Combobox(
+            sidebar_information,
+            textvariable=self.active_learning_measure,
+            values=UNCERTAINTY_MEASURES.values(),
+            state="readonly"
+        )
+        active_learning_measure_box.grid(column=1, row=current_row, sticky="NEWS")
+        active_learning_measure_box.bind("<<ComboboxSelected>>", lambda event: self.refresh_active_learning_ranking())
+        current_row += 1
         # END TEST
 
+        # Why the model predicts what it does, for the sample under the mouse. See show_explanation().
+        explanation_label = ttk.Label(sidebar_information, text="Prediction:", font=label_font)
+        explanation_label.grid(column=0, row=current_row, sticky="NW")
+        self.explanation_text = ttk.Label(sidebar_information, text="", font=text_font, wraplength=250, justify=tk.LEFT)
+        self.explanation_text.grid(column=1, row=current_row, sticky="NW", columnspan=2)
+        current_row += 1
+
         # Buttons frame
         sidebar_buttons = ttk.Frame(right_sidebar, padding=5)
         sidebar_buttons.grid(column=0, row=1, sticky="EWS")
@@ -448,15 +629,350 @@ class TINTagger(tk.Tk):
         self.current_asid = int(as_id)
         self.update_information()
 
-    def train_decision_tree(self):
+    def train_models(self):
+        """
+        Trains the enabled models (see TINLearner.MODEL_TYPES) one after the other in a background process, so the UI
+        stays responsive. Only the feature matrices are handed to the process. Models whose tags haven't changed
+        since they were trained are skipped. Clicking the button again while training cancels it.
+        """
+        if self.training_process is not None:
+            self.cancel_training()
+            return
+
+        if self.original_dataset is None:
+            self.set_statusbar_text("ERROR: No dataset loaded.")
+            return
+
+        # The training learns from all tags, so a running update of the incremental models is no longer needed
+        self.cancel_online_update()
+
+        tin_learner = self.data_processor.tin_learner
+        model_names = [name for name in tin_learner.enabled_models if not tin_learner.is_model_up_to_date(name, self.original_dataset)]
+        if len(model_names) == 0:
+            self.set_statusbar_text("Tags are unchanged since the models were trained. %s" % self.get_model_scores_text())
+            return
+
+        training_data = tin_learner.get_training_data(self.original_dataset)
+        if not training_data:
+            self.set_statusbar_text("ERROR: Models could not be trained: Too few tagged events.")
+            return
+        features, tags, groups = training_data
+        prediction_features, self.training_prediction_rows = tin_learner.get_prediction_data(self.original_dataset)
+        self.training_dataset = self.original_dataset
+        self.training_tag_fingerprint = tin_learner.get_tag_fingerprint(self.original_dataset)
+
+        ranking_data = tin_learner.get_ranking_data(self.original_dataset, self.training_prediction_rows)
+
+        training_queue = Queue()
+        self.training_process = Process(
+            target=train_models_worker,
+            args=(model_names, features, tags, groups, prediction_features, ranking_data, tin_learner.get_search_settings(), tin_learner.prediction_chunk_size, training_queue)
+        )
+        self.training_process.start()
+
+        self.model_training_button.configure(text="Cancel training")
+        self.set_statusbar_text("Training models..")
+        self.check_training_queue(training_queue)
+
+    def check_training_queue(self, queue):
         """
-        Tells the dataprocessor to tell its tin_learner to train its decision tree.
+        Shows status messages from the training process, and swaps in each new model once it's done.
         """
-        tree_accuracy = self.data_processor.tin_learner.train_decision_tree(self.original_dataset)
-        if not tree_accuracy:
-            self.set_statusbar_text("ERROR: Decision tree could not be trained: Too few tagged events.")
+        # This queue belongs to a training process that has been cancelled
+        if self.training_process is None:
+            return
+
+        while True:
+            try:
+                message = queue.get_nowait()
+            except Empty:
+                break
+
+            if message[0] == "status":
+                self.set_statusbar_text(message[1])
+            elif message[0] == "error":
+                name, error_text = message[1:]
+                print "ERROR: %s could not be trained: %s" % (MODEL_TYPES[name].label, error_text)
+                self.training_errors.append(MODEL_TYPES[name].label)
+            elif message[0] == "done":
+                name, model, scores, predictions, uncertainty, probabilities, ranking = message[1:]
+                self.apply_trained_model(
+                    name, model, scores, predictions, uncertainty, probabilities, ranking,
+                    self.training_dataset, self.training_prediction_rows, self.training_tag_fingerprint
+                )
+            elif message[0] == "finished":
+                errors = self.training_errors
+                self.finish_training()
+                self.refresh_active_learning_ranking()
+                if len(errors) > 0:
+                    self.set_statusbar_text("ERROR: Could not train %s. %s" % (", ".join(errors), self.get_model_scores_text()))
+                else:
+                    self.set_statusbar_text("Models trained. %s" % self.get_model_scores_text())
+                if isinstance(self.original_dataset, pd.DataFrame):
+                    self.update_information()
+                return
+
+        if not self.training_process.is_alive() and queue.empty():
+            self.finish_training()
+            self.set_statusbar_text("ERROR: Model training stopped unexpectedly.")
+            return
+
+        self.after(200, self.check_training_queue, queue)
+
+    def apply_trained_model(self, name, model, scores, predictions, uncertainty, probabilities, ranking, dataset, prediction_rows, tag_fingerprint):
+        """
+        Replaces a model, its predicted tags, their uncertainty and probabilities, and its ranking of the events with
+        the results from a training or update process. dataset, prediction_rows and tag_fingerprint are what that process was started
+        with.
+        """
+        tin_learner = self.data_processor.tin_learner
+        tag_column = MODEL_TYPES[name].tag_column
+
+        # Incremental updates aren't cross-validated, they keep the scores of the last full training
+        if scores is None and tin_learner.model_info[name] is not None:
+            scores = tin_learner.model_info[name]["scores"]
+
+        # The model and its predictions are swapped in together
+        tin_learner.set_model(name, model)
+        if dataset is not self.original_dataset:
+            # Another dataset was loaded while training, the predictions don't belong to it
+            if isinstance(self.original_dataset, pd.DataFrame):
+                self.data_processor.predict_model_tags(name, self.original_dataset)
         else:
-            self.set_statusbar_text("Decision tree trained. Accuracy: %.2f" % tree_accuracy)
+            tags = np.full(len(self.original_dataset), TAG_NO_TAG, dtype=int)
+            tags[prediction_rows] = predictions
+            tags = pd.Series(tags, index=self.original_dataset.index)
+            self.data_processor.store_predicted_tags(self.original_dataset, tag_column, tags)
+            tin_learner.set_uncertainty(name, self.original_dataset, prediction_rows, uncertainty)
+            tin_learner.rankings[name] = ranking
+            tin_learner.set_probabilities(name, self.original_dataset, prediction_rows, probabilities)
+            self.data_processor.store_prediction_probabilities(self.original_dataset, name)
+            # Keep the model, so it can be reused next time this dataset is opened
+            tin_learner.save_model(name, self.original_dataset, tag_fingerprint, scores, tags)
+
+        if isinstance(self.original_dataset, pd.DataFrame):
+            self.copy_prediction_columns(name)
+
+    def copy_prediction_columns(self, name):
+        """
+        Copies the named model's predicted tags and their probabilities from the original dataset to the filtered
+        one.
+        """
+        model_type = MODEL_TYPES[name]
+        for column in [model_type.tag_column, model_type.confidence_column] + model_type.probability_columns:
+            if column in self.original_dataset.columns:
+                self.dataset[column] = self.original_dataset[column].reindex(self.dataset.index)
+
+    def refresh_active_learning_ranking(self):
+        """
+        Swaps in the ranking of events by how unsure the models are about their untagged samples, for the measure
+        chosen in the sidebar. The training and update processes rank the events along with their predictions, see
+        TINLearner.get_active_learning_ranking(). Called whenever the models change.
+        """
+        if not isinstance(self.original_dataset, pd.DataFrame):
+            self.active_learning_ranking = None
+            return
+
+        measure_labels = dict((label, measure) for measure, label in UNCERTAINTY_MEASURES.items())
+        measure = measure_labels[self.active_learning_measure.get()]
+        self.active_learning_ranking = self.data_processor.tin_learner.get_active_learning_ranking(self.original_dataset, measure)
+
+    def get_model_scores_text(self):
+        """
+        Returns the accuracy of every trained model, for the status bar.
+        """
+        tin_learner = self.data_processor.tin_learner
+        scores = []
+        for name in tin_learner.enabled_models:
+            if tin_learner.model_info[name] is not None and tin_learner.model_info[name]["scores"] is not None:
+                scores.append("%s: %s" % (MODEL_TYPES[name].label, format_scores(tin_learner.model_info[name]["scores"])))
+        return "Accuracy: " + ", ".join(scores) if len(scores) > 0 else ""
+
+    def cancel_training(self):
+        """
+        Stops a running training process. Models that finished before it was stopped are kept.
+        """
+        if self.training_process is not None and self.training_process.is_alive():
+            self.training_process.terminate()
+            self.training_process.join()
+        self.finish_training()
+        self.set_statusbar_text("Model training cancelled.")
+
+    def finish_training(self):
+        """
+        Forgets the training process and resets the training button.
+        """
+        self.training_process = None
+        self.training_dataset = None
+        self.training_prediction_rows = None
+        self.training_tag_fingerprint = None
+        self.training_errors = []
+        self.model_training_button.configure(text="Train models")
+
+    def get_incremental_model_labels(self):
+        return [MODEL_TYPES[name].label.lower() for name in self.data_processor.tin_learner.enabled_models if MODEL_TYPES[name].incremental]
+
+    def record_tag_for_online_learning(self, as_id, sample_name):
+        self.record_tags_for_online_learning([(as_id, sample_name)])
+
+    def record_bulk_tags_for_online_learning(self, rows):
+        """
+        Like record_tag_for_online_learning(), for the rows of original_dataset at the given positions.
+        """
+        as_ids = self.original_dataset["as_id"].values[rows]
+        sample_names = self.original_dataset["name"].values[rows]
+        self.record_tags_for_online_learning(zip(as_ids, sample_names))
+
+    def record_tags_for_online_learning(self, tag_keys):
+        """
+        Remembers newly entered tags, as (as_id, sample name) pairs, and updates the incremental models once enough
+        tags have been entered. Updates wait while a training process or another update is running; the tags are
+        picked up by the next update.
+        """
+        tin_learner = self.data_processor.tin_learner
+        if not tin_learner.online_learning_enabled or len(self.get_incremental_model_labels()) == 0:
+            return
+
+        self.pending_online_tags.extend(tag_keys)
+        if len(self.pending_online_tags) >= tin_learner.online_update_interval:
+            self.request_online_update()
+
+    def request_online_update(self):
+        """
+        Starts an update of the incremental models, unless a training process or another update is running.
+        """
+        if self.training_process is None and self.online_update_process is None:
+            self.start_online_update()
+
+    def start_online_update(self):
+        """
+        Updates the incremental models with the tags entered since the last update, in a background process of its
+        own, so the training button keeps training. A model that hasn't seen every tag yet can't learn new ones
+        incrementally, and is fitted anew on all tags instead.
+        """
+        tin_learner = self.data_processor.tin_learner
+        event_matrix = self.data_processor.event_matrix
+        dataset = self.original_dataset
+
+        # Step 1: Dataset row labels of the pending tags. Samples that don't report the event are left out.
+        row_labels = []
+        for as_id, sample_name in set(self.pending_online_tags):
+            if event_matrix is None or not event_matrix.has_event(as_id) or sample_name not in event_matrix.sample_index:
+                continue
+            row_label = event_matrix.row_labels[event_matrix.event_index[as_id], event_matrix.sample_index[sample_name]]
+            if row_label > -1:
+                row_labels.append(row_label)
+
+        # Step 2: Start an update for the first incremental model with something to learn.
+        # Only one update runs at a time, so any others are updated with the next batch of tags.
+        for name in tin_learner.enabled_models:
+            if not MODEL_TYPES[name].incremental:
+                continue
+
+            refit = not tin_learner.can_update_incrementally(name)
+            if refit:
+                model = tin_learner.create_model(name)
+                features, tags = tin_learner.get_row_training_data(dataset, dataset.index[dataset["event_tag"] > TAG_NO_TAG])
+            else:
+                model = copy.deepcopy(tin_learner.models[name])
+                features, tags = tin_learner.get_row_training_data(dataset, row_labels)
+
+            if len(tags) == 0:
+                continue
+
+            prediction_features, prediction_rows = tin_learner.get_prediction_data(dataset)
+            ranking_data = tin_learner.get_ranking_data(dataset, prediction_rows)
+            self.online_update_dataset = dataset
+            self.online_update_prediction_rows = prediction_rows
+            self.online_update_tag_fingerprint = tin_learner.get_tag_fingerprint(dataset)
+
+            update_queue = Queue()
+            self.online_update_process = Process(
+                target=update_model_worker,
+                args=(name, model, features, tags, refit, prediction_features, ranking_data, tin_learner.prediction_chunk_size, update_queue)
+            )
+            self.online_update_process.start()
+            self.check_online_update_queue(update_queue)
+            break
+
+        self.pending_online_tags = []
+
+    def check_online_update_queue(self, queue):
+        """
+        Swaps in the incremental model from the update process once it's done, like check_training_queue().
+        """
+        # This queue belongs to an update that has been cancelled
+        if self.online_update_process is None:
+            return
+
+        while True:
+            try:
+                message = queue.get_nowait()
+            except Empty:
+                break
+
+            if message[0] == "status":
+                self.set_statusbar_text(message[1])
+            elif message[0] == "error":
+                name, error_text = message[1:]
+                print "ERROR: %s could not be updated: %s" % (MODEL_TYPES[name].label, error_text)
+                self.set_statusbar_text("ERROR: Could not update %s." % MODEL_TYPES[name].label.lower())
+            elif message[0] == "done":
+                name, model, scores, predictions, uncertainty, probabilities, ranking = message[1:]
+                self.apply_trained_model(
+                    name, model, scores, predictions, uncertainty, probabilities, ranking,
+                    self.online_update_dataset, self.online_update_prediction_rows, self.online_update_tag_fingerprint
+                )
+                # Don't redraw the event being tagged, the new predictions are shown when the user moves on
+                self.set_statusbar_text("Updated %s with new tags." % MODEL_TYPES[name].label.lower())
+            elif message[0] == "finished":
+                self.finish_online_update()
+                self.refresh_active_learning_ranking()
+                return
+
+        if not self.online_update_process.is_alive() and queue.empty():
+            self.finish_online_update()
+            self.set_statusbar_text("ERROR: Model update stopped unexpectedly.")
+            return
+
+        self.after(200, self.check_online_update_queue, queue)
+
+    def cancel_online_update(self):
+        """
+        Stops a running update of the incremental models, if any.
+        """
+        if self.online_update_process is not None and self.online_update_process.is_alive():
+            self.online_update_process.terminate()
+            self.online_update_process.join()
+        self.finish_online_update()
+
+    def finish_online_update(self):
+        self.online_update_process = None
+        self.online_update_dataset = None
+        self.online_update_prediction_rows = None
+        self.online_update_tag_fingerprint = None
+
+    def load_saved_models(self):
+        """
+        Loads the models saved for the current dataset, if there are any, along with their predicted tags.
+        """
+        tin_learner = self.data_processor.tin_learner
+        loaded = []
+        for name in tin_learner.enabled_models:
+            predictions = tin_learner.load_model(name, self.original_dataset)
+            if predictions is False:
+                continue
+
+            tag_column = MODEL_TYPES[name].tag_column
+            self.data_processor.store_predicted_tags(self.original_dataset, tag_column, predictions)
+            self.data_processor.store_prediction_probabilities(self.original_dataset, name)
+            self.copy_prediction_columns(name)
+            loaded.append(tin_learner.model_info[name]["trained"])
+
+        self.refresh_active_learning_ranking()
+        if len(loaded) > 0:
+            trained = time.strftime("%Y-%m-%d %H:%M", time.localtime(max(loaded)))
+            self.set_statusbar_text("Loaded %d saved models, trained %s. %s" % (len(loaded), trained, self.get_model_scores_text()))
 
     def create_statusbar(self):
         """
@@ -584,6 +1100,12 @@ class TINTagger(tk.Tk):
         # Name entry
         name_entry = ttk.Entry(db_right_frame)
         name_entry.grid(column=0, row=3)
+        # Samples label
+        samples_label = ttk.Label(db_left_frame, text="Samples (blank for all):")
+        samples_label.grid(column=0, row=4, sticky="W")
+        # Samples entry. Comma-separated names or glob patterns, e.g. "sample1, tumor_*"
+        samples_entry = ttk.Entry(db_right_frame)
+        samples_entry.grid(column=0, row=4)
         # Connect button
         connect_button = ttk.Button(
             db_labelframe,
@@ -592,7 +1114,8 @@ class TINTagger(tk.Tk):
                 db_url=url_entry.get(),
                 db_username=user_entry.get(),
                 db_password=password_entry.get(),
-                db_name=name_entry.get()
+                db_name=name_entry.get(),
+                sample_selection=samples_entry.get()
             )
         )
         connect_button.grid(column=0, row=4, columnspan=2, sticky="E")
@@ -622,19 +1145,23 @@ class TINTagger(tk.Tk):
         self.spinner_label.configure(image=frame)
         self.after(10, self.update_spinner_animation, index)
 
-    def get_dataset_from_database(self, db_url, db_username, db_password, db_name):
+    def get_dataset_from_database(self, db_url, db_username, db_password, db_name, sample_selection=None):
         """
         Queries the SpliceSeq database to retrieve dataset.
         :param db_url: URL to database
         :param db_username: Username
         :param db_password: Password
         :param db_name: Name of database
+        :param sample_selection: Comma-separated sample names or glob patterns. Empty or None imports all samples.
         """
 
         # Spin loading animation while dataset is retrieved
         self.draw_animation = True
         self.after(0, self.update_spinner_animation, 0)
 
+        # Let the data processor in this process use the same database, e.g. for ME exon lookups
+        self.data_processor.connect_to_database(db_url, db_username, db_password, db_name)
+
         # Get dataset from DB via data processor
         process_queue = Queue()
         self.reading_dataset = True
@@ -645,7 +1172,8 @@ class TINTagger(tk.Tk):
                 db_username,
                 db_password,
                 db_name,
-                process_queue
+                process_queue,
+                sample_selection
             )
         )
         query_db_process.start()
@@ -696,6 +1224,23 @@ class TINTagger(tk.Tk):
         dataset_menu.add_separator()
         dataset_menu.add_command(label="Open filters..", command=self.read_dataset_filters)
         dataset_menu.add_command(label="Save current filters", command=self.save_dataset_filters)
+        dataset_menu.add_separator()
+        dataset_menu.add_command(label="Add samples from file..", command=self.add_samples_from_file)
+        dataset_menu.add_command(label="Remove samples..", command=self.remove_samples)
+
+        # Add bulk tagging menu
+        tags_menu = tk.Menu(main_menu)
+        main_menu.add_cascade(label="Tags", menu=tags_menu)
+        for tag in [TAG_INTERESTING, TAG_NOT_INTERESTING, TAG_UNCERTAIN]:
+            tags_menu.add_command(label="Tag event as %s" % TAG_LABELS[tag], command=lambda tag=tag: self.bulk_tag_current_event(tag))
+        tags_menu.add_separator()
+        for tag in [TAG_INTERESTING, TAG_NOT_INTERESTING, TAG_UNCERTAIN]:
+            tags_menu.add_command(label="Tag filtered dataset as %s.." % TAG_LABELS[tag], command=lambda tag=tag: self.bulk_tag_filtered_dataset(tag))
+        tags_menu.add_separator()
+        for name, model_type in MODEL_TYPES.items():
+            tags_menu.add_command(label="Accept %s predictions.." % model_type.label.lower(), command=lambda name=name: self.accept_model_predictions(name))
+        tags_menu.add_separator()
+        tags_menu.add_command(label="Undo bulk tagging", command=self.undo_bulk_tagging, accelerator="Ctrl+Z")
 
         # Return main menu
         return main_menu
@@ -729,6 +1274,13 @@ class TINTagger(tk.Tk):
         Called when a theme is changed in the options menu. Traces the self.current_theme variable. Changes theme.
         """
         self.style.theme_use(self.current_theme.get())
+        self.frame_background = self.get_frame_background()
+
+    def get_frame_background(self):
+        """
+        Returns the background color of ttk frames in the current theme, for plain tk frames that should blend in.
+        """
+        return self.style.lookup("TFrame", "background") or self.cget("background")
 
     def show_filter_dataset_window(self):
 
@@ -901,6 +1453,30 @@ class TINTagger(tk.Tk):
         advanced_labelframe.columnconfigure(0, weight=1)
         advanced_labelframe.columnconfigure(1, weight=1)
 
+        ##############################
+        ##### Confidence filters #####
+        ##############################
+        confidence_header = ttk.Label(filters_frame, text="Prediction confidence filters", font="TkDefaultFont 16")
+        confidence_labelframe = ttk.LabelFrame(filters_frame, padding=(0, 10, 0, 10), labelanchor="n", labelwidget=confidence_header)
+        confidence_labelframe.grid(column=0, row=current_row, sticky="NEWS")
+        current_row += 1
+        current_confidence_row = 0
+
+        # A min. and max. confidence (0 to 1) per model. Rows a model hasn't predicted are only shown with the full range.
+        for model_type in MODEL_TYPES.values():
+            for confidence_filter in [model_type.confidence_column, "max_" + model_type.confidence_column]:
+                self.filters[confidence_filter][1].set(self.filters[confidence_filter][0])
+
+                confidence_label = ttk.Label(confidence_labelframe, text=self.filters[confidence_filter][2])
+                confidence_label.grid(column=0, row=current_confidence_row, sticky="NEWS")
+
+                confidence_entry = ttk.Entry(confidence_labelframe, textvariable=self.filters[confidence_filter][1])
+                confidence_entry.grid(column=1, row=current_confidence_row, sticky="NEWS")
+                current_confidence_row += 1
+
+        confidence_labelframe.columnconfigure(0, weight=1)
+        confidence_labelframe.columnconfigure(1, weight=1)
+
         # Frame for buttons
         buttons_frame = ttk.Frame(window)
         buttons_frame.grid(column=0, row=1, sticky="NEWS")
@@ -971,6 +1547,11 @@ class TINTagger(tk.Tk):
             }
         }
 
+        # Prediction confidence filters, a range per model
+        for model_type in MODEL_TYPES.values():
+            default_filters[model_type.confidence_column] = ["0.00", tk.StringVar(), "Min. %s confidence" % model_type.label.lower()]
+            default_filters["max_" + model_type.confidence_column] = ["1.00", tk.StringVar(), "Max. %s confidence" % model_type.label.lower()]
+
         print "Merge new filter approach onto master branch"
         return default_filters
 
@@ -1016,6 +1597,8 @@ class TINTagger(tk.Tk):
             "mean_rpkm_other_samples",
             "rpkm_percentage_of_mean_other_samples"
         ]
+        for model_type in MODEL_TYPES.values():
+            float_fields += [model_type.confidence_column, "max_" + model_type.confidence_column]
 
         # Sanitize int fields
         int_errors = []
@@ -1232,6 +1815,16 @@ class TINTagger(tk.Tk):
             self.reading_dataset = False
             # Find and store unique sample names
             self.sample_names = list(self.dataset["name"].unique())
+            # Keep track of mutually exclusive exons events, so their exon RPKMs can be prefetched in bulk
+            self.me_asids = set(self.original_dataset.loc[self.original_dataset["splice_type"] == "ME"]["as_id"].unique())
+            self.data_processor.me_exon_rpkm_cache = {}
+            self.data_processor.event_aggregates = None
+            self.data_processor.tag_undo_stack = []
+            self.first_visible_sample = 0
+            self.data_processor.tin_learner.invalidate_feature_matrix()
+            self.pending_online_tags = []
+            self.data_processor.build_event_matrix(self.original_dataset, self.sample_names)
+            self.load_saved_models()
             # Default to the first as_id in the file
             self.current_asid = self.all_asids[0]
             self.draw_animation = False
@@ -1245,6 +1838,103 @@ class TINTagger(tk.Tk):
         if self.reading_dataset:
             self.after(500, self.check_io_queue, queue)
 
+    def add_samples_from_file(self):
+        """
+        Reads the samples in a file into the loaded dataset. Only the cross-sample features of the events they're
+        part of are recomputed, see TINDataProcessor.add_samples().
+        """
+        if not isinstance(self.original_dataset, pd.DataFrame):
+            self.set_statusbar_text("Cannot add samples: no dataset is loaded.")
+            return
+
+        filename = askopenfilename(title="Add samples")
+        self.update()
+        if len(filename) == 0:
+            return
+
+        self.set_statusbar_text("Reading samples..")
+        self.draw_animation = True
+        self.after(0, self.update_spinner_animation, 0)
+
+        # Read the file in a background process, like read_dataset()
+        process_queue = Queue()
+        readfile_process = Process(target=self.data_processor.load_dataset, args=(filename, process_queue))
+        readfile_process.start()
+        self.check_added_samples_queue(process_queue)
+
+    def check_added_samples_queue(self, queue):
+        """
+        Waits for the samples read by add_samples_from_file() and adds them to the dataset.
+        """
+        try:
+            new_rows = queue.get_nowait()
+        except Empty:
+            self.after(500, self.check_added_samples_queue, queue)
+            return
+
+        self.draw_animation = False
+        if not isinstance(new_rows, pd.DataFrame):
+            self.set_statusbar_text("IO ERROR: something went wrong when reading samples.")
+            return
+
+        # Samples that are already loaded are skipped, their tags would be lost otherwise
+        new_rows = new_rows.loc[~new_rows["name"].isin(self.sample_names)]
+        new_sample_names = list(new_rows["name"].unique())
+        if len(new_sample_names) == 0:
+            self.set_statusbar_text("No new samples in file.")
+            return
+
+        self.original_dataset = self.data_processor.add_samples(self.original_dataset, new_rows)
+        self.update_samples()
+        self.set_statusbar_text("Added %d samples." % len(new_sample_names))
+
+    def remove_samples(self):
+        """
+        Asks which samples to remove from the loaded dataset, and removes them along with their tags.
+        """
+        if not isinstance(self.original_dataset, pd.DataFrame):
+            self.set_statusbar_text("Cannot remove samples: no dataset is loaded.")
+            return
+
+        selection = tkSimpleDialog.askstring("Remove samples", "Comma-separated names of the samples to remove:")
+        if selection is None:
+            return
+
+        sample_names = [name.strip() for name in selection.split(",") if name.strip() in self.sample_names]
+        if len(sample_names) == 0:
+            self.set_statusbar_text("No such samples in the dataset.")
+            return
+        if len(sample_names) == len(self.sample_names):
+            tkMessageBox.showerror("Remove samples", "Cannot remove every sample from the dataset.")
+            return
+        if not tkMessageBox.askyesno("Remove samples", "Remove %s and their tags from the dataset?" % ", ".join(sample_names)):
+            return
+
+        self.original_dataset = self.data_processor.remove_samples(self.original_dataset, sample_names)
+        self.update_samples()
+        self.set_statusbar_text("Removed %d samples." % len(sample_names))
+
+    def update_samples(self):
+        """
+        Updates everything that depends on which samples original_dataset has, after samples were added or removed,
+        and filters it again.
+        """
+        self.sample_names = list(self.original_dataset["name"].unique())
+        self.me_asids = set(self.original_dataset.loc[self.original_dataset["splice_type"] == "ME"]["as_id"].unique())
+        self.data_processor.me_exon_rpkm_cache = {}
+        self.data_processor.build_event_matrix(self.original_dataset, self.sample_names)
+        self.pending_online_tags = [(as_id, sample_name) for as_id, sample_name in self.pending_online_tags if sample_name in self.sample_names]
+
+        # Apply the current filters to the new dataset, or show all of it if nothing matches them
+        filtered_dataset = self.data_processor.filter_dataset(self.original_dataset, self.filters)
+        if filtered_dataset.empty:
+            filtered_dataset = self.original_dataset
+        self.dataset = filtered_dataset.sort_values(by=self.sorting_options["sort_by_column"].get(), ascending=self.sorting_options["ascending"].get())
+        self.all_asids = list(self.dataset["as_id"].unique())
+        if self.current_asid not in self.all_asids:
+            self.current_asid = self.all_asids[0]
+        self.update_information()
+
     def update_information(self):
         """
         Handles top-level stuff for each event (row):
@@ -1257,10 +1947,6 @@ class TINTagger(tk.Tk):
         # Set waiting cursor
         #self.config(cursor="watch")
 
-        # TEST: Right-click on uncertain buttons
-        self.all_uninteresting_buttons = []
-        # END TEST
-
         # If no dataset is loaded, prompt user to load one
         if self.is_dataset_loaded():
             # TODO: Does this have to be called for every as_id? (The hide_load_frame, that is)
@@ -1293,14 +1979,36 @@ class TINTagger(tk.Tk):
         self.gene_text["text"] = data["gene_symbol"]
         self.strand_text["text"] = data["strand"]
 
+        # Explain the model's predictions for this and the upcoming events, so hovering a sample is instant
+        self.explanation_text["text"] = ""
+        self.prefetch_explanations()
+
+        # Draw events
+        if data["splice_type"] == "ME":
+            self.prefetch_mutually_exclusive_exons()
+        self.current_row_data = data
+        self.draw_event(data)
+
+        # Reset cursor now that we're done with loading everything
+        #self.config(cursor="")
+
+    def draw_event(self, data):
+        """
+        Draws an event, for the samples that fit in the window from first_visible_sample on. Called for every event,
+        and again when the samples are scrolled or the window is resized.
+        """
+        # Pick the samples to draw
+        sample_names_sorted = sorted(data["samples"].keys(), key=natural_sort_key)
+        visible_count = self.get_visible_sample_count()
+        self.first_visible_sample = max(0, min(self.first_visible_sample, len(sample_names_sorted) - visible_count))
+        visible_names = sample_names_sorted[self.first_visible_sample:self.first_visible_sample + visible_count]
+        visible_data = dict(data)
+        visible_data["samples"] = dict((sample_name, data["samples"][sample_name]) for sample_name in visible_names)
+        data = visible_data
+
         # Clear all canvases before drawing new ones
         self.clear_all_canvases()
 
-        # Also clear exon frame before creating new buttons
-        self.exon_frame.destroy()
-        self.exon_frame = self.create_exon_frame()
-
-        # Draw events
         splice_type = data["splice_type"]
         if splice_type == "AT":
             self.draw_alternative_terminator_event(data)
@@ -1317,8 +2025,128 @@ class TINTagger(tk.Tk):
         elif splice_type == "ME":
             self.draw_mutually_exclusive_exons_event(data)
 
-        # Reset cursor now that we're done with loading everything
-        #self.config(cursor="")
+        # Hide the rows of samples this event doesn't have, and fit the reused canvases to their size
+        self.hide_unused_rows(len(data["samples"]))
+        for row_canvas in [self.exon_name_canvas] + self.canvases:
+            row_canvas.fit_to_size()
+
+        self.update_sample_scrollbar(len(visible_names), len(sample_names_sorted))
+
+    def get_visible_sample_count(self):
+        """
+        Returns how many sample rows of at least sample_row_min_height fit below the exon names.
+        """
+        height = self.left_frame.winfo_height()
+        if height <= 1:
+            # Not laid out yet
+            height = self.winfo_height()
+        exon_name_height = 30
+        return max(1, (height - exon_name_height) // self.sample_row_min_height)
+
+    def update_sample_scrollbar(self, visible_count, sample_count):
+        """
+        Shows which part of the samples is drawn in the scrollbar and sample header, or hides the scrollbar if all
+        samples are drawn.
+        """
+        if visible_count >= sample_count:
+            self.sample_scrollbar.grid_remove()
+            self.sample_header_label["text"] = "Samples"
+            return
+
+        self.sample_scrollbar.grid()
+        self.sample_scrollbar.set(float(self.first_visible_sample) / sample_count, float(self.first_visible_sample + visible_count) / sample_count)
+        self.sample_header_label["text"] = "Samples %d-%d/%d" % (self.first_visible_sample + 1, self.first_visible_sample + visible_count, sample_count)
+
+    def scroll_samples(self, *args):
+        """
+        Scrollbar command: ("moveto", <fraction>) or ("scroll", <number>, "units" or "pages").
+        """
+        if self.current_row_data is None:
+            return
+
+        sample_count = len(self.current_row_data["samples"])
+        visible_count = self.get_visible_sample_count()
+        if args[0] == "moveto":
+            first_visible_sample = int(round(float(args[1]) * sample_count))
+        elif args[0] == "scroll":
+            step = visible_count if args[2] == "pages" else 1
+            first_visible_sample = self.first_visible_sample + int(args[1]) * step
+        else:
+            return
+
+        first_visible_sample = max(0, min(first_visible_sample, sample_count - visible_count))
+        if first_visible_sample != self.first_visible_sample:
+            self.first_visible_sample = first_visible_sample
+            self.draw_event(self.current_row_data)
+
+    def on_sample_mouse_wheel(self, event):
+        """
+        Scrolls the samples when the mouse wheel is turned over them.
+        """
+        if not str(event.widget).startswith(str(self.left_frame)):
+            return
+        if event.num == 4 or event.delta > 0:
+            self.scroll_samples("scroll", -1, "units")
+        else:
+            self.scroll_samples("scroll", 1, "units")
+
+    def schedule_sample_redraw(self):
+        """
+        Redraws the current event once the window is done resizing, if a different number of samples fits.
+        """
+        if self.sample_redraw_pending or self.current_row_data is None:
+            return
+
+        def redraw():
+            self.sample_redraw_pending = False
+            drawn_count = len(self.canvases)
+            sample_count = len(self.current_row_data["samples"])
+            if min(self.get_visible_sample_count(), sample_count) != drawn_count:
+                self.draw_event(self.current_row_data)
+
+        self.sample_redraw_pending = True
+        self.after_idle(redraw)
+
+    def prefetch_mutually_exclusive_exons(self):
+        """
+        Fetches exon RPKMs for the current event and all upcoming ME events within the prefetch window in one query,
+        unless the current event has already been fetched.
+        """
+        if self.current_asid in self.data_processor.me_exon_rpkm_cache:
+            return
+
+        current_index = self.all_asids.index(self.current_asid)
+        window = self.all_asids[current_index:current_index + self.data_processor.me_prefetch_window]
+        upcoming_me_asids = [as_id for as_id in window if as_id in self.me_asids]
+        self.data_processor.prefetch_rpkm_for_mutually_exclusive_exons(self.sample_names, upcoming_me_asids)
+
+    def prefetch_explanations(self):
+        """
+        Explains the model's predictions for the current event and the ones in the prefetch window after it in one
+        batch, unless the current event has already been explained. See TINLearner.explain_events().
+        """
+        tin_learner = self.data_processor.tin_learner
+        if self.current_asid in tin_learner.explanations or tin_learner.models[tin_learner.explanation_model] is None:
+            return
+
+        current_index = self.all_asids.index(self.current_asid)
+        window = self.all_asids[current_index:current_index + tin_learner.explanation_prefetch_window]
+        tin_learner.explain_events(self.original_dataset, window)
+
+    def show_explanation(self, as_id, sample_name):
+        """
+        Shows the model's prediction for a sample in the sidebar, with the features that contributed most to it.
+        """
+        tin_learner = self.data_processor.tin_learner
+        explanation = tin_learner.explanations.get(as_id, {}).get(sample_name)
+        if explanation is None:
+            self.explanation_text["text"] = ""
+            return
+
+        lines = ["%s: %s (%.2f)" % (MODEL_TYPES[tin_learner.explanation_model].label, TAG_LABELS[explanation["tag"]], explanation["probability"])]
+        for feature, contribution in explanation["top_features"]:
+            lines.append("%+.2f %s" % (contribution, feature))
+        self.explanation_text["text"] = "\n".join(lines)
 
     def is_dataset_loaded(self):
         """
@@ -1357,16 +2185,16 @@ class TINTagger(tk.Tk):
         positive, negative, and neutral tags are in the dataset.
         """
 
-        # Find events that are tagged as interesting
-        positive_tags = len(self.original_dataset.loc[self.original_dataset["event_tag"] == TAG_INTERESTING])
+        # Count all tags in one pass
+        tag_counts = self.original_dataset["event_tag"].value_counts()
+
+        positive_tags = tag_counts.get(TAG_INTERESTING, 0)
         self.statusbar_text_interesting["text"] = "%d" % positive_tags
 
-        # Find events that are tagged as not interesting
-        negative_tags = len(self.original_dataset.loc[self.original_dataset["event_tag"] == TAG_NOT_INTERESTING])
+        negative_tags = tag_counts.get(TAG_NOT_INTERESTING, 0)
         self.statusbar_text_not_interesting["text"] = "%d" % negative_tags
 
-        # Find events that are tagged as uncertain
-        neutral_tags = len(self.original_dataset.loc[self.original_dataset["event_tag"] == TAG_UNCERTAIN])
+        neutral_tags = tag_counts.get(TAG_UNCERTAIN, 0)
         self.statusbar_text_uncertain["text"] = "%d" % neutral_tags
 
         # Find how many events are tagged, in total
@@ -1374,6 +2202,85 @@ class TINTagger(tk.Tk):
         total_tags = positive_tags + negative_tags + neutral_tags
         self.statusbar_text_progress["text"] = "%d/%d" % (total_tags, total_events)
 
+    def bulk_tag_current_event(self, tag):
+        """
+        Tags all samples of the current event at once, and redraws it.
+        """
+        if not isinstance(self.original_dataset, pd.DataFrame):
+            return
+
+        mask = self.data_processor.get_event_mask(self.original_dataset, self.current_asid)
+        tagged = self.data_processor.bulk_set_tags(self.original_dataset, mask, tag)
+        self.record_bulk_tags_for_online_learning(tagged)
+        self.update_information()
+        self.set_statusbar_text("Tagged %d samples of event %d as %s. Ctrl+Z to undo." % (len(tagged), self.current_asid, TAG_LABELS[tag]))
+
+    def bulk_tag_filtered_dataset(self, tag):
+        """
+        Tags every row matching the current filter at once, after asking the user.
+        """
+        if not isinstance(self.original_dataset, pd.DataFrame):
+            return
+
+        mask = self.original_dataset.index.isin(self.dataset.index)
+        if not tkMessageBox.askyesno("Tag filtered dataset", "Tag all %d rows matching the current filter as %s?" % (mask.sum(), TAG_LABELS[tag])):
+            return
+
+        tagged = self.data_processor.bulk_set_tags(self.original_dataset, mask, tag)
+        self.record_bulk_tags_for_online_learning(tagged)
+        self.update_information()
+        self.set_statusbar_text("Tagged %d rows as %s. Ctrl+Z to undo." % (len(tagged), TAG_LABELS[tag]))
+
+    def accept_model_predictions(self, name):
+        """
+        Turns the named model's predictions into tags, for the untagged rows matching the current filter that it
+        predicted with at least the confidence the user asks for.
+        """
+        if not isinstance(self.original_dataset, pd.DataFrame):
+            return
+
+        model_type = MODEL_TYPES[name]
+        if self.data_processor.tin_learner.models[name] is None:
+            self.set_statusbar_text("Cannot accept predictions: %s has not been trained." % model_type.label)
+            return
+
+        min_confidence = tkSimpleDialog.askfloat(
+            "Accept predictions",
+            "Tag untagged rows in the current filter with the %s prediction, where its confidence is at least:" % model_type.label.lower(),
+            initialvalue=0.9, minvalue=0.0, maxvalue=1.0
+        )
+        if min_confidence is None:
+            return
+
+        mask = self.data_processor.get_confident_prediction_mask(self.original_dataset, name, min_confidence)
+        mask &= self.original_dataset.index.isin(self.dataset.index)
+        tagged = self.data_processor.bulk_set_tags(self.original_dataset, mask, self.original_dataset[model_type.tag_column].values)
+        self.record_bulk_tags_for_online_learning(tagged)
+        self.update_information()
+        self.set_statusbar_text("Accepted %d %s predictions. Ctrl+Z to undo." % (len(tagged), model_type.label.lower()))
+
+    def undo_bulk_tagging(self):
+        """
+        Undoes the last bulk tagging.
+        """
+        if not isinstance(self.original_dataset, pd.DataFrame):
+            return
+
+        restored = self.data_processor.undo_bulk_set_tags(self.original_dataset)
+        if restored is None:
+            self.set_statusbar_text("Nothing to undo.")
+            return
+
+        # The incremental models may have learned the undone tags, so they're fitted anew
+        tin_learner = self.data_processor.tin_learner
+        self.cancel_online_update()
+        tin_learner.retract_incremental_tags()
+        if tin_learner.online_learning_enabled and len(tin_learner.stale_incremental_models) > 0:
+            self.request_online_update()
+
+        self.update_information()
+        self.set_statusbar_text("Restored the tags of %d rows." % restored)
+
     def save_file(self):
         print "Bleep, blop, saving file."
         filepath = asksaveasfilename(title="Save filters", defaultextension=".tsv")
@@ -1390,7 +2297,12 @@ class TINTagger(tk.Tk):
         Find and display next untagged event.
         """
         # Note: self.dataset is correct, because we want to respect current filter
-        untagged_asid = self.data_processor.get_next_untagged_asid(self.current_asid, self.dataset)
+        if self.active_learning_enabled.get() and self.active_learning_ranking is not None:
+            untagged_asid = self.data_processor.get_next_ranked_asid(self.active_learning_ranking, self.current_asid, self.dataset)
+        else:
+            if self.active_learning_enabled.get():
+                self.set_statusbar_text("Train a model to rank events by how informative they are.")
+            untagged_asid = self.data_processor.get_next_untagged_asid(self.current_asid, self.dataset)
 
         if untagged_asid == self.current_asid:
             # No untagged event found
@@ -1479,24 +2391,18 @@ class TINTagger(tk.Tk):
 
     def clear_all_canvases(self):
         """
-        Clear and delete canvases before drawing new ones.
+        Forgets the canvases of the previous event before drawing new ones.
         """
 
-        # Clear all objects on canvas
-        for row_canvas in self.canvases:
-            row_canvas.delete("all")
-
-        # Empty list of canvases
+        # The canvases are reused, their items are hidden by ResizingCanvas.reset() when the next event is drawn
         self.canvases = []
 
     def populate_samples_frame(self, data):
         """
-        Takes a dataset containing information about all samples and populates the left samples bar.
+        Takes a dataset containing information about all samples and populates the left samples bar. The row
+        widgets are reused between events, see get_sample_row().
         """
 
-        # Lambda to prevent lazy-interpretation of RPKMs (for on-hover display of RPKM)
-        store_rpkm_text = lambda x: (lambda p: self.print_test(x))
-
         # Keep track of which row we're at
         row_number = 1  # Row number 0 is the sample header
         for sample_name in sorted(data["samples"].keys(), key=natural_sort_key):
@@ -1515,52 +2421,131 @@ class TINTagger(tk.Tk):
             except ValueError:
                 gene_rpkm_percent_of_max = 0
 
-            # Create frame for this sample
-            frame_for_sample = ttk.Frame(self.sample_frame, padding=5)
-            frame_for_sample.grid(column=0, row=row_number, sticky="NEWS")
+            # Get the frame for this sample
+            sample_row = self.get_sample_row(row_number)
+            sample_row["frame"].grid()
             self.sample_frame.rowconfigure(row_number, weight=1)
 
             # Display RPKM info in statusbar on hover
-            display_text = "%s gene RPKM: %s/%s (%.0f%%)" % (
+            sample_row["display_text"] = "%s gene RPKM: %s/%s (%.0f%%)" % (
                 sample_name, str(gene_rpkm), str(sample_data["max_gene_rpkm"]), gene_rpkm_percent_of_max)
-            frame_for_sample.bind("<Enter>", store_rpkm_text(display_text))
             rpkm_color = COLOR_RED
 
-            # Create text for sample name
+            # Sample name
             text_style = "TLabel"
             if not sample_data["is_reported"]:
                 text_style = "Graytext.TLabel"
                 rpkm_color = COLOR_DARKWHITE
-            sample_text = ttk.Label(frame_for_sample, text=sample_name, font="TkDefaultFont", anchor=tk.CENTER, style=text_style)
-            sample_text.grid(column=0, row=0, sticky="NEWS")
+            sample_row["sample_text"].configure(text=sample_name, style=text_style)
+
+            # Fill remaining (what's left of 100% after this RPKM)
+            remainder_color = self.frame_background
+            if gene_rpkm_percent_of_max == 100:
+                # Hack to make it look like it's actually 100% and not just 99%
+                remainder_color = rpkm_color
+            sample_row["remainder_frame"].configure(background=remainder_color)
+            # Fill for RPKM
+            sample_row["fill_frame"].configure(background=rpkm_color)
+            sample_row["rpkm_frame"].rowconfigure(0, weight=100 - int(gene_rpkm_percent_of_max))
+            sample_row["rpkm_frame"].rowconfigure(1, weight=int(gene_rpkm_percent_of_max))
+
+            row_number += 1
+
+    def get_sample_row(self, row_number):
+        """
+        Returns the widgets of a row in the sample frame, creating them the first time the row is needed.
+        """
+        while len(self.sample_rows) < row_number:
+            sample_row = {"display_text": ""}
+
+            # Create frame for this sample
+            frame_for_sample = ttk.Frame(self.sample_frame, padding=5)
+            frame_for_sample.grid(column=0, row=len(self.sample_rows) + 1, sticky="NEWS")
+            frame_for_sample.bind("<Enter>", lambda event, sample_row=sample_row: self.print_test(sample_row["display_text"]))
+            sample_row["frame"] = frame_for_sample
+
+            # Create text for sample name
+            sample_row["sample_text"] = ttk.Label(frame_for_sample, font="TkDefaultFont", anchor=tk.CENTER)
+            sample_row["sample_text"].grid(column=0, row=0, sticky="NEWS")
             frame_for_sample.columnconfigure(0, weight=9)
 
             # Create RPKM-indicator to the right
             rpkm_frame = ttk.Frame(frame_for_sample, borderwidth=1, relief=tk.SUNKEN)
             rpkm_frame.grid(column=1, row=0, sticky="ENS")
-
+            sample_row["rpkm_frame"] = rpkm_frame
             frame_for_sample.columnconfigure(1, weight=1)
             frame_for_sample.rowconfigure(0, weight=1)
-            # Fill remaining (what's left of 100% after this RPKM)
-            remainder_frame = ttk.Frame(rpkm_frame, width=10)
-            if gene_rpkm_percent_of_max == 100:
-                # Hack to make it look like it's actually 100% and not just 99%
-                remainder_frame = tk.Frame(rpkm_frame, width=10, background=rpkm_color)
-            remainder_frame.grid(column=0, row=0, sticky="NEWS")
-            # Fill for RPKM
-            fill_frame = tk.Frame(rpkm_frame, bg=rpkm_color)
-            fill_frame.grid(column=0, row=1, sticky="NEWS")
-            rpkm_frame.rowconfigure(0, weight=100 - int(gene_rpkm_percent_of_max))
-            rpkm_frame.rowconfigure(1, weight=int(gene_rpkm_percent_of_max))
+            sample_row["remainder_frame"] = tk.Frame(rpkm_frame, width=10)
+            sample_row["remainder_frame"].grid(column=0, row=0, sticky="NEWS")
+            sample_row["fill_frame"] = tk.Frame(rpkm_frame)
+            sample_row["fill_frame"].grid(column=0, row=1, sticky="NEWS")
 
-            row_number += 1
+            self.sample_rows.append(sample_row)
 
-            # TEST: Draw separator
-            #sep = tk.Frame(self.sample_frame, bg=COLOR_DARKWHITE, height=2)
-            #sep.grid(row=row_number, column=0, sticky="NEWS")
-            #row_number+=1
-            # For this to look nice, the sample_frame needs a 1-wide padding at the bottom.
-            # END TEST
+        return self.sample_rows[row_number - 1]
+
+    def get_exon_name_canvas(self, background, width, height):
+        """
+        Returns the canvas for exon names at the top of the exon frame, cleared for a new event.
+        """
+        if self.exon_name_canvas is None:
+            self.exon_name_canvas = ResizingCanvas(self.exon_frame, self.canvas_resize_coordinator, bg=background, highlightthickness=0, width=width, height=height)
+            self.exon_name_canvas.grid(column=0, row=0, sticky="NEWS")
+        else:
+            self.exon_name_canvas.configure(bg=background)
+            self.exon_name_canvas.reset(width, height)
+        return self.exon_name_canvas
+
+    def get_exon_row(self, row_number):
+        """
+        Returns the widgets of a sample row in the exon frame, creating them the first time the row is needed.
+        Sample rows are at odd row numbers in the grid (row 0 holds the exon names), each followed by a separator.
+        """
+        index = (row_number - 1) // 2
+        while len(self.exon_rows) <= index:
+            grid_row = len(self.exon_rows) * 2 + 1
+            exon_row = {"sample_name": None, "as_id": None}
+
+            exon_row["canvas"] = ResizingCanvas(self.exon_frame, self.canvas_resize_coordinator, highlightthickness=0)
+            exon_row["canvas"].grid(row=grid_row, column=0, sticky="NEWS")
+            exon_row["separator"] = tk.Frame(self.exon_frame, bg=COLOR_DARKWHITE, height=2)
+            exon_row["separator"].grid(row=grid_row + 1, column=0, sticky="NEWS")
+            exon_row["button_separator"] = tk.Frame(self.exon_frame, bg=COLOR_DARKWHITE, height=2)
+            exon_row["button_separator"].grid(row=grid_row + 1, column=1, sticky="NEWS")
+
+            self.create_tagging_buttons(exon_row, grid_row)
+            self.exon_rows.append(exon_row)
+
+        return self.exon_rows[index]
+
+    def get_row_canvas(self, row_number, background, width, height):
+        """
+        Returns the canvas of a sample row in the exon frame, cleared for a new event.
+        """
+        exon_row = self.get_exon_row(row_number)
+        for widget in ["canvas", "separator", "button_separator"]:
+            exon_row[widget].grid()
+
+        row_canvas = exon_row["canvas"]
+        row_canvas.configure(bg=background)
+        row_canvas.reset(width, height)
+        self.canvases.append(row_canvas)
+        return row_canvas
+
+    def hide_unused_rows(self, sample_count):
+        """
+        Hides the pooled rows of the exon and sample frames beyond the first sample_count, and stops them from
+        taking up space.
+        """
+        for index in range(sample_count, len(self.exon_rows)):
+            exon_row = self.exon_rows[index]
+            for widget in ["canvas", "separator", "button_separator", "tagging_container"]:
+                exon_row[widget].grid_remove()
+            self.exon_frame.rowconfigure(index * 2 + 1, weight=0)
+
+        for index in range(sample_count, len(self.sample_rows)):
+            self.sample_rows[index]["frame"].grid_remove()
+            self.sample_frame.rowconfigure(index + 1, weight=0)
 
     def tag_button_clicked(self, sample_name, as_id, new_tag, up_button, down_button, uncertain_button):
         """
@@ -1580,6 +2565,14 @@ class TINTagger(tk.Tk):
         # Update the (original) dataset
         self.data_processor.set_tag_by_sample_name_and_as_id(set_tag, sample_name, as_id, self.original_dataset)
 
+        # A removed or replaced tag may have been learned by the incremental models already. They can't unlearn it,
+        # so they're fitted anew on the remaining tags at their next update.
+        if current_tag != TAG_NO_TAG:
+            self.cancel_online_update()
+            self.data_processor.tin_learner.retract_incremental_tags()
+        if set_tag != TAG_NO_TAG:
+            self.record_tag_for_online_learning(as_id, sample_name)
+
         # Clear all button styles
         up_button.configure(style=STYLE_BUTTON_INTERESTING_OFF)
         down_button.configure(style=STYLE_BUTTON_NOT_INTERESTING_OFF)
@@ -1597,109 +2590,98 @@ class TINTagger(tk.Tk):
         # Finally, update tag information in status-bar
         self.update_tag_information()
 
-    def add_tagging_buttons(self, row_number, sample_name, is_reported, sample_tag, as_id, decision_tree_tag):
+    def create_tagging_buttons(self, exon_row, row_number):
         """
-        Add buttons
+        Creates the tagging buttons of a pooled exon frame row, and a strip per model showing the tag it predicts for
+        the sample. The callbacks read the row's current sample and as_id, so they survive reuse.
         """
         #########################
         # Setup tagging buttons #
         #########################
-        # TEST: Algo tag
-        algo_tag_color = COLOR_DARKWHITE
-        if decision_tree_tag == TAG_NOT_INTERESTING:
-            algo_tag_color = COLOR_NOT_INTERESTING
-        elif decision_tree_tag == TAG_INTERESTING:
-            algo_tag_color = COLOR_INTERESTING
-        elif decision_tree_tag == TAG_UNCERTAIN:
-            algo_tag_color = COLOR_UNCERTAIN
-
-        if not is_reported:
-            algo_tag_color = COLOR_DARKWHITE
-        # END TEST: Algo tag
-
-        # Create a frame in which to store algorithm tag indicator + frame for buttons
+        # Create a frame in which to store algorithm tag indicators + frame for buttons
         tagging_container = ttk.Frame(self.exon_frame)
-        algo_tag_frame_column = 1
         button_frame_column = 0
         algo_tag_indicator_width = 5
         # Make the button frame expand to fill the remaining space
         tagging_container.grid(row=row_number, column=1, sticky="NEWS")
-        # Make both the algo-tag indicator and the button frame fill vertical space
+        # Make both the algo-tag indicators and the button frame fill vertical space
         tagging_container.columnconfigure(button_frame_column, weight=1)
         tagging_container.rowconfigure(0, weight=1)
+        tagging_container.bind("<Enter>", lambda event: self.show_explanation(exon_row["as_id"], exon_row["sample_name"]))
+        exon_row["tagging_container"] = tagging_container
 
-        # Create a frame for algorithm tag indicator
-        algo_tag_frame = tk.Frame(tagging_container, bg=algo_tag_color, width=algo_tag_indicator_width)
-        algo_tag_frame.grid(row=0, column=algo_tag_frame_column, sticky="NEWS")
+        # Create a frame for each model's tag indicator, right of the buttons
+        exon_row["indicators"] = {}
+        for model_number, name in enumerate(self.data_processor.tin_learner.enabled_models):
+            algo_tag_frame = tk.Frame(tagging_container, bg=COLOR_DARKWHITE, width=algo_tag_indicator_width)
+            algo_tag_frame.grid(row=0, column=button_frame_column + 1 + model_number, sticky="NEWS")
+            algo_tag_frame.bind("<Enter>", lambda event, label=MODEL_TYPES[name].label: self.set_statusbar_text("%s prediction" % label))
+            exon_row["indicators"][name] = algo_tag_frame
 
         button_frame = ttk.Frame(tagging_container)
         button_frame.grid(row=0, column=button_frame_column, sticky="NEWS")
         # Tag interesting button
-        up_button_style = STYLE_BUTTON_INTERESTING_ON if sample_tag == TAG_INTERESTING else STYLE_BUTTON_INTERESTING_OFF
-        up_button = ttk.Button(
-            button_frame,
-            text=u"\u25B2", style=up_button_style,
-        )
+        up_button = ttk.Button(button_frame, text=u"\u25B2", style=STYLE_BUTTON_INTERESTING_OFF)
         up_button.grid(column=0, row=0, sticky="NEWS")
         # Tag not interesting button
-        down_button_style = STYLE_BUTTON_NOT_INTERESTING_ON if sample_tag == TAG_NOT_INTERESTING else STYLE_BUTTON_NOT_INTERESTING_OFF
-        down_button = ttk.Button(
-            button_frame,
-            text=u"\u25BC",
-            style=down_button_style,
-        )
+        down_button = ttk.Button(button_frame, text=u"\u25BC", style=STYLE_BUTTON_NOT_INTERESTING_OFF)
         down_button.grid(column=0, row=1, sticky="NEWS")
         # Tag uncertain button
-        uncertain_button_style = STYLE_BUTTON_UNCERTAIN_ON if sample_tag == TAG_UNCERTAIN else STYLE_BUTTON_UNCERTAIN_OFF
-        uncertain_button = ttk.Button(
-            button_frame,
-            text="?",
-            style=uncertain_button_style,
-        )
+        uncertain_button = ttk.Button(button_frame, text="?", style=STYLE_BUTTON_UNCERTAIN_OFF)
         uncertain_button.grid(column=0, row=2, sticky="NEWS")
+        exon_row["up_button"] = up_button
+        exon_row["down_button"] = down_button
+        exon_row["uncertain_button"] = uncertain_button
 
         # Set callback functions for all buttons
-        up_button.config(command=lambda name=sample_name, splice_id=as_id, new_tag=TAG_INTERESTING, button_up=up_button, button_down=down_button, button_uncertain=uncertain_button: self.tag_button_clicked(name, splice_id, new_tag, button_up, button_down, button_uncertain))
-        down_button.config(command=lambda name=sample_name, splice_id=as_id, new_tag=TAG_NOT_INTERESTING, button_up=up_button, button_down=down_button, button_uncertain=uncertain_button: self.tag_button_clicked(name, splice_id, new_tag, button_up, button_down, button_uncertain))
-        uncertain_button.config(command=lambda name=sample_name, splice_id=as_id, new_tag=TAG_UNCERTAIN, button_up=up_button, button_down=down_button, button_uncertain=uncertain_button: self.tag_button_clicked(name, splice_id, new_tag, button_up, button_down, button_uncertain))
-
-        # TEST
-        #uncertain_button.bind("<Button-3>", self.right_click)
-        down_button.bind("<Button-2>", self.right_click)
-        self.all_uninteresting_buttons.append(down_button)
-        #uncertain_button.bind("<Button-1>", self.right_click)
-        # END TEST
+        for button, new_tag in [(up_button, TAG_INTERESTING), (down_button, TAG_NOT_INTERESTING), (uncertain_button, TAG_UNCERTAIN)]:
+            button.config(command=lambda new_tag=new_tag: self.tag_button_clicked(exon_row["sample_name"], exon_row["as_id"], new_tag, up_button, down_button, uncertain_button))
 
-        # Disable buttons if the event is not reported for this sample
-        if not is_reported:
-            up_button.state(["disabled"])
-            down_button.state(["disabled"])
-            uncertain_button.state(["disabled"])
+        # Middle-click tags all samples of the event as not interesting
+        down_button.bind("<Button-2>", lambda event=None: self.bulk_tag_current_event(TAG_NOT_INTERESTING))
 
         button_frame.rowconfigure(0, weight=1)
         button_frame.rowconfigure(1, weight=1)
         button_frame.rowconfigure(2, weight=1)
         # END tagging buttons
 
-    def right_click(self, event):
-        print "RIGHT CLICK"
+    def add_tagging_buttons(self, row_number, sample_name, is_reported, sample_tag, as_id, model_tags=None):
         """
-        # THIS WORKS, BUT IS EXTREMELY HACKY (AND SLOW)
-        # Mark all as uncertain
-        for child in self.exon_frame.winfo_children():
-            for subchild in child.winfo_children():
-                for subsubchild in subchild.winfo_children():
-                    print "Class:", subsubchild.winfo_class
-                    #if subsubchild.winfo_class == "Button":
-                    if isinstance(subsubchild, ttk.Button):
-                        print "It's a button"
-                        if subsubchild.cget("text") == "?":
-                            subsubchild.invoke()
-
+        Shows the tagging buttons of a row for this sample, and a strip per model showing the tag it predicts for
+        it. model_tags maps model names (see TINLearner.MODEL_TYPES) to predicted tags.
         """
+        if model_tags is None:
+            model_tags = {}
+
+        exon_row = self.get_exon_row(row_number)
+        exon_row["sample_name"] = sample_name
+        exon_row["as_id"] = as_id
+        exon_row["tagging_container"].grid()
+
+        # Color each model's tag indicator
+        for name, algo_tag_frame in exon_row["indicators"].items():
+            algo_tag_color = COLOR_DARKWHITE
+            model_tag = model_tags.get(name, TAG_NO_TAG)
+            if model_tag == TAG_NOT_INTERESTING:
+                algo_tag_color = COLOR_NOT_INTERESTING
+            elif model_tag == TAG_INTERESTING:
+                algo_tag_color = COLOR_INTERESTING
+            elif model_tag == TAG_UNCERTAIN:
+                algo_tag_color = COLOR_UNCERTAIN
+
+            if not is_reported:
+                algo_tag_color = COLOR_DARKWHITE
+            algo_tag_frame.configure(bg=algo_tag_color)
+
+        # Highlight the button of the current tag
+        exon_row["up_button"].configure(style=STYLE_BUTTON_INTERESTING_ON if sample_tag == TAG_INTERESTING else STYLE_BUTTON_INTERESTING_OFF)
+        exon_row["down_button"].configure(style=STYLE_BUTTON_NOT_INTERESTING_ON if sample_tag == TAG_NOT_INTERESTING else STYLE_BUTTON_NOT_INTERESTING_OFF)
+        exon_row["uncertain_button"].configure(style=STYLE_BUTTON_UNCERTAIN_ON if sample_tag == TAG_UNCERTAIN else STYLE_BUTTON_UNCERTAIN_OFF)
 
-        for uninteresting_button in self.all_uninteresting_buttons:
-            uninteresting_button.invoke()
+        # Disable buttons if the event is not reported for this sample
+        button_state = ["!disabled"] if is_reported else ["disabled"]
+        for button in ["up_button", "down_button", "uncertain_button"]:
+            exon_row[button].state(button_state)
 
     def draw_exon_skipping_event(self, data):
         """
@@ -1728,8 +2710,7 @@ class TINTagger(tk.Tk):
         # Draw exon names in top frame #
         ################################
         canvas_background = COLOR_WHITE
-        exon_name_canvas = ResizingCanvas(self.exon_frame, bg=canvas_background, highlightthickness=0, width=canvas_width, height=top_canvas_height)
-        exon_name_canvas.grid(column=0, row=row_number, sticky="NEWS")
+        exon_name_canvas = self.get_exon_name_canvas(canvas_background, canvas_width, top_canvas_height)
         row_number += 1
 
         # Add upstream exon name
@@ -1767,12 +2748,6 @@ class TINTagger(tk.Tk):
             is_reported = sample_data["is_reported"]
             sample_tag = sample_data["event_tag"]
             # TODO: Update colors depending on tag
-            try:
-                decision_tree_prediction = sample_data["decision_tree_prediction"]
-                print "TINTagger got prediction <%d> for sample <%s>" % (decision_tree_prediction, sample_name)
-            except KeyError:
-                # Decision tree tag is not set yet. Default to no tag
-                decision_tree_prediction = TAG_NO_TAG
 
             # Setup colors
             canvas_background = "white"
@@ -1785,24 +2760,17 @@ class TINTagger(tk.Tk):
                 exon_color = COLOR_DARKGRAY
                 exon_bordercolor = COLOR_DARKGRAY
 
-            # Initialize canvas and grid to this row in the exon frame
-            row_canvas = ResizingCanvas(self.exon_frame, bg=canvas_background, highlightthickness=0, width=canvas_width, height=canvas_height)
-            row_canvas.grid(row=row_number, column=0, sticky="NEWS")
-            # Keep track of canvases used
-            self.canvases.append(row_canvas)
+            # Get the canvas for this row in the exon frame
+            row_canvas = self.get_row_canvas(row_number, canvas_background, canvas_width, canvas_height)
 
             # Setup tagging buttons #
-            self.add_tagging_buttons(row_number, sample_name, is_reported, sample_tag, as_id, decision_tree_prediction)
+            self.add_tagging_buttons(row_number, sample_name, is_reported, sample_tag, as_id, sample_data["model_predictions"])
 
             # Set even weight for every row in the exon frame
             self.exon_frame.rowconfigure(row_number, weight=1)
 
-            # Add separator
+            # Skip the separator row, see get_row_canvas()
             row_number += 1
-            sep = tk.Frame(self.exon_frame, bg=COLOR_DARKWHITE, height=2)
-            sep.grid(row=row_number, column=0, sticky="NEWS")
-            button_sep = tk.Frame(self.exon_frame, bg=COLOR_DARKWHITE, height=2)
-            button_sep.grid(row=row_number, column=1, sticky="NEWS")
 
             ######################
             # Draw upstream exon #
@@ -1822,18 +2790,18 @@ class TINTagger(tk.Tk):
             upstream_exon_start_x = (width_per_exon_container - exon_width) / 2
 
             # Draw exon background
-            row_canvas.create_rectangle(upstream_exon_start_x, exon_start_y, upstream_exon_start_x + exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(upstream_exon_start_x, exon_start_y, upstream_exon_start_x + exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
 
             # Draw exon fill
             fill_start_y = (exon_start_y + exon_height) - (int((percent_of_max_rpkm/100) * exon_height))
             fill_end_y = exon_start_y + exon_height
-            row_canvas.create_rectangle(upstream_exon_start_x, fill_start_y, upstream_exon_start_x + exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(upstream_exon_start_x, fill_start_y, upstream_exon_start_x + exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor)
 
             # Draw rpkm text. NOTE: Text colors are controlled in ResizingCanvas.on_resize()
             upstream_exon_text_start_x = upstream_exon_start_x + (exon_width / 2)
             upstream_exon_text_start_y = exon_height - 10
-            upstream_textshadow = row_canvas.create_text(upstream_exon_text_start_x + 1, upstream_exon_text_start_y + 1, text="%.1f" % upstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
-            upstream_text = row_canvas.create_text(upstream_exon_text_start_x, upstream_exon_text_start_y, text="%.1f" % upstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+            upstream_textshadow = row_canvas.draw_text(upstream_exon_text_start_x + 1, upstream_exon_text_start_y + 1, text="%.1f" % upstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+            upstream_text = row_canvas.draw_text(upstream_exon_text_start_x, upstream_exon_text_start_y, text="%.1f" % upstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
             # TEST: Draw a box around the RPKM values
             #upstream_bbox = row_canvas.bbox(upstream_text)
             #rpkm_box = row_canvas.create_rectangle(upstream_bbox, outline="black", fill="white")
@@ -1872,19 +2840,19 @@ class TINTagger(tk.Tk):
                 sample_excluded_counts = sample_data["excluded_counts"]
                 psi_text_start_y = upstream_exon_text_start_y - 20
                 psi_text = "PSI: %.2f (%d/%d)" % (sample_psi, sample_included_counts, sample_excluded_counts)
-                row_canvas.create_text(main_exon_text_start_x, psi_text_start_y, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_COVERAGE)
+                row_canvas.draw_text(main_exon_text_start_x, psi_text_start_y, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_COVERAGE)
 
             # Draw exon background
             border_width = 1
-            row_canvas.create_rectangle(main_exon_start_x, exon_start_y, main_exon_start_x + exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor, width=border_width)
+            row_canvas.draw_rectangle(main_exon_start_x, exon_start_y, main_exon_start_x + exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor, width=border_width)
 
             # Draw exon fill
             fill_start_y = (exon_start_y + exon_height) - (int((percent_of_max_rpkm/100) * exon_height))
-            row_canvas.create_rectangle(main_exon_start_x, fill_start_y, main_exon_start_x + exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor, width=border_width)
+            row_canvas.draw_rectangle(main_exon_start_x, fill_start_y, main_exon_start_x + exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor, width=border_width)
 
             # Draw rpkm text. NOTE: Text colors are controlled in ResizingCanvas.on_resize()
-            row_canvas.create_text(main_exon_text_start_x + 1, upstream_exon_text_start_y + 1, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
-            row_canvas.create_text(main_exon_text_start_x, upstream_exon_text_start_y, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+            row_canvas.draw_text(main_exon_text_start_x + 1, upstream_exon_text_start_y + 1, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+            row_canvas.draw_text(main_exon_text_start_x, upstream_exon_text_start_y, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
 
             ########################
             # Draw downstream exon #
@@ -1901,24 +2869,24 @@ class TINTagger(tk.Tk):
             downstream_exon_start_x = main_exon_start_x + width_per_exon_container
 
             # Draw exon background
-            row_canvas.create_rectangle(downstream_exon_start_x, exon_start_y, downstream_exon_start_x + exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(downstream_exon_start_x, exon_start_y, downstream_exon_start_x + exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
 
             # Draw exon fill
             fill_start_y = (exon_start_y + exon_height) - (int((percent_of_max_rpkm/100) * exon_height))
-            row_canvas.create_rectangle(downstream_exon_start_x, fill_start_y, downstream_exon_start_x + exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(downstream_exon_start_x, fill_start_y, downstream_exon_start_x + exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor)
 
             # Draw rpkm text
             downstream_exon_text_start_x = downstream_exon_start_x + (exon_width / 2)
-            row_canvas.create_text(downstream_exon_text_start_x + 1, upstream_exon_text_start_y + 1, text="%.1f" % downstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
-            row_canvas.create_text(downstream_exon_text_start_x, upstream_exon_text_start_y, text="%.1f" % downstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+            row_canvas.draw_text(downstream_exon_text_start_x + 1, upstream_exon_text_start_y + 1, text="%.1f" % downstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+            row_canvas.draw_text(downstream_exon_text_start_x, upstream_exon_text_start_y, text="%.1f" % downstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
 
             # Update row index for next sample
             row_number += 1
 
         # Draw the names of the exons above the drawings
-        exon_name_canvas.create_text(upstream_exon_text_start_x, top_canvas_height / 2, text=upstream_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
-        exon_name_canvas.create_text(main_exon_text_start_x, top_canvas_height / 2, text=exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
-        exon_name_canvas.create_text(downstream_exon_text_start_x, top_canvas_height / 2, text=downstream_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
+        exon_name_canvas.draw_text(upstream_exon_text_start_x, top_canvas_height / 2, text=upstream_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
+        exon_name_canvas.draw_text(main_exon_text_start_x, top_canvas_height / 2, text=exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
+        exon_name_canvas.draw_text(downstream_exon_text_start_x, top_canvas_height / 2, text=downstream_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
 
         # Expand exon frame horizontally
         self.exon_frame.columnconfigure(0, weight=1)
@@ -1956,8 +2924,7 @@ class TINTagger(tk.Tk):
         # Draw exon names in top frame #
         ################################
         canvas_background = COLOR_WHITE
-        exon_name_canvas = ResizingCanvas(self.exon_frame, bg=canvas_background, highlightthickness=0, width=canvas_width, height=top_canvas_height)
-        exon_name_canvas.grid(column=0, row=row_number, sticky="NEWS")
+        exon_name_canvas = self.get_exon_name_canvas(canvas_background, canvas_width, top_canvas_height)
         row_number += 1
 
         # Add upstream exon name
@@ -2006,21 +2973,14 @@ class TINTagger(tk.Tk):
                 exon_bordercolor = COLOR_DARKGRAY
                 intron_color = COLOR_DARKGRAY
                 intron_border_color = canvas_background
-            # Initialize canvas and grid to this row in the exon frame
-            row_canvas = ResizingCanvas(self.exon_frame, bg=canvas_background, highlightthickness=0, width=canvas_width, height=canvas_height)
-            row_canvas.grid(row=row_number, column=0, sticky="NEWS")
-            # Keep track of canvases used
-            self.canvases.append(row_canvas)
+            # Get the canvas for this row in the exon frame
+            row_canvas = self.get_row_canvas(row_number, canvas_background, canvas_width, canvas_height)
             # Setup tagging buttons
-            self.add_tagging_buttons(row_number, sample_name, is_reported, sample_tag, as_id)
+            self.add_tagging_buttons(row_number, sample_name, is_reported, sample_tag, as_id, sample_data["model_predictions"])
             # Set even weight for every row in the exon frame
             self.exon_frame.rowconfigure(row_number, weight=1)
-            # Add separator
+            # Skip the separator row, see get_row_canvas()
             row_number += 1
-            sep = tk.Frame(self.exon_frame, bg=COLOR_DARKWHITE, height=2)
-            sep.grid(row=row_number, column=0, sticky="NEWS")
-            button_sep = tk.Frame(self.exon_frame, bg=COLOR_DARKWHITE, height=2)
-            button_sep.grid(row=row_number, column=1, sticky="NEWS")
 
             ######################
             # Draw upstream exon #
@@ -2036,7 +2996,7 @@ class TINTagger(tk.Tk):
                 percent_of_max_rpkm = 0
 
             # Draw exon background
-            row_canvas.create_rectangle(
+            row_canvas.draw_rectangle(
                 upstream_exon_start_x,
                 exon_start_y,
                 upstream_exon_stop_x,
@@ -2046,7 +3006,7 @@ class TINTagger(tk.Tk):
             # Draw exon fill
             fill_start_y = (exon_start_y + exon_height) - (int((percent_of_max_rpkm/100) * exon_height))
             fill_end_y = exon_start_y + exon_height
-            row_canvas.create_rectangle(
+            row_canvas.draw_rectangle(
                 upstream_exon_start_x,
                 fill_start_y,
                 upstream_exon_stop_x,
@@ -2057,7 +3017,7 @@ class TINTagger(tk.Tk):
             # Draw rpkm text
             upstream_exon_text_start_x = upstream_exon_start_x + (exon_width / 2)
             upstream_exon_text_start_y = exon_height - 10
-            row_canvas.create_text(
+            row_canvas.draw_text(
                 upstream_exon_text_start_x + 1,
                 upstream_exon_text_start_y + 1,
                 text="%.1f" % upstream_exon_rpkm,
@@ -2065,7 +3025,7 @@ class TINTagger(tk.Tk):
                 fill=COLOR_CANVAS_TEXT_SHADOW,
                 tags=TEXTTAG_SHADOW
             )
-            row_canvas.create_text(
+            row_canvas.draw_text(
                 upstream_exon_text_start_x,
                 upstream_exon_text_start_y,
                 text="%.1f" % upstream_exon_rpkm,
@@ -2088,7 +3048,7 @@ class TINTagger(tk.Tk):
                 percent_of_max_rpkm = 0
 
             # Draw exon background
-            row_canvas.create_rectangle(
+            row_canvas.draw_rectangle(
                 downstream_exon_start_x,
                 exon_start_y,
                 downstream_exon_stop_x,
@@ -2098,7 +3058,7 @@ class TINTagger(tk.Tk):
             )
             # Draw exon fill
             fill_start_y = (exon_start_y + exon_height) - (int((percent_of_max_rpkm / 100) * exon_height))
-            row_canvas.create_rectangle(
+            row_canvas.draw_rectangle(
                 downstream_exon_start_x,
                 fill_start_y,
                 downstream_exon_start_x + exon_width,
@@ -2108,7 +3068,7 @@ class TINTagger(tk.Tk):
             )
             # Draw rpkm text
             downstream_exon_text_start_x = downstream_exon_start_x + (exon_width / 2)
-            row_canvas.create_text(
+            row_canvas.draw_text(
                 downstream_exon_text_start_x + 1,
                 upstream_exon_text_start_y + 1,
                 text="%.1f" % (downstream_exon_rpkm),
@@ -2116,7 +3076,7 @@ class TINTagger(tk.Tk):
                 fill=COLOR_CANVAS_TEXT_SHADOW,
                 tags=TEXTTAG_SHADOW
             )
-            row_canvas.create_text(
+            row_canvas.draw_text(
                 downstream_exon_text_start_x,
                 upstream_exon_text_start_y,
                 text="%.1f" % (downstream_exon_rpkm),
@@ -2143,7 +3103,7 @@ class TINTagger(tk.Tk):
             # Draw intron coverage fill
             fill_start_y = (exon_start_y + exon_height) - (int((percent_of_max_rpkm/100) * exon_height))
             # Draw intron fill
-            row_canvas.create_rectangle(
+            row_canvas.draw_rectangle(
                 intron_start_x,
                 fill_start_y,
                 intron_stop_x,
@@ -2153,7 +3113,7 @@ class TINTagger(tk.Tk):
             )
             # Draw coverage text shadow and text
             main_exon_text_start_x = (canvas_width / 2)
-            row_canvas.create_text(
+            row_canvas.draw_text(
                 main_exon_text_start_x + 1,
                 upstream_exon_text_start_y + 1,
                 text="%.1f" % avg_rpkm,
@@ -2161,7 +3121,7 @@ class TINTagger(tk.Tk):
                 fill=COLOR_CANVAS_TEXT_SHADOW,
                 tags=TEXTTAG_SHADOW
             )
-            row_canvas.create_text(
+            row_canvas.draw_text(
                 main_exon_text_start_x,
                 upstream_exon_text_start_y,
                 text="%.1f" % avg_rpkm,
@@ -2182,7 +3142,7 @@ class TINTagger(tk.Tk):
                 sample_excluded_counts = sample_data["excluded_counts"]
                 psi_text_start_y = exon_start_y
                 psi_text = "PSI: %.2f (%d/%d)" % (sample_psi, sample_included_counts, sample_excluded_counts)
-                row_canvas.create_text(main_exon_text_start_x, psi_text_start_y, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+                row_canvas.draw_text(main_exon_text_start_x, psi_text_start_y, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
 
             ####################################
             # Update row index for next sample #
@@ -2190,9 +3150,9 @@ class TINTagger(tk.Tk):
             row_number += 1
 
         # Draw the names of the exons above the drawings
-        exon_name_canvas.create_text(upstream_exon_text_start_x, top_canvas_height / 2, text=upstream_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
-        exon_name_canvas.create_text(main_exon_text_start_x, top_canvas_height / 2, text=exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
-        exon_name_canvas.create_text(downstream_exon_text_start_x, top_canvas_height / 2, text=downstream_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
+        exon_name_canvas.draw_text(upstream_exon_text_start_x, top_canvas_height / 2, text=upstream_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
+        exon_name_canvas.draw_text(main_exon_text_start_x, top_canvas_height / 2, text=exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
+        exon_name_canvas.draw_text(downstream_exon_text_start_x, top_canvas_height / 2, text=downstream_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
 
         # Expand exon frame horizontally
         self.exon_frame.columnconfigure(0, weight=1)
@@ -2226,8 +3186,7 @@ class TINTagger(tk.Tk):
         # Draw top canvas containing exon names #
         #########################################
         canvas_background = COLOR_WHITE
-        exon_name_canvas = ResizingCanvas(self.exon_frame, bg=canvas_background, highlightthickness=0, width=canvas_width, height=top_canvas_height)
-        exon_name_canvas.grid(column=0, row=row_number, sticky="NEWS")
+        exon_name_canvas = self.get_exon_name_canvas(canvas_background, canvas_width, top_canvas_height)
         row_number += 1
 
         # Add upstream exon name
@@ -2278,25 +3237,17 @@ class TINTagger(tk.Tk):
             # Highlight background for sample of interest
             canvas_background = COLOR_WHITE
 
-            # Initialize canvas and grid it to this row in the exon frame
-            row_canvas = ResizingCanvas(self.exon_frame, bg=canvas_background, highlightthickness=0, width=canvas_width, height=canvas_height)
-            row_canvas.grid(row=row_number, column=0, sticky="NEWS")
-
-            # Keep track of canvases used
-            self.canvases.append(row_canvas)
+            # Get the canvas for this row in the exon frame
+            row_canvas = self.get_row_canvas(row_number, canvas_background, canvas_width, canvas_height)
 
             # Setup tagging buttons
-            self.add_tagging_buttons(row_number, sample_name, is_reported, sample_tag, as_id)
+            self.add_tagging_buttons(row_number, sample_name, is_reported, sample_tag, as_id, sample_data["model_predictions"])
 
             # Set even weight for every row in the center frame
             self.exon_frame.rowconfigure(row_number, weight=1)
 
-            # Add separator
+            # Skip the separator row, see get_row_canvas()
             row_number += 1
-            sep = tk.Frame(self.exon_frame, bg=COLOR_DARKWHITE, heigh=2)
-            sep.grid(row=row_number, column=0, sticky="NEWS")
-            button_sep = tk.Frame(self.exon_frame, bg=COLOR_DARKWHITE, height=2)
-            button_sep.grid(row=row_number, column=1, sticky="NEWS")
 
             ######################
             # Draw upstream exon #
@@ -2314,18 +3265,18 @@ class TINTagger(tk.Tk):
             upstream_exon_start_x = (donor_site_width - upstream_exon_width) / 2
 
             # Draw exon background
-            row_canvas.create_rectangle(upstream_exon_start_x, exon_start_y, upstream_exon_start_x + upstream_exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(upstream_exon_start_x, exon_start_y, upstream_exon_start_x + upstream_exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
 
             # Draw exon fill
             fill_start_y = (exon_start_y + exon_height) - (int((percent_of_max_rpkm/100) * exon_height))
             fill_end_y = exon_start_y + exon_height
-            row_canvas.create_rectangle(upstream_exon_start_x, fill_start_y, upstream_exon_start_x + upstream_exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(upstream_exon_start_x, fill_start_y, upstream_exon_start_x + upstream_exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor)
 
             # Draw coverage text
             upstream_exon_text_start_x = upstream_exon_start_x + (upstream_exon_width / 2)
             upstream_exon_text_start_y = exon_height - 10
-            row_canvas.create_text(upstream_exon_text_start_x + 1, upstream_exon_text_start_y + 1, text="%.1f" % upstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
-            row_canvas.create_text(upstream_exon_text_start_x, upstream_exon_text_start_y, text="%.1f" % upstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+            row_canvas.draw_text(upstream_exon_text_start_x + 1, upstream_exon_text_start_y + 1, text="%.1f" % upstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+            row_canvas.draw_text(upstream_exon_text_start_x, upstream_exon_text_start_y, text="%.1f" % upstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
 
             ##################
             # Draw main exon #
@@ -2346,16 +3297,16 @@ class TINTagger(tk.Tk):
             border_width = 1
 
             # Draw exon background
-            row_canvas.create_rectangle(main_exon_start_x, exon_start_y, main_exon_start_x + main_exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor, width=border_width)
+            row_canvas.draw_rectangle(main_exon_start_x, exon_start_y, main_exon_start_x + main_exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor, width=border_width)
 
             # Draw exon fill
             fill_start_y = (exon_start_y + exon_height) - (int((percent_of_max_rpkm/100) * exon_height))
-            row_canvas.create_rectangle(main_exon_start_x, fill_start_y, main_exon_start_x + main_exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor, width=border_width)
+            row_canvas.draw_rectangle(main_exon_start_x, fill_start_y, main_exon_start_x + main_exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor, width=border_width)
 
             # Draw rpkm text
             main_exon_text_start_x = main_exon_start_x + (main_exon_width / 2)
-            row_canvas.create_text(main_exon_text_start_x + 1, upstream_exon_text_start_y + 1, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
-            row_canvas.create_text(main_exon_text_start_x, upstream_exon_text_start_y, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+            row_canvas.draw_text(main_exon_text_start_x + 1, upstream_exon_text_start_y + 1, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+            row_canvas.draw_text(main_exon_text_start_x, upstream_exon_text_start_y, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
 
             # Get PSI values
             #if not main_exon_psi_data[sample_name]["is_reported"]:
@@ -2369,7 +3320,8 @@ class TINTagger(tk.Tk):
                 sample_excluded_counts = sample_data["excluded_counts"]
                 psi_text_start_y = upstream_exon_text_start_y - 30
                 psi_text = "PSI: %.2f (%d/%d)" % (sample_psi, sample_included_counts, sample_excluded_counts)
-                row_canvas.create_text(main_exon_text_start_x, psi_text_start_y, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+                row_canvas.draw_text(main_exon_text_start_x + 1, psi_text_start_y + 1, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+                row_canvas.draw_text(main_exon_text_start_x, psi_text_start_y, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
 
             ########################
             # Draw downstream exon #
@@ -2387,24 +3339,24 @@ class TINTagger(tk.Tk):
             downstream_exon_start_x = donor_site_width  # Not sure if this is right
 
             # Draw exon background
-            row_canvas.create_rectangle(downstream_exon_start_x, exon_start_y, downstream_exon_start_x + downstream_exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(downstream_exon_start_x, exon_start_y, downstream_exon_start_x + downstream_exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
 
             # Draw exon fill
             fill_start_y = (exon_start_y + exon_height) - (int((percent_of_max_rpkm/100) * exon_height))
-            row_canvas.create_rectangle(downstream_exon_start_x, fill_start_y, downstream_exon_start_x + downstream_exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(downstream_exon_start_x, fill_start_y, downstream_exon_start_x + downstream_exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor)
 
             # Draw rpkm text
             downstream_exon_text_start_x = downstream_exon_start_x + (downstream_exon_width / 2)
-            row_canvas.create_text(downstream_exon_text_start_x + 1, upstream_exon_text_start_y + 1, text="%.1f" % downstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
-            row_canvas.create_text(downstream_exon_text_start_x, upstream_exon_text_start_y, text="%.1f" % downstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+            row_canvas.draw_text(downstream_exon_text_start_x + 1, upstream_exon_text_start_y + 1, text="%.1f" % downstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+            row_canvas.draw_text(downstream_exon_text_start_x, upstream_exon_text_start_y, text="%.1f" % downstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
 
             # Prepare for next sample
             row_number += 1
 
         # Draw the names of the exons above the drawings
-        exon_name_canvas.create_text(upstream_exon_text_start_x, top_canvas_height / 2, text=upstream_exon_name, font=self.canvas_font, fill=COLOR_EXON_NAME)
-        exon_name_canvas.create_text(main_exon_text_start_x, top_canvas_height / 2, text=exon_name, font=self.canvas_font, fill=COLOR_EXON_NAME)
-        exon_name_canvas.create_text(downstream_exon_text_start_x, top_canvas_height / 2, text=downstream_exon_name, font=self.canvas_font, fill=COLOR_EXON_NAME)
+        exon_name_canvas.draw_text(upstream_exon_text_start_x, top_canvas_height / 2, text=upstream_exon_name, font=self.canvas_font, fill=COLOR_EXON_NAME)
+        exon_name_canvas.draw_text(main_exon_text_start_x, top_canvas_height / 2, text=exon_name, font=self.canvas_font, fill=COLOR_EXON_NAME)
+        exon_name_canvas.draw_text(downstream_exon_text_start_x, top_canvas_height / 2, text=downstream_exon_name, font=self.canvas_font, fill=COLOR_EXON_NAME)
 
         # Expand exon frame horizontally
         self.exon_frame.columnconfigure(0, weight=1)
@@ -2434,8 +3386,7 @@ class TINTagger(tk.Tk):
         ###########################################
         # Draw a top canvas containing exon names #
         ###########################################
-        exon_name_canvas = ResizingCanvas(self.exon_frame, bg=canvas_background, highlightthickness=0, width=canvas_width, height=top_canvas_height)
-        exon_name_canvas.grid(column=0, row=row_number, sticky="NEWS")
+        exon_name_canvas = self.get_exon_name_canvas(canvas_background, canvas_width, top_canvas_height)
         row_number += 1
 
         # Get and trim upstream exon name
@@ -2482,21 +3433,14 @@ class TINTagger(tk.Tk):
             if not is_reported:
                 exon_color = COLOR_DARKGRAY
                 exon_bordercolor = COLOR_DARKGRAY
-            # Initialize canvas and grid it to this row in the exon frame
-            row_canvas = ResizingCanvas(self.exon_frame, bg=canvas_background, highlightthickness=0, width=canvas_width, height=canvas_height)
-            row_canvas.grid(row=row_number, column=0, sticky="NEWS")
-            # Keep track of canvases used
-            self.canvases.append(row_canvas)
+            # Get the canvas for this row in the exon frame
+            row_canvas = self.get_row_canvas(row_number, canvas_background, canvas_width, canvas_height)
             # Setup tagging buttons
-            self.add_tagging_buttons(row_number, sample_name, is_reported, sample_tag, as_id, sample_data["decision_tree_prediction"])
+            self.add_tagging_buttons(row_number, sample_name, is_reported, sample_tag, as_id, sample_data["model_predictions"])
             # Set event weight for every row in the center frame
             self.exon_frame.rowconfigure(row_number, weight=1)
-            # Add separator
+            # Skip the separator row, see get_row_canvas()
             row_number += 1
-            sep = tk.Frame(self.exon_frame, bg=COLOR_DARKWHITE, height=2)
-            sep.grid(row=row_number, column=0, sticky="NEWS")
-            button_sep = tk.Frame(self.exon_frame, bg=COLOR_DARKWHITE, height=2)
-            button_sep.grid(row=row_number, column=1, sticky="NEWS")
 
             ######################
             # Draw upstream exon #
@@ -2513,16 +3457,16 @@ class TINTagger(tk.Tk):
             # Exon drawing coordinates
             upstream_exon_start_x = (canvas_width / 3) - (upstream_exon_width / 2)
             # Draw exon background
-            row_canvas.create_rectangle(upstream_exon_start_x, exon_start_y, upstream_exon_start_x + upstream_exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(upstream_exon_start_x, exon_start_y, upstream_exon_start_x + upstream_exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
             # Draw exon fill
             fill_start_y = (exon_start_y + exon_height) - (int((percent_of_max_rpkm / 100) * exon_height))
             fill_end_y = exon_start_y + exon_height
-            row_canvas.create_rectangle(upstream_exon_start_x, fill_start_y, upstream_exon_start_x + upstream_exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(upstream_exon_start_x, fill_start_y, upstream_exon_start_x + upstream_exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor)
             # Draw coverage text
             upstream_exon_text_start_x = upstream_exon_start_x + (upstream_exon_width / 2)
             text_start_y = exon_height - 10
-            row_canvas.create_text(upstream_exon_text_start_x + 1, text_start_y + 1, text="%.1f" % upstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
-            row_canvas.create_text(upstream_exon_text_start_x, text_start_y, text="%.1f" % upstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+            row_canvas.draw_text(upstream_exon_text_start_x + 1, text_start_y + 1, text="%.1f" % upstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+            row_canvas.draw_text(upstream_exon_text_start_x, text_start_y, text="%.1f" % upstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
 
             ##################
             # Draw main exon #
@@ -2540,14 +3484,14 @@ class TINTagger(tk.Tk):
             # Dimensions
             main_exon_start_x = canvas_width / 2
             # Draw exon background
-            row_canvas.create_rectangle(main_exon_start_x, exon_start_y, main_exon_start_x + main_exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(main_exon_start_x, exon_start_y, main_exon_start_x + main_exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
             # Draw exon fill
             fill_start_y = (exon_start_y + exon_height) - (int((percent_of_max_rpkm / 100) * exon_height))
-            row_canvas.create_rectangle(main_exon_start_x, fill_start_y, main_exon_start_x + main_exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(main_exon_start_x, fill_start_y, main_exon_start_x + main_exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor)
             # Draw RPKM text
             main_exon_text_start_x = main_exon_start_x + (main_exon_width / 2)
-            row_canvas.create_text(main_exon_text_start_x + 1, text_start_y + 1, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
-            row_canvas.create_text(main_exon_text_start_x, text_start_y, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+            row_canvas.draw_text(main_exon_text_start_x + 1, text_start_y + 1, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+            row_canvas.draw_text(main_exon_text_start_x, text_start_y, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
             # Get and draw PSI text
             #if main_exon_psi_data[sample_name]["is_reported"]:
             if sample_data["is_reported"]:
@@ -2560,7 +3504,8 @@ class TINTagger(tk.Tk):
                 sample_excluded_counts = sample_data["excluded_counts"]
                 psi_text_start_y = text_start_y - 30
                 psi_text = "PSI: %.2f (%d/%d)" % (sample_psi, sample_included_counts, sample_excluded_counts)
-                row_canvas.create_text(main_exon_text_start_x, psi_text_start_y, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+                row_canvas.draw_text(main_exon_text_start_x + 1, psi_text_start_y + 1, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+                row_canvas.draw_text(main_exon_text_start_x, psi_text_start_y, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
 
             ########################
             # Draw downstream exon #
@@ -2575,22 +3520,22 @@ class TINTagger(tk.Tk):
                 percent_of_max_rpkm = 0
             downstream_exon_start_x = main_exon_start_x + main_exon_width
             # Draw exon background
-            row_canvas.create_rectangle(downstream_exon_start_x, exon_start_y, downstream_exon_start_x + downstream_exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(downstream_exon_start_x, exon_start_y, downstream_exon_start_x + downstream_exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
             # Draw exon fill
             fill_start_y = (exon_start_y + exon_height) - (int((percent_of_max_rpkm/100) * exon_height))
-            row_canvas.create_rectangle(downstream_exon_start_x, fill_start_y, downstream_exon_start_x + downstream_exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(downstream_exon_start_x, fill_start_y, downstream_exon_start_x + downstream_exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor)
             # Draw rpkm text
             downstream_exon_text_start_x = downstream_exon_start_x + (downstream_exon_width / 2)
-            row_canvas.create_text(downstream_exon_text_start_x + 1, text_start_y + 1, text="%.1f" % downstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
-            row_canvas.create_text(downstream_exon_text_start_x, text_start_y, text="%.1f" % downstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+            row_canvas.draw_text(downstream_exon_text_start_x + 1, text_start_y + 1, text="%.1f" % downstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+            row_canvas.draw_text(downstream_exon_text_start_x, text_start_y, text="%.1f" % downstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
 
             # Prepare for next sample
             row_number += 1
 
         # Draw the names of the exons above the drawings
-        exon_name_canvas.create_text(upstream_exon_text_start_x, top_canvas_height / 2, text="%s" % upstream_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
-        exon_name_canvas.create_text(main_exon_text_start_x, top_canvas_height / 2, text=exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
-        exon_name_canvas.create_text(downstream_exon_text_start_x, top_canvas_height / 2, text=downstream_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
+        exon_name_canvas.draw_text(upstream_exon_text_start_x, top_canvas_height / 2, text="%s" % upstream_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
+        exon_name_canvas.draw_text(main_exon_text_start_x, top_canvas_height / 2, text=exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
+        exon_name_canvas.draw_text(downstream_exon_text_start_x, top_canvas_height / 2, text=downstream_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
 
         # Expand exon frame horizontally
         self.exon_frame.columnconfigure(0, weight=1)
@@ -2641,8 +3586,7 @@ class TINTagger(tk.Tk):
         ###########################################
         # Draw a top canvas containing exon names #
         ###########################################
-        exon_name_canvas = ResizingCanvas(self.exon_frame, bg=canvas_background, highlightthickness=0, width=canvas_width, height=top_canvas_height)
-        exon_name_canvas.grid(column=0, row=row_number, sticky="NEWS")
+        exon_name_canvas = self.get_exon_name_canvas(canvas_background, canvas_width, top_canvas_height)
         row_number += 1
 
         # Get and trim exon of interest name
@@ -2673,26 +3617,19 @@ class TINTagger(tk.Tk):
             if not is_reported:
                 exon_color = COLOR_DARKGRAY
                 exon_bordercolor = COLOR_DARKGRAY
-            # Initialize canvas and grid it to this row in the exon frame
-            row_canvas = ResizingCanvas(self.exon_frame, bg=canvas_background, highlightthickness=0, width=canvas_width, height=canvas_height)
-            row_canvas.grid(row=row_number, column=0, sticky="NEWS")
-            # Keep track of canvases used
-            self.canvases.append(row_canvas)
+            # Get the canvas for this row in the exon frame
+            row_canvas = self.get_row_canvas(row_number, canvas_background, canvas_width, canvas_height)
             # Setup tagging buttons
-            self.add_tagging_buttons(row_number, sample_name, is_reported, sample_tag, as_id)
+            self.add_tagging_buttons(row_number, sample_name, is_reported, sample_tag, as_id, sample_data["model_predictions"])
             # Set event weight for every row in the center frame
             self.exon_frame.rowconfigure(row_number, weight=1)
-            # Add separator
+            # Skip the separator row, see get_row_canvas()
             row_number += 1
-            sep = tk.Frame(self.exon_frame, bg=COLOR_DARKWHITE, height=2)
-            sep.grid(row=row_number, column=0, sticky="NEWS")
-            button_sep = tk.Frame(self.exon_frame, bg=COLOR_DARKWHITE, height=2)
-            button_sep.grid(row=row_number, column=1, sticky="NEWS")
 
             ##################
             # Draw main exon #
             ##################
-            row_canvas.create_polygon(
+            row_canvas.draw_polygon(
                 [
                     one_x, one_y,
                     two_x, two_y,
@@ -2736,13 +3673,13 @@ class TINTagger(tk.Tk):
                 fill_polygons += [four_x, four_y, five_x, five_y, six_x, six_y, seven_x, seven_y, eight_x, fill_start_y]
             # Lastly, add a line back to the first point
             fill_polygons += [one_x, fill_start_y]
-            row_canvas.create_polygon(fill_polygons, fill=exon_color, outline=exon_bordercolor)
+            row_canvas.draw_polygon(fill_polygons, fill=exon_color, outline=exon_bordercolor)
 
             # Draw RPKM text
             main_exon_text_start_x = one_x + (exon_width / 2)
             main_exon_text_start_y = two_y - 10
-            row_canvas.create_text(main_exon_text_start_x + 1, main_exon_text_start_y + 1, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
-            row_canvas.create_text(main_exon_text_start_x, main_exon_text_start_y, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+            row_canvas.draw_text(main_exon_text_start_x + 1, main_exon_text_start_y + 1, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+            row_canvas.draw_text(main_exon_text_start_x, main_exon_text_start_y, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
 
             # Get PSI values
             #if main_exon_psi_data[sample_name]["is_reported"]:
@@ -2756,13 +3693,13 @@ class TINTagger(tk.Tk):
                 sample_excluded_counts = sample_data["excluded_counts"]
                 psi_text_start_y = main_exon_text_start_y - 30
                 psi_text = "PSI: %.2f (%d/%d)" % (sample_psi, sample_included_counts, sample_excluded_counts)
-                row_canvas.create_text(main_exon_text_start_x + 1, psi_text_start_y + 1, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
-                row_canvas.create_text(main_exon_text_start_x, psi_text_start_y, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+                row_canvas.draw_text(main_exon_text_start_x + 1, psi_text_start_y + 1, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+                row_canvas.draw_text(main_exon_text_start_x, psi_text_start_y, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
 
         # Draw the name of the exon in the top canvas
         if len(sample_names_sorted) > 0:
             # TODO: Do this check in every draw-function
-            exon_name_canvas.create_text(main_exon_text_start_x, top_canvas_height / 2, text=exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
+            exon_name_canvas.draw_text(main_exon_text_start_x, top_canvas_height / 2, text=exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
 
         # Expand exon frame horizontally
         self.exon_frame.columnconfigure(0, weight=1)
@@ -2813,8 +3750,7 @@ class TINTagger(tk.Tk):
         ###########################################
         # Draw a top canvas containing exon names #
         ###########################################
-        exon_name_canvas = ResizingCanvas(self.exon_frame, bg=canvas_background, highlightthickness=0, width=canvas_width, height=top_canvas_height)
-        exon_name_canvas.grid(column=0, row=row_number, sticky="NEWS")
+        exon_name_canvas = self.get_exon_name_canvas(canvas_background, canvas_width, top_canvas_height)
         row_number += 1
 
         # Get and trim exon of interest name
@@ -2844,26 +3780,19 @@ class TINTagger(tk.Tk):
             if not is_reported:
                 exon_color = COLOR_DARKGRAY
                 exon_bordercolor = COLOR_DARKGRAY
-            # Initialize canvas and grid it to this row in the exon frame
-            row_canvas = ResizingCanvas(self.exon_frame, bg=canvas_background, highlightthickness=0, width=canvas_width, height=canvas_height)
-            row_canvas.grid(row=row_number, column=0, sticky="NEWS")
-            # Keep track of canvases used
-            self.canvases.append(row_canvas)
+            # Get the canvas for this row in the exon frame
+            row_canvas = self.get_row_canvas(row_number, canvas_background, canvas_width, canvas_height)
             # Setup tagging buttons
-            self.add_tagging_buttons(row_number, sample_name, is_reported, sample_tag, as_id)
+            self.add_tagging_buttons(row_number, sample_name, is_reported, sample_tag, as_id, sample_data["model_predictions"])
             # Set event weight for every row in the center frame
             self.exon_frame.rowconfigure(row_number, weight=1)
-            # Add separator
+            # Skip the separator row, see get_row_canvas()
             row_number += 1
-            sep = tk.Frame(self.exon_frame, bg=COLOR_DARKWHITE, height=2)
-            sep.grid(row=row_number, column=0, sticky="NEWS")
-            button_sep = tk.Frame(self.exon_frame, bg=COLOR_DARKWHITE, height=2)
-            button_sep.grid(row=row_number, column=1, sticky="NEWS")
 
             ##################
             # Draw main exon #
             ##################
-            row_canvas.create_polygon(
+            row_canvas.draw_polygon(
                 [
                     one_x, one_y,
                     two_x, two_y,
@@ -2907,13 +3836,13 @@ class TINTagger(tk.Tk):
                 fill_polygons += [four_x, four_y, five_x, five_y, six_x, six_y, seven_x, seven_y, eight_x, fill_start_y]
             # Lastly, add a line back to the first point
             fill_polygons += [one_x, fill_start_y]
-            row_canvas.create_polygon(fill_polygons, fill=exon_color, outline=exon_bordercolor)
+            row_canvas.draw_polygon(fill_polygons, fill=exon_color, outline=exon_bordercolor)
 
             # Draw RPKM text
             main_exon_text_start_x = eight_x + (exon_width / 2)
             main_exon_text_start_y = two_y - 10
-            row_canvas.create_text(main_exon_text_start_x + 1, main_exon_text_start_y + 1, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
-            row_canvas.create_text(main_exon_text_start_x, main_exon_text_start_y, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+            row_canvas.draw_text(main_exon_text_start_x + 1, main_exon_text_start_y + 1, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+            row_canvas.draw_text(main_exon_text_start_x, main_exon_text_start_y, text="%.1f" % avg_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
 
             # Get PSI values
             #if main_exon_psi_data[sample_name]["is_reported"]:
@@ -2927,13 +3856,13 @@ class TINTagger(tk.Tk):
                 sample_excluded_counts = sample_data["excluded_counts"]
                 psi_text_start_y = main_exon_text_start_y - 30
                 psi_text = "PSI: %.2f (%d/%d)" % (sample_psi, sample_included_counts, sample_excluded_counts)
-                row_canvas.create_text(main_exon_text_start_x + 1, psi_text_start_y + 1, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
-                row_canvas.create_text(main_exon_text_start_x, psi_text_start_y, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+                row_canvas.draw_text(main_exon_text_start_x + 1, psi_text_start_y + 1, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+                row_canvas.draw_text(main_exon_text_start_x, psi_text_start_y, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
 
         # Draw the name of the exon in the top canvas
         if len(sample_names_sorted) > 0:
             # TODO: Do this check in every draw-function
-            exon_name_canvas.create_text(main_exon_text_start_x, top_canvas_height / 2, text=exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
+            exon_name_canvas.draw_text(main_exon_text_start_x, top_canvas_height / 2, text=exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
 
         # Expand exon frame horizontally
         self.exon_frame.columnconfigure(0, weight=1)
@@ -2963,8 +3892,7 @@ class TINTagger(tk.Tk):
         #########################################
         # Draw top canvas containing exon names #
         #########################################
-        exon_name_canvas = ResizingCanvas(self.exon_frame, bg=canvas_background, highlightthickness=0, width=canvas_width, height=top_canvas_height)
-        exon_name_canvas.grid(column=0, row=row_number, sticky="NEWS")
+        exon_name_canvas = self.get_exon_name_canvas(canvas_background, canvas_width, top_canvas_height)
         row_number += 1
 
         # Get and trim exon of interest name
@@ -2987,7 +3915,8 @@ class TINTagger(tk.Tk):
         next_exon_id = data["next_exon_id"]
         # Get expression values for flanking exons and main exons
         #flanking_exons_data = self.data_processor.get_flanking_exons_rpkm_by_exon_ids(sample_names_sorted, prev_exon_id, next_exon_id)
-        main_exon_rpkm_data = self.data_processor.get_rpkm_for_mutually_exclusive_exons(sample_names_sorted, as_id)
+        # All samples, not just the visible ones in data, so the lookup and its max RPKMs cover the whole event
+        main_exon_rpkm_data = self.data_processor.get_rpkm_for_mutually_exclusive_exons(self.sample_names, as_id)
         #main_exon_psi_data = self.data_processor.get_main_exon_psi_by_asid(sample_names_sorted, as_id)
 
         ##################################
@@ -3006,21 +3935,14 @@ class TINTagger(tk.Tk):
             if not is_reported:
                 exon_color = COLOR_DARKGRAY
                 exon_bordercolor = COLOR_DARKGRAY
-            # Initialize canvas and grid it to this row in the exon frame
-            row_canvas = ResizingCanvas(self.exon_frame, bg=canvas_background, highlightthickness=0, width=canvas_width, height=canvas_height)
-            row_canvas.grid(row=row_number, column=0, sticky="NEWS")
-            # Keep track of canvases used
-            self.canvases.append(row_canvas)
+            # Get the canvas for this row in the exon frame
+            row_canvas = self.get_row_canvas(row_number, canvas_background, canvas_width, canvas_height)
             # Setup tagging buttons
-            self.add_tagging_buttons(row_number, sample_name, is_reported, sample_tag, as_id)
+            self.add_tagging_buttons(row_number, sample_name, is_reported, sample_tag, as_id, sample_data["model_predictions"])
             # Set event weight for every row in the center frame
             self.exon_frame.rowconfigure(row_number, weight=1)
-            # Add separator
+            # Skip the separator row, see get_row_canvas()
             row_number += 1
-            sep = tk.Frame(self.exon_frame, bg=COLOR_DARKWHITE, height=2)
-            sep.grid(row=row_number, column=0, sticky="NEWS")
-            button_sep = tk.Frame(self.exon_frame, bg=COLOR_DARKWHITE, height=2)
-            button_sep.grid(row=row_number, column=1, sticky="NEWS")
 
             ######################
             # Draw upstream exon #
@@ -3035,15 +3957,15 @@ class TINTagger(tk.Tk):
             except ZeroDivisionError:
                 upstream_percent_of_max_rpkm = 0
             # Draw exon background
-            row_canvas.create_rectangle(upstream_exon_start_x, exon_start_y, upstream_exon_start_x + exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(upstream_exon_start_x, exon_start_y, upstream_exon_start_x + exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
             fill_start_y = (exon_start_y + exon_height) - (int((upstream_percent_of_max_rpkm / 100) * exon_height))
             fill_end_y = exon_start_y + exon_height
             # Draw exon fill
-            row_canvas.create_rectangle(upstream_exon_start_x, fill_start_y, upstream_exon_start_x + exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(upstream_exon_start_x, fill_start_y, upstream_exon_start_x + exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor)
             # Draw exon RPKM values
             upstream_exon_text_start_x = upstream_exon_start_x + (exon_width / 2)
-            row_canvas.create_text(upstream_exon_text_start_x + 1, text_start_y + 1, text="%.1f" % upstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
-            row_canvas.create_text(upstream_exon_text_start_x, text_start_y, text="%.1f" % upstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+            row_canvas.draw_text(upstream_exon_text_start_x + 1, text_start_y + 1, text="%.1f" % upstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+            row_canvas.draw_text(upstream_exon_text_start_x, text_start_y, text="%.1f" % upstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
 
             ########################
             # Draw first main exon #
@@ -3059,15 +3981,15 @@ class TINTagger(tk.Tk):
             # Draw exon background
             first_main_exon_start_x = upstream_exon_start_x + exon_width + (exon_padding * 2)
             first_main_exon_end_x = first_main_exon_start_x + exon_width
-            row_canvas.create_rectangle(first_main_exon_start_x, exon_start_y, first_main_exon_end_x, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(first_main_exon_start_x, exon_start_y, first_main_exon_end_x, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
             # Draw exon fill
             first_main_exon_fill_start_y = (exon_start_y + exon_height) - (int((first_main_exon_percent_of_max_rpkm / 100) * exon_height))
             first_main_exon_fill_end_y = exon_start_y + exon_height
-            row_canvas.create_rectangle(first_main_exon_start_x, first_main_exon_fill_start_y, first_main_exon_end_x, first_main_exon_fill_end_y, fill=exon_color, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(first_main_exon_start_x, first_main_exon_fill_start_y, first_main_exon_end_x, first_main_exon_fill_end_y, fill=exon_color, outline=exon_bordercolor)
             # Draw exon RPKM values
             first_main_exon_text_start_x = first_main_exon_start_x + (exon_width / 2)
-            row_canvas.create_text(first_main_exon_text_start_x + 1, text_start_y + 1, text="%.1f" % first_main_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
-            row_canvas.create_text(first_main_exon_text_start_x, text_start_y, text="%.1f" % first_main_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+            row_canvas.draw_text(first_main_exon_text_start_x + 1, text_start_y + 1, text="%.1f" % first_main_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+            row_canvas.draw_text(first_main_exon_text_start_x, text_start_y, text="%.1f" % first_main_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
             # Draw PSI values
             #if main_exon_psi_data[sample_name]["is_reported"]:
             if sample_data["is_reported"]:
@@ -3080,7 +4002,7 @@ class TINTagger(tk.Tk):
                 sample_excluded_counts = sample_data["excluded_counts"]
                 psi_text_start_y = exon_start_y - 10
                 psi_text = "PSI: %.2f (%d/%d)" % (sample_psi, sample_included_counts, sample_excluded_counts)
-                row_canvas.create_text(first_main_exon_text_start_x, psi_text_start_y, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW)
+                row_canvas.draw_text(first_main_exon_text_start_x, psi_text_start_y, text=psi_text, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW)
 
             #########################
             # Draw second main exon #
@@ -3096,15 +4018,15 @@ class TINTagger(tk.Tk):
             # Draw exon background
             second_main_exon_start_x = first_main_exon_start_x + exon_width + (exon_padding * 2)
             second_main_exon_end_x = second_main_exon_start_x + exon_width
-            row_canvas.create_rectangle(second_main_exon_start_x, exon_start_y, second_main_exon_end_x, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(second_main_exon_start_x, exon_start_y, second_main_exon_end_x, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
             # Draw exon fill
             second_main_exon_fill_start_y = (exon_start_y + exon_height) - (int((second_main_exon_percent_of_max_rpkm / 100) * exon_height))
             second_main_exon_fill_end_y = exon_start_y + exon_height
-            row_canvas.create_rectangle(second_main_exon_start_x, second_main_exon_fill_start_y, second_main_exon_end_x, second_main_exon_fill_end_y, fill=exon_color, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(second_main_exon_start_x, second_main_exon_fill_start_y, second_main_exon_end_x, second_main_exon_fill_end_y, fill=exon_color, outline=exon_bordercolor)
             # Draw exon RPKM values
             second_main_exon_text_start_x = second_main_exon_start_x + (exon_width / 2)
-            row_canvas.create_text(second_main_exon_text_start_x + 1, text_start_y + 1, text="%.1f" % second_main_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
-            row_canvas.create_text(second_main_exon_text_start_x, text_start_y, text="%.1f" % second_main_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+            row_canvas.draw_text(second_main_exon_text_start_x + 1, text_start_y + 1, text="%.1f" % second_main_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+            row_canvas.draw_text(second_main_exon_text_start_x, text_start_y, text="%.1f" % second_main_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
 
             ########################
             # Draw downstream exon #
@@ -3119,21 +4041,21 @@ class TINTagger(tk.Tk):
             except ZeroDivisionError:
                 downstream_percent_of_max_rpkm = 0
             # Draw exon background
-            row_canvas.create_rectangle(downstream_exon_start_x, exon_start_y, downstream_exon_start_x + exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(downstream_exon_start_x, exon_start_y, downstream_exon_start_x + exon_width, exon_start_y + exon_height, fill=canvas_background, outline=exon_bordercolor)
             fill_start_y = (exon_start_y + exon_height) - (int((downstream_percent_of_max_rpkm / 100) * exon_height))
             fill_end_y = exon_start_y + exon_height
             # Draw exon fill
-            row_canvas.create_rectangle(downstream_exon_start_x, fill_start_y, downstream_exon_start_x + exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor)
+            row_canvas.draw_rectangle(downstream_exon_start_x, fill_start_y, downstream_exon_start_x + exon_width, fill_end_y, fill=exon_color, outline=exon_bordercolor)
             # Draw exon RPKM values
             downstream_exon_text_start_x = downstream_exon_start_x + (exon_width / 2)
-            row_canvas.create_text(downstream_exon_text_start_x + 1, text_start_y + 1, text="%.1f" % downstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
-            row_canvas.create_text(downstream_exon_text_start_x, text_start_y, text="%.1f" % downstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
+            row_canvas.draw_text(downstream_exon_text_start_x + 1, text_start_y + 1, text="%.1f" % downstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT_SHADOW, tags=TEXTTAG_SHADOW)
+            row_canvas.draw_text(downstream_exon_text_start_x, text_start_y, text="%.1f" % downstream_exon_rpkm, font=self.canvas_font, fill=COLOR_CANVAS_TEXT, tags=TEXTTAG_COVERAGE)
 
         # Draw the names of the exons above the drawings
-        exon_name_canvas.create_text(upstream_exon_text_start_x, top_canvas_height / 2, text=upstream_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
-        exon_name_canvas.create_text(first_main_exon_text_start_x, top_canvas_height / 2, text=first_main_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
-        exon_name_canvas.create_text(second_main_exon_text_start_x, top_canvas_height / 2, text=second_main_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
-        exon_name_canvas.create_text(downstream_exon_text_start_x, top_canvas_height / 2, text=downstream_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
+        exon_name_canvas.draw_text(upstream_exon_text_start_x, top_canvas_height / 2, text=upstream_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
+        exon_name_canvas.draw_text(first_main_exon_text_start_x, top_canvas_height / 2, text=first_main_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
+        exon_name_canvas.draw_text(second_main_exon_text_start_x, top_canvas_height / 2, text=second_main_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
+        exon_name_canvas.draw_text(downstream_exon_text_start_x, top_canvas_height / 2, text=downstream_exon_name, fill=COLOR_EXON_NAME, font=self.canvas_font)
 
         # Expand exon frame horizontally
         self.exon_frame.columnconfigure(0, weight=1)
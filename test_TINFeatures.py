@@ -0,0 +1,135 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from TINFeatures import FEATURES, EventAggregates
+
+CROSS_SAMPLE_FEATURES = [
+    "occurrences",
+    "max_avg_rpkm",
+    "max_psi",
+    "sum_psi_all_samples",
+    "sum_rpkm_all_samples",
+    "sum_psi_other_samples",
+    "mean_psi_other_samples",
+    "std_psi_other_samples",
+    "psi_zscore_other_samples",
+    "sum_rpkm_other_samples",
+    "mean_rpkm_other_samples",
+    "std_rpkm_other_samples",
+    "rpkm_zscore_other_samples",
+    "psi_diff_from_mean_other_samples",
+    "rpkm_percentage_of_mean_other_samples",
+    "percent_of_max_psi",
+    "percent_of_max_rpkm"
+]
+
+
+def make_dataset(rows):
+    """
+    rows: (as_id, sample name, psi, avg_rpkm) tuples.
+    """
+    df = pd.DataFrame(rows, columns=["as_id", "name", "psi", "avg_rpkm"])
+    for column in ["rpkm", "prev_exon_rpkm", "next_exon_rpkm"]:
+        df[column] = df["avg_rpkm"]
+    FEATURES.ensure(df, CROSS_SAMPLE_FEATURES)
+    return df
+
+
+def recompute(df):
+    expected = df.copy()
+    FEATURES.ensure(expected, CROSS_SAMPLE_FEATURES, recompute=True)
+    return expected
+
+
+class EventAggregatesTest(unittest.TestCase):
+    """
+    The incremental updates of EventAggregates must give the same features as computing them from scratch.
+    """
+
+    def setUp(self):
+        self.dataset = make_dataset([
+            (1, "s1", 0.5, 5.0),
+            (1, "s2", 0.2, 1.0),
+            (1, "s3", 0.3, 3.0),
+            (2, "s1", 0.9, 12.5),
+            (2, "s2", 0.8, 10.0),
+            (2, "s3", np.nan, 11.0),
+            (2, "s4", 0.7, 9.5),
+            (3, "s2", 0.1, 2.0),
+            (3, "s3", 0.1, 2.0),
+            (4, "s1", 0.4, 3.0)
+        ])
+
+    def assert_features_equal(self, actual, expected):
+        for name in CROSS_SAMPLE_FEATURES:
+            np.testing.assert_allclose(actual[name].values.astype(float), expected[name].values.astype(float), err_msg=name)
+
+    def remove_sample(self, aggregates, df, sample_name):
+        removed_mask = df["name"] == sample_name
+        remaining = df.loc[~removed_mask].copy()
+        affected = aggregates.remove_rows(df.loc[removed_mask], remaining)
+        aggregates.apply(remaining, affected)
+        return remaining
+
+    def add_sample(self, aggregates, df, new_rows):
+        combined = pd.concat([df, new_rows], ignore_index=True)
+        affected = aggregates.add_rows(new_rows)
+        aggregates.apply(combined, affected)
+        return combined
+
+    def test_remove_sample(self):
+        aggregates = EventAggregates(self.dataset)
+        remaining = self.remove_sample(aggregates, self.dataset, "s1")
+        self.assert_features_equal(remaining, recompute(remaining))
+
+    def test_remove_outlier(self):
+        dataset = make_dataset([
+            (1, "s1", 0.5, 5000.0),
+            (1, "s2", 0.2, 0.001),
+            (1, "s3", 0.3, 0.003),
+            (2, "s1", 0.9, 10000.01),
+            (2, "s2", 0.8, 10000.02),
+            (2, "s3", 0.6, 10000.03),
+            (2, "s4", 0.7, 10000.0)
+        ])
+        aggregates = EventAggregates(dataset)
+        remaining = self.remove_sample(aggregates, dataset, "s1")
+        self.assert_features_equal(remaining, recompute(remaining))
+
+        event = remaining.loc[remaining["as_id"] == 1]
+        np.testing.assert_allclose(event["mean_rpkm_other_samples"].values, [0.003, 0.001])
+        np.testing.assert_allclose(event["rpkm_percentage_of_mean_other_samples"].values, [1 / 3.0, 3.0])
+
+    def test_remove_beside_outlier(self):
+        dataset = make_dataset([
+            (1, "s1", 0.5, 5000.0),
+            (1, "s2", 0.2, 0.001),
+            (1, "s3", 0.3, 0.003),
+            (1, "s4", 0.4, 0.002)
+        ])
+        aggregates = EventAggregates(dataset)
+        remaining = self.remove_sample(aggregates, dataset, "s4")
+        self.assert_features_equal(remaining, recompute(remaining))
+
+        # Without the outlier's own value, its event is just 0.001 and 0.003
+        np.testing.assert_allclose(remaining["std_rpkm_other_samples"].values[0], 0.001)
+
+    def test_remove_then_add(self):
+        aggregates = EventAggregates(self.dataset)
+        new_rows = self.dataset.loc[self.dataset["name"] == "s1", ["as_id", "name", "psi", "avg_rpkm", "rpkm", "prev_exon_rpkm", "next_exon_rpkm"]]
+        remaining = self.remove_sample(aggregates, self.dataset, "s1")
+        remaining = self.remove_sample(aggregates, remaining, "s4")
+        combined = self.add_sample(aggregates, remaining, new_rows)
+        self.assert_features_equal(combined, recompute(combined))
+
+    def test_add_new_event(self):
+        aggregates = EventAggregates(self.dataset)
+        new_rows = make_dataset([(1, "s5", 0.6, 7.0), (5, "s5", 0.2, 1.0)])[["as_id", "name", "psi", "avg_rpkm", "rpkm", "prev_exon_rpkm", "next_exon_rpkm"]]
+        combined = self.add_sample(aggregates, self.dataset, new_rows)
+        self.assert_features_equal(combined, recompute(combined))
+
+
+if __name__ == "__main__":
+    unittest.main()